@@ -33,3 +33,19 @@ Rules for urgency:
 Transcript:
 {transcript}
 """
+
+# Fixed agent utterances. Their audio is rendered once and served from the phrase cache.
+AGENT_PHRASES = {
+    "reprompt": "I could not hear you clearly. Could you please repeat that?",
+    "no_audio_goodbye": "I am still unable to hear you. We will follow up again soon. Goodbye.",
+    "ok_goodbye": "Glad to hear you're feeling okay. Thank you for your time. Goodbye.",
+    "problem_goodbye": "Thank you for sharing that. I will alert your doctor right away. Goodbye.",
+    "timeout_goodbye": "I am having trouble processing right now. I will notify your doctor to follow up. Goodbye.",
+    "error_goodbye": "I am having technical trouble. Your doctor will follow up soon. Goodbye.",
+}
+
+# The greeting is spliced: a short per-patient opening plus this cached carrier phrase.
+GREETING_CARRIER = "this is Emily calling from the clinic to see how you're feeling since your last visit. Is now a good time to talk?"
+
+def greeting_opening(patient_name: str) -> str:
+    return f"Hi {patient_name},"
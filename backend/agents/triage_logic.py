@@ -1,15 +1,12 @@
-from vertexai.generative_models import GenerativeModel
-import vertexai
 from config.settings import settings
 from agents.prompts import TRIAGE_PROMPT
+from services.clients import client_registry
 from utils.helpers import extract_json_from_text, safe_urgency, parse_bool
 
-# Ensure vertexai is initialized once globally or inside the init
-vertexai.init(project=settings.GOOGLE_PROJECT_ID, location=settings.GCP_LOCATION)
-
 class TriageAnalyzer:
-    def __init__(self):
-        self.model = GenerativeModel(model_name=settings.VERTEX_AI_MODEL)
+    def __init__(self, registry=None):
+        # vertexai.init runs once per process (app lifespan or first use), not at import time
+        self.model = (registry or client_registry).get_generative_model(settings.VERTEX_AI_MODEL)
 
     def analyze_call(self, transcript: str) -> dict:
         """
@@ -0,0 +1,56 @@
+"""
+Compares the fixed 800/100 character chunker with the structure-aware token chunker.
+
+Run from the backend directory:
+    python -m benchmarks.chunking [--repeat N] [--scale N] [extra.pdf ...]
+
+Each sample PDF is also concatenated --scale times to approximate a long
+discharge summary.
+"""
+import argparse
+import time
+
+from config.settings import settings, ROOT_DIR
+from services.pdf_parser import extract_text_from_pdf
+from utils.helpers import chunk_text, chunk_text_structured
+
+SAMPLE_PDFS = [
+    ROOT_DIR / "john_doe_cardiology_report.pdf",
+    ROOT_DIR / "jane_smith_post_op.pdf",
+]
+
+
+def _measure(func, text: str, repeat: int) -> tuple[int, float]:
+    chunks = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        chunks = func(text)
+    return len(chunks), (time.perf_counter() - started) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="Additional PDFs to benchmark")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--scale", type=int, default=200)
+    args = parser.parse_args()
+
+    chunkers = {
+        "fixed 800/100 chars": lambda text: chunk_text(text, chunk_size=800, overlap=100),
+        f"structured {settings.CHUNK_MAX_TOKENS}/{settings.CHUNK_OVERLAP_TOKENS} tok": lambda text: chunk_text_structured(
+            text, settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS
+        ),
+    }
+
+    print(f"{'document':44} {'chars':>8} {'chunker':26} {'chunks':>7} {'ms':>9}")
+    for path in SAMPLE_PDFS + list(args.pdfs):
+        text = extract_text_from_pdf(path)
+        name = str(path).rsplit("/", 1)[-1]
+        for label, doc in ((name, text), (f"{name} x{args.scale}", "\n\n".join([text] * args.scale))):
+            for chunker_name, func in chunkers.items():
+                count, ms = _measure(func, doc, args.repeat)
+                print(f"{label[:44]:44} {len(doc):>8} {chunker_name:26} {count:>7} {ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cold-start report: per-module import cost of `main` and time until the app is ready.
+
+Run from the backend directory:
+    python -m benchmarks.cold_start [--top N] [--runs N]
+
+Each run starts a fresh interpreter with `python -X importtime`, imports main and
+enters the FastAPI lifespan (schema creation, ingestion queue) without serving.
+Client warm-up is disabled so only the work that blocks readiness is measured.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from config.settings import settings
+from services.startup_metrics import HEAVY_MODULES
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+_PROBE = """
+import asyncio, json
+import main
+
+async def _ready():
+    async with main.app.router.lifespan_context(main.app):
+        return main.startup_metrics.snapshot()
+
+print("STARTUP_METRICS " + json.dumps(asyncio.run(_ready())))
+"""
+
+
+def _run_once() -> tuple[dict, list[tuple[int, str]]]:
+    env = {**os.environ, "STARTUP_WARM_CLIENTS": "false"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    metrics = {}
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP_METRICS "):
+            metrics = json.loads(line.split(" ", 1)[1])
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split(":", 1)[1].split("|")
+        imports.append((int(cumulative), name.rstrip()))
+    return metrics, imports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="Slowest top-level imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to average over")
+    args = parser.parse_args()
+
+    runs = [_run_once() for _ in range(args.runs)]
+    ready = [metrics["ready_ms"] for metrics, _ in runs]
+    metrics, imports = runs[-1]
+
+    print(f"ready_ms: median {statistics.median(ready):.1f}  (runs: {', '.join(f'{r:.1f}' for r in ready)})")
+    print(f"target_ms: {settings.STARTUP_TARGET_MS}  within target: {statistics.median(ready) <= settings.STARTUP_TARGET_MS}")
+    print(f"phases_ms (last run): {metrics['phases_ms']}")
+    print(f"heavy SDKs imported before ready: {metrics['heavy_modules_at_ready'] or 'none'}")
+
+    # Depth is encoded as two spaces per level; keep main's direct imports and their children.
+    shallow = [(us, name.strip()) for us, name in imports if (len(name) - len(name.lstrip())) <= 5]
+    print(f"\nslowest imports under main (of {len(imports)} modules):")
+    for us, name in sorted(shallow, reverse=True)[:args.top]:
+        flag = "  <- heavy SDK" if name.split(".")[0] in {m.split(".")[0] for m in HEAVY_MODULES} else ""
+        print(f"  {us / 1000:8.1f} ms  {name}{flag}")
+
+
+if __name__ == "__main__":
+    main()
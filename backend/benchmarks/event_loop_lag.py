@@ -0,0 +1,182 @@
+"""
+Event-loop lag benchmark for the call path's database access.
+
+Run from the backend directory:
+    python -m benchmarks.event_loop_lag [--calls 50] [--turns 20] [--database-url sqlite:////tmp/lag.db]
+
+Simulates --calls concurrent calls on one event loop. Each one does the
+webhook's database work: it inserts a draft call log, writes --turns call_turns
+rows at speaking pace, then finalizes the call log. A ticker coroutine wakes
+every 20 ms, the outbound audio frame interval, and records how late each wake
+was. "sync" runs the queries inline on the loop with SessionLocal, as the call
+path did before. "async" runs them on the AsyncSession from
+config.async_database. The benchmark reports p50/p99/max loop lag and how many
+ticks were more than one frame late. The default is a fresh temporary sqlite
+database. Pass --database-url to run against Postgres instead.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+TICK_MS = 20
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _ticker(lags: list[float], stop: asyncio.Event) -> None:
+    interval = TICK_MS / 1000
+    expected = time.perf_counter() + interval
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, expected - time.perf_counter()))
+        now = time.perf_counter()
+        lags.append((now - expected) * 1000)
+        expected = max(expected + interval, now)
+
+
+def _turn_row(call_log_id, conversation_id: str, seq: int) -> dict:
+    return {
+        "call_log_id": call_log_id,
+        "conversation_id": conversation_id,
+        "seq": seq,
+        "revision": seq,
+        "speaker": "AI" if seq % 2 else "Patient",
+        "text": "Thanks, and how has the pain been since yesterday? " * 2,
+        "offset_ms": seq * 3000,
+        "interrupted": False,
+        "retracted": False,
+    }
+
+
+async def _sync_call(turns: int, pause: float) -> None:
+    from sqlalchemy import insert
+
+    from config.database import SessionLocal
+    from models.call_log import CallLog
+    from models.call_turn import CallTurn
+
+    conversation_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        draft = CallLog(conversation_id=conversation_id, transcript="", call_status="started")
+        db.add(draft)
+        db.commit()
+        call_log_id = draft.id
+    finally:
+        db.close()
+    for seq in range(turns):
+        await asyncio.sleep(pause * random.uniform(0.5, 1.5))
+        db = SessionLocal()
+        try:
+            db.execute(insert(CallTurn), [_turn_row(call_log_id, conversation_id, seq)])
+            db.commit()
+        finally:
+            db.close()
+    db = SessionLocal()
+    try:
+        call_log = db.query(CallLog).filter(CallLog.id == call_log_id).first()
+        call_log.call_status = "completed"
+        call_log.transcript = "done"
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _async_call(turns: int, pause: float) -> None:
+    from sqlalchemy import insert
+
+    from config.async_database import async_session
+    from models.call_log import CallLog
+    from models.call_turn import CallTurn
+
+    conversation_id = str(uuid.uuid4())
+    async with async_session() as db:
+        draft = CallLog(conversation_id=conversation_id, transcript="", call_status="started")
+        db.add(draft)
+        await db.commit()
+        call_log_id = draft.id
+    for seq in range(turns):
+        await asyncio.sleep(pause * random.uniform(0.5, 1.5))
+        async with async_session() as db:
+            await db.execute(insert(CallTurn), [_turn_row(call_log_id, conversation_id, seq)])
+            await db.commit()
+    async with async_session() as db:
+        call_log = await db.get(CallLog, call_log_id)
+        call_log.call_status = "completed"
+        call_log.transcript = "done"
+        await db.commit()
+
+
+async def _run(mode: str, calls: int, turns: int, pause: float) -> dict:
+    call = _sync_call if mode == "sync" else _async_call
+    lags: list[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(call(turns, pause) for _ in range(calls)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    if mode == "async":
+        from config.async_database import dispose_async_engine
+
+        await dispose_async_engine()
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        print(f"  {mode}: {len(errors)} calls failed, first error: {errors[0]}")
+    return {
+        "elapsed": elapsed,
+        "ticks": len(lags),
+        "p50": statistics.median(lags) if lags else 0.0,
+        "p99": _percentile(lags, 99),
+        "max": max(lags, default=0.0),
+        "late": sum(1 for lag in lags if lag > TICK_MS),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--pause-ms", type=int, default=200, help="mean gap between a call's turn writes")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary sqlite file")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir.name}/lag.db"
+
+    # Settings and both engines read DATABASE_URL at import time.
+    from config.database import Base, engine
+    from models import call_log, call_turn, consultation, patient  # noqa: F401 (registers tables)
+
+    Base.metadata.create_all(bind=engine)
+    print(f"{args.calls} calls x {args.turns} turns, {TICK_MS} ms ticker")
+    print(f"{'mode':<6} {'elapsed s':>9} {'ticks':>6} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} {'late':>5}")
+    try:
+        for mode in ("sync", "async"):
+            r = asyncio.run(_run(mode, args.calls, args.turns, args.pause_ms / 1000))
+            print(
+                f"{mode:<6} {r['elapsed']:>9.2f} {r['ticks']:>6} {r['p50']:>7.2f} "
+                f"{r['p99']:>7.2f} {r['max']:>7.2f} {r['late']:>5}"
+            )
+    finally:
+        engine.dispose()
+        if tmpdir:
+            tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
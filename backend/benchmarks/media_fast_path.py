@@ -0,0 +1,101 @@
+"""
+Frames/sec per core for classifying and de-duplicating inbound Twilio media events.
+
+Run from the backend directory:
+    python -m benchmarks.media_fast_path [--frames 200000] [--calls 50]
+
+"legacy" is the previous receive-loop work per frame: json.loads on the whole
+message, an f-string event key, and mark_event_processed on the original session
+store (one global lock and a rebuilt set; LegacySessionStore from
+benchmarks.session_state), not today's SessionStateStore. "fast path" is the
+current loop: orjson.loads plus the per-connection sequence high-water mark.
+Messages carry a real-size 20 ms payload and are spread across --calls
+interleaved sessions. Neither side includes the STT hand-off.
+"""
+import argparse
+import base64
+import json
+import os
+import time
+
+import orjson
+
+from benchmarks.session_state import LegacySessionStore
+
+
+def _messages(frames: int, calls: int) -> list[tuple[int, str]]:
+    payload = base64.b64encode(os.urandom(160)).decode("ascii")
+    messages = []
+    for i in range(frames):
+        call = i % calls
+        sequence = i // calls + 2
+        messages.append((call, json.dumps({
+            "event": "media",
+            "sequenceNumber": str(sequence),
+            "media": {"track": "inbound", "chunk": str(sequence - 1), "timestamp": str((sequence - 2) * 20), "payload": payload},
+            "streamSid": f"MZ{call:032d}",
+        }, separators=(",", ":"))))
+    return messages
+
+
+def _legacy(messages: list[tuple[int, str]], calls: int) -> int:
+    store = LegacySessionStore()
+    for call in range(calls):
+        store.start(f"conv-{call}", f"consult-{call}")
+    handled = 0
+    for call, message in messages:
+        data = json.loads(message)
+        event_type = data.get("event", "")
+        seq = str(data.get("sequenceNumber", ""))
+        media_fallback = ""
+        if event_type == "media" and not seq:
+            media_fallback = str(data.get("media", {}).get("timestamp", "")) or str(hash(data.get("media", {}).get("payload", "")))
+        event_key = f"MZ{call}:{event_type}:{seq or media_fallback}"
+        if not store.mark_event_processed(f"conv-{call}", event_key):
+            continue
+        if event_type == "media":
+            handled += len(data["media"]["payload"]) > 0
+    return handled
+
+
+def _fast(messages: list[tuple[int, str]], calls: int) -> int:
+    high_water = [0] * calls
+    handled = 0
+    for call, message in messages:
+        data = orjson.loads(message)
+        if data.get("event", "") != "media":
+            continue
+        seq = data.get("sequenceNumber")
+        if seq is not None:
+            sequence = int(seq)
+            if sequence <= high_water[call]:
+                continue
+            high_water[call] = sequence
+        handled += len(data["media"]["payload"]) > 0
+    return handled
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200000)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    messages = _messages(args.frames, args.calls)
+    results = {}
+    for name, func in (("legacy", _legacy), ("fast path", _fast)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            handled = func(messages, args.calls)
+            best = min(best, time.perf_counter() - started)
+        if handled != args.frames:
+            raise RuntimeError(f"{name} handled {handled} of {args.frames} frames")
+        results[name] = args.frames / best
+        print(f"{name:<10} {results[name]:>12,.0f} frames/s  ({best / args.frames * 1e6:.2f} us/frame)")
+    print(f"speedup    {results['fast path'] / results['legacy']:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
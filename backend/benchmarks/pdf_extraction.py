@@ -0,0 +1,56 @@
+"""
+Compares PDF text extraction backends on the bundled sample reports.
+
+Run from the backend directory:
+    python -m benchmarks.pdf_extraction [--repeat N] [extra.pdf ...]
+"""
+import argparse
+import asyncio
+import time
+
+from config.settings import ROOT_DIR
+from services.pdf_parser import _pdfium_page_texts, _pdfplumber_page_texts, count_pages, extract_text, extract_text_from_pdf
+from services.worker_pools import shutdown_pools
+
+SAMPLE_PDFS = [
+    ROOT_DIR / "john_doe_cardiology_report.pdf",
+    ROOT_DIR / "jane_smith_post_op.pdf",
+]
+
+
+def _time_call(func, repeat: int) -> tuple[float, int]:
+    chars = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        chars = len(func())
+    return (time.perf_counter() - started) * 1000 / repeat, chars
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="Additional PDFs to benchmark")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = SAMPLE_PDFS + list(args.pdfs)
+    print(f"{'document':40} {'pages':>5} {'backend':22} {'ms/doc':>9} {'chars':>7}")
+    for path in paths:
+        path = str(path)
+        pages = count_pages(path)
+        indices = list(range(pages))
+        cases = {
+            "pdfplumber": lambda: "\n\n".join(_pdfplumber_page_texts(path, indices)),
+            "pypdfium2": lambda: "\n\n".join(_pdfium_page_texts(path, indices)),
+            "engine (in-process)": lambda: extract_text_from_pdf(path),
+            "engine (process pool)": lambda: asyncio.run(extract_text(path)),
+        }
+        # Warm the process pool so its start-up cost is not billed to the first document.
+        asyncio.run(extract_text(path))
+        for name, func in cases.items():
+            ms, chars = _time_call(func, args.repeat)
+            print(f"{path.rsplit('/', 1)[-1][:40]:40} {pages:>5} {name:22} {ms:>9.2f} {chars:>7}")
+    shutdown_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Concurrency benchmark for SessionStateStore.mark_event_processed.
+
+Run from the backend directory:
+    python -m benchmarks.session_state [--sessions 500] [--events 6000] [--threads 1,8,32]
+
+Each simulated session marks --events sequential event ids. About 5% of the
+time it re-sends an id from 1-4000 events back, which is inside the store's
+dedupe window. Sessions are split across worker threads. "legacy" is the
+previous store: one global lock and a set that is rebuilt from arbitrary
+members once it passes 5000 ids. "current" is SessionStateStore: a per-session
+lock and a fixed dedupe window. The benchmark reports marks per second and how
+many re-sent duplicates were wrongly accepted. Throughput varies run to run, so
+compare a few runs.
+"""
+import argparse
+import random
+import threading
+import time
+from threading import Lock
+
+from services.session_state import SessionStateStore
+
+
+class LegacySessionStore:
+    """The original store, reduced to what mark_event_processed touches."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._sessions: dict[str, set[str]] = {}
+
+    def start(self, conversation_id: str, consultation_id: str) -> None:
+        with self._lock:
+            self._sessions[conversation_id] = set()
+
+    def mark_event_processed(self, conversation_id: str, event_id: str) -> bool:
+        with self._lock:
+            processed = self._sessions.get(conversation_id)
+            if processed is None:
+                return True
+            if event_id in processed:
+                return False
+            processed.add(event_id)
+            if len(processed) > 5000:
+                self._sessions[conversation_id] = set(list(processed)[-3000:])
+            return True
+
+
+def _workload(session: int, events: int, seed: int) -> tuple[list[str], int]:
+    rng = random.Random(seed * 100003 + session)
+    ids, duplicates = [], 0
+    for seq in range(events):
+        ids.append(f"MZ{session}:media:{seq}")
+        if seq > 10 and rng.random() < 0.05:
+            ids.append(f"MZ{session}:media:{seq - rng.randint(1, min(seq, 4000))}")
+            duplicates += 1
+    return ids, duplicates
+
+
+def _run(store, workloads: list[tuple[str, list[str]]], threads: int) -> tuple[float, int]:
+    accepted = [0] * threads
+
+    def worker(index: int) -> None:
+        mine = workloads[index::threads]
+        mark = store.mark_event_processed
+        count = 0
+        # Interleave this thread's sessions frame by frame, like concurrent calls.
+        longest = max((len(ids) for _, ids in mine), default=0)
+        for position in range(longest):
+            for conversation_id, ids in mine:
+                if position < len(ids):
+                    count += mark(conversation_id, ids[position])
+        accepted[index] = count
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started, sum(accepted)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--events", type=int, default=6000)
+    parser.add_argument("--threads", default="1,8,32")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workloads, unique, duplicates = [], 0, 0
+    for session in range(args.sessions):
+        ids, dupes = _workload(session, args.events, args.seed)
+        workloads.append((f"conv-{session}", ids))
+        unique += args.events
+        duplicates += dupes
+    total = unique + duplicates
+    print(f"{args.sessions} sessions, {total:,} marks ({duplicates:,} in-window duplicates)")
+    print(f"{'store':<10} {'threads':>7} {'marks/s':>12} {'dupes let through':>18}")
+
+    for threads in (int(t) for t in args.threads.split(",")):
+        for name, factory in (("legacy", LegacySessionStore), ("current", SessionStateStore)):
+            store = factory()
+            for conversation_id, _ in workloads:
+                store.start(conversation_id, conversation_id)
+            seconds, accepted = _run(store, workloads, threads)
+            print(f"{name:<10} {threads:>7} {total / seconds:>12,.0f} {accepted - unique:>18,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+STT request savings and CPU cost of the inbound VAD gate (InboundAudioGate).
+
+Run from the backend directory:
+    python -m benchmarks.vad [--seconds 300] [--talk-ratio 0.3] [--noise-rms 60]
+    python -m benchmarks.vad --audio call.wav   # 8kHz mono 16-bit WAV, or raw .ulaw
+
+By default it feeds a synthetic inbound call track in 20 ms frames, the way
+Twilio sends it. The track alternates patient speech with silence on a noisy
+line. Speech is voiced harmonics at a pitch that drifts, with syllable-rate
+amplitude modulation. Silence is low-level hiss at --noise-rms. The result
+prints InboundAudioGate.stats() and the per-frame VAD cost. Without the gate,
+every frame is one STT request. For synthetic audio it also prints how much of
+the true speech was sent to STT, and how many speech segments the VAD found
+versus how many there were.
+"""
+import argparse
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from services.voice_activity import InboundAudioGate, MULAW_BYTES_PER_MS
+
+SAMPLE_RATE = 8000
+FRAME_BYTES = 160 # 20 ms of 8kHz mulaw
+
+
+def linear_to_mulaw(samples: np.ndarray) -> bytes:
+    """G.711 mu-law encoding of int16 PCM (the inverse of utils.audio.mulaw_to_linear)."""
+    pcm = samples.astype(np.int32)
+    sign = np.where(pcm < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(pcm), 32635) + 0x84
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 7, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def synthetic_call(seconds: float, talk_ratio: float, noise_rms: float, seed: int) -> tuple[bytes, np.ndarray]:
+    """Returns (mulaw audio, per-frame ground truth: True where the patient is talking)."""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    pcm = rng.normal(0, noise_rms, total)
+    truth = np.zeros(total, dtype=bool)
+    position = int(rng.uniform(0.5, 2.0) * SAMPLE_RATE)
+    while position < total:
+        length = int(rng.uniform(0.8, 4.0) * SAMPLE_RATE)
+        end = min(total, position + length)
+        t = np.arange(end - position) / SAMPLE_RATE
+        pitch = rng.uniform(100, 220) * (1 + 0.08 * np.sin(2 * np.pi * rng.uniform(0.3, 1.5) * t))
+        phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+        voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+        syllables = 0.55 + 0.45 * np.sin(2 * np.pi * rng.uniform(3, 6) * t) ** 2
+        pcm[position:end] += voice * syllables * rng.uniform(2500, 7000)
+        truth[position:end] = True
+        # Pauses sized so speech takes about talk_ratio of the call.
+        pause = length * (1 - talk_ratio) / max(talk_ratio, 1e-3) * rng.uniform(0.5, 1.5)
+        position = end + int(pause)
+    pcm = np.clip(pcm, -32768, 32767).astype(np.int16)
+    usable = total - total % FRAME_BYTES
+    frame_truth = truth[:usable].reshape(-1, FRAME_BYTES).mean(axis=1) > 0.5
+    return linear_to_mulaw(pcm[:usable]), frame_truth
+
+
+def load_audio(path: Path) -> bytes:
+    """Raw mulaw (.ulaw/.mulaw/.raw) or an 8kHz mono 16-bit WAV, as mulaw bytes."""
+    if path.suffix.lower() != ".wav":
+        return path.read_bytes()
+    with wave.open(str(path)) as wav:
+        if wav.getframerate() != SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise SystemExit(f"{path}: expected 8kHz mono 16-bit WAV")
+        return linear_to_mulaw(np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2"))
+
+
+def _segments(flags) -> int:
+    count, previous = 0, False
+    for flag in flags:
+        count += flag and not previous
+        previous = flag
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", help="recorded inbound track instead of synthetic audio")
+    parser.add_argument("--seconds", type=float, default=300)
+    parser.add_argument("--talk-ratio", type=float, default=0.3, help="share of the call the patient is talking")
+    parser.add_argument("--noise-rms", type=float, default=60, help="line noise level on the 16-bit scale")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    truth = None
+    if args.audio:
+        audio = load_audio(Path(args.audio))
+    else:
+        audio, truth = synthetic_call(args.seconds, args.talk_ratio, args.noise_rms, args.seed)
+    frames = [audio[i:i + FRAME_BYTES] for i in range(0, len(audio) - FRAME_BYTES + 1, FRAME_BYTES)]
+
+    gate = InboundAudioGate()
+    speaking, sent_bytes = [], 0
+    started = time.perf_counter()
+    for frame in frames:
+        requests, _ = gate.push(frame)
+        sent_bytes += sum(len(request) for request in requests)
+        speaking.append(gate.vad.speaking)
+    elapsed = time.perf_counter() - started
+
+    stats = gate.stats()
+    print(f"{len(frames) * 20 / 1000:.0f}s of audio, {len(frames):,} frames")
+    print(f"gate stats: {stats}")
+    print(f"STT requests: {stats['requests_out']:,} with the gate vs {len(frames):,} without")
+    print(f"audio sent to STT: {sent_bytes / MULAW_BYTES_PER_MS / 1000:.1f}s of {len(frames) * 20 / 1000:.1f}s")
+    print(f"VAD + gate cost: {stats['cpu_ms'] * 1000 / max(1, len(frames)):.1f} us/frame ({elapsed * 1000:.0f} ms total)")
+    if truth is not None:
+        truth = truth[:len(speaking)]
+        flags = np.array(speaking)
+        covered = (flags & truth).sum() / max(1, truth.sum())
+        print(f"speech frames passed to STT: {100 * covered:.1f}%")
+        print(f"speech segments: {_segments(flags)} detected, {_segments(truth)} in the audio")
+
+
+if __name__ == "__main__":
+    main()
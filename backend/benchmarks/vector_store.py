@@ -0,0 +1,159 @@
+"""
+Recall and latency of the vector store backends on synthetic chunk embeddings.
+
+Run from the backend directory:
+    python -m benchmarks.vector_store [--sizes 10000,100000,1000000] [--queries 100] [--pinecone]
+
+Vectors are random 768-d embeddings grouped 10 chunks per consultation; queries are
+noisy copies of stored chunks. Recall@k is measured against exact cosine top-k,
+both unfiltered and filtered to the query chunk's consultation (the call-path query).
+The local backends run in a temporary directory (1M float32 chunks need ~3 GB of
+disk). --pinecone also loads each size into a throwaway namespace of the configured
+index and deletes it afterwards.
+"""
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from config.settings import settings
+from services.local_vector_store import LocalVectorStore
+
+CHUNKS_PER_CONSULTATION = 10
+BLOCK = 10000
+
+
+def _block(seed: int, start: int, stop: int, dimension: int) -> np.ndarray:
+    """Deterministic block of vectors, so nothing needs the whole corpus in memory."""
+    return np.random.default_rng((seed, start)).standard_normal((stop - start, dimension), dtype=np.float32)
+
+
+def _records(vectors: np.ndarray, start: int) -> list[dict]:
+    return [
+        {
+            "id": f"c{(start + i) // CHUNKS_PER_CONSULTATION}_chunk_{(start + i) % CHUNKS_PER_CONSULTATION}",
+            "values": vector,
+            "metadata": {"consultation_id": f"c{(start + i) // CHUNKS_PER_CONSULTATION}", "row": start + i},
+        }
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def _exact_top_k(seed: int, size: int, dimension: int, queries: np.ndarray, k: int) -> list[list[int]]:
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((len(queries), k), dtype=np.int64)
+    for start in range(0, size, BLOCK):
+        stop = min(start + BLOCK, size)
+        block = _block(seed, start, stop, dimension)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        scores = queries @ block.T
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, stop), scores.shape)], axis=1)
+        top = np.argsort(-merged_scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, top, axis=1)
+        best_rows = np.take_along_axis(merged_rows, top, axis=1)
+    return best_rows.tolist()
+
+
+def _make_queries(seed: int, size: int, dimension: int, count: int) -> tuple[np.ndarray, list[int]]:
+    rng = np.random.default_rng(seed + 1)
+    rows = rng.choice(size, size=count, replace=False).tolist()
+    queries = np.stack([_block(seed, (row // BLOCK) * BLOCK, min((row // BLOCK + 1) * BLOCK, size), dimension)[row % BLOCK] for row in rows])
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    queries += rng.standard_normal(queries.shape, dtype=np.float32) * 0.03
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries, rows
+
+
+def _measure(store, queries: np.ndarray, query_rows: list[int], truth: list[list[int]], k: int) -> dict:
+    latencies, filtered_latencies, recalls, filtered_recalls = [], [], [], []
+    for query, row, expected in zip(queries, query_rows, truth):
+        started = time.perf_counter()
+        matches = store.query_similar_chunks(query.tolist(), top_k=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len({int(m["row"]) for m in matches} & set(expected)) / k)
+
+        consultation = row // CHUNKS_PER_CONSULTATION
+        started = time.perf_counter()
+        matches = store.query_similar_chunks(query.tolist(), consultation_id=f"c{consultation}", top_k=k)
+        filtered_latencies.append((time.perf_counter() - started) * 1000)
+        filtered_recalls.append(row in {int(m["row"]) for m in matches})
+
+    def _p(values, pct):
+        return sorted(values)[min(len(values) - 1, int(pct * len(values)))]
+
+    return {
+        "recall": statistics.mean(recalls),
+        "p50_ms": _p(latencies, 0.5),
+        "p95_ms": _p(latencies, 0.95),
+        "filtered_hit": statistics.mean(filtered_recalls),
+        "filtered_p50_ms": _p(filtered_latencies, 0.5),
+    }
+
+
+def _load(store, seed: int, size: int, dimension: int, batch: int, as_lists: bool = False) -> float:
+    started = time.perf_counter()
+    for start in range(0, size, BLOCK):
+        stop = min(start + BLOCK, size)
+        vectors = _block(seed, start, stop, dimension)
+        # The local store takes array rows directly; Pinecone needs JSON-serializable lists.
+        records = _records(vectors.tolist() if as_lists else vectors, start)
+        for offset in range(0, len(records), batch):
+            if not store.upsert_chunks(records[offset:offset + batch], batch_size=batch):
+                raise RuntimeError(f"upsert failed at row {start + offset}")
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--dimension", type=int, default=settings.VECTOR_DIMENSION)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--pinecone", action="store_true", help="Also benchmark the configured Pinecone index")
+    args = parser.parse_args()
+
+    print(f"{'backend':<12} {'chunks':>9} {'load s':>8} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'filt hit':>9} {'filt p50':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        queries, query_rows = _make_queries(args.seed, size, args.dimension, min(args.queries, size))
+        truth = _exact_top_k(args.seed, size, args.dimension, queries, args.top_k)
+
+        backends = [("local-f32", False), ("local-int8", True)]
+        for name, quantize in backends:
+            work_dir = tempfile.mkdtemp(prefix="vector-bench-")
+            try:
+                store = LocalVectorStore(work_dir, dimension=args.dimension, quantize=quantize, initial_capacity=size)
+                load_seconds = _load(store, args.seed, size, args.dimension, batch=1000)
+                result = _measure(store, queries, query_rows, truth, args.top_k)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            _print(name, size, load_seconds, result)
+
+        if args.pinecone:
+            from services.pinecone_service import PineconeService
+
+            store = PineconeService(namespace=f"bench-{uuid.uuid4().hex[:8]}")
+            try:
+                load_seconds = _load(store, args.seed, size, args.dimension, batch=settings.BULK_UPSERT_BATCH_SIZE, as_lists=True)
+                # Serverless indexes are eventually consistent; wait until the namespace is queryable.
+                time.sleep(10)
+                result = _measure(store, queries, query_rows, truth, args.top_k)
+            finally:
+                store.index.delete(delete_all=True, namespace=store.namespace)
+            _print("pinecone", size, load_seconds, result)
+
+
+def _print(name: str, size: int, load_seconds: float, result: dict) -> None:
+    print(
+        f"{name:<12} {size:>9} {load_seconds:>8.1f} {result['recall']:>9.3f} {result['p50_ms']:>8.2f} "
+        f"{result['p95_ms']:>8.2f} {result['filtered_hit']:>9.3f} {result['filtered_p50_ms']:>9.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Bulk consultation ingestion from the command line.
+
+Run from the backend directory:
+    python -m cli.bulk_ingest --manifest clinic/manifest.csv
+    python -m cli.bulk_ingest --archive clinic.zip --report report.json
+
+Manifest columns: filename (relative to the manifest), patient_name, phone_number,
+followup_days or followup_datetime, optional doctor_id.
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from config.database import init_db
+from models import consultation, patient  # noqa: F401  (register tables)
+from services.bulk_ingestion import BulkIngestor, extract_archive, prepare_documents, read_manifest
+from services.worker_pools import shutdown_pools
+
+
+def _print_progress(progress: dict) -> None:
+    print(
+        f"[{progress['processed']}/{progress['total']}] "
+        f"{progress['documents_per_second']:.2f} docs/s, {progress['chunks_per_second']:.1f} chunks/s "
+        f"({progress['failed']} failed)",
+        flush=True,
+    )
+
+
+async def _run(args) -> dict:
+    if args.archive:
+        work_dir = Path(tempfile.mkdtemp(prefix="bulk-ingest-"))
+        try:
+            documents = extract_archive(Path(args.archive), work_dir)
+            return await BulkIngestor().run(documents, on_progress=_print_progress)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    manifest_path = Path(args.manifest)
+    rows = read_manifest(manifest_path.read_bytes(), manifest_path.name)
+
+    def _resolve(source: str) -> Path | None:
+        path = (manifest_path.parent / source).resolve()
+        return path if path.is_file() else None
+
+    documents = prepare_documents(rows, _resolve)
+    return await BulkIngestor().run(documents, on_progress=_print_progress)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="CSV or JSON manifest; PDFs are resolved relative to it")
+    source.add_argument("--archive", help="Zip with PDFs and manifest.csv/manifest.json")
+    parser.add_argument("--report", help="Write the full JSON report to this path")
+    args = parser.parse_args()
+
+    init_db()
+    try:
+        report = asyncio.run(_run(args))
+    finally:
+        shutdown_pools()
+
+    for result in report["results"]:
+        if result["status"] == "failed":
+            print(f"FAILED {result['filename']}: {result['error'].get('error')} - {result['error'].get('message')}")
+    print(
+        f"Ingested {report['succeeded']}/{report['total']} documents, {report['chunks']} chunks "
+        f"in {report['elapsed_seconds']:.1f}s ({report['documents_per_second']:.2f} docs/s, "
+        f"{report['chunks_per_second']:.1f} chunks/s)"
+    )
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
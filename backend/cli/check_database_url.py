@@ -0,0 +1,60 @@
+"""
+Checks that DATABASE_URL also works for the async call-path engine.
+
+Run from the backend directory:
+    python -m cli.check_database_url ["postgresql+pg8000://user:pass@/db?unix_sock=/cloudsql/.../.s.PGSQL.5432"]
+
+Defaults to the configured DATABASE_URL. Prints the URL config.async_database
+derives and the connect arguments its dialect would pass to the driver, and
+exits non-zero if a Postgres URL still carries parameters libpq (psycopg) does
+not accept, such as pg8000's unix_sock.
+"""
+import argparse
+import sys
+
+from sqlalchemy.engine import make_url
+
+from config.async_database import to_async_url
+
+# Connection keywords libpq accepts; psycopg passes the rest through and the connect fails.
+LIBPQ_PARAMS = {
+    "host", "hostaddr", "port", "dbname", "user", "password", "passfile", "require_auth",
+    "channel_binding", "connect_timeout", "client_encoding", "options", "application_name",
+    "fallback_application_name", "keepalives", "keepalives_idle", "keepalives_interval",
+    "keepalives_count", "tcp_user_timeout", "replication", "gssencmode", "sslmode",
+    "sslnegotiation", "sslcompression", "sslcert", "sslkey", "sslpassword", "sslcertmode",
+    "sslrootcert", "sslcrl", "sslcrldir", "sslsni", "requirepeer", "ssl_min_protocol_version",
+    "ssl_max_protocol_version", "krbsrvname", "gsslib", "gssdelegation", "service",
+    "target_session_attrs", "load_balance_hosts",
+}
+
+
+def check(url: str) -> list[str]:
+    """Returns the problems with url's async form (empty when it is usable)."""
+    async_url = make_url(to_async_url(url))
+    print(f"async url: {async_url.render_as_string(hide_password=True)}")
+    if not async_url.drivername.startswith("postgresql"):
+        return []
+    _, connect_args = async_url.get_dialect()().create_connect_args(async_url)
+    shown = {key: ("***" if key == "password" else value) for key, value in connect_args.items()}
+    print(f"connect args: {shown}")
+    return [f"libpq does not accept connect parameter {key!r}" for key in connect_args if key not in LIBPQ_PARAMS]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url", nargs="?", default=None, help="defaults to settings.DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.url is None:
+        from config.database import database_url
+        args.url = database_url
+
+    problems = check(args.url)
+    for problem in problems:
+        print(problem)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
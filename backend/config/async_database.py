@@ -0,0 +1,94 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from config.database import database_url
+from config.settings import settings
+
+# Sync driver -> asyncio driver for the same database.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+psycopg",
+    "postgresql": "postgresql+psycopg",
+    "postgresql+pg8000": "postgresql+psycopg",
+    "postgresql+psycopg2": "postgresql+psycopg",
+}
+
+_engine: AsyncEngine | None = None
+_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+
+
+def _pg8000_to_libpq(query: dict) -> dict:
+    """
+    Rewrites pg8000 connect parameters as libpq ones for psycopg. The Cloud SQL
+    deploy passes unix_sock=<dir>/.s.PGSQL.<port>; libpq wants host=<dir> and port.
+    """
+    query = dict(query)
+    unix_sock = query.pop("unix_sock", None)
+    if unix_sock:
+        socket_dir, _, socket_name = unix_sock.rpartition("/")
+        query["host"] = socket_dir or "/"
+        port = socket_name.rpartition(".")[2]
+        if socket_name.startswith(".s.PGSQL.") and port.isdigit():
+            query.setdefault("port", port)
+    timeout = query.pop("timeout", None)
+    if timeout:
+        query.setdefault("connect_timeout", timeout)
+    query.pop("tcp_keepalive", None) # libpq keepalives are on by default
+    return query
+
+
+def to_async_url(url: str) -> str:
+    """Maps DATABASE_URL onto the matching asyncio driver (aiosqlite locally, psycopg async on Postgres)."""
+    if "://" not in url:
+        return url
+    parsed = make_url(url)
+    driver = parsed.drivername
+    async_url = parsed.set(drivername=ASYNC_DRIVERS.get(driver, driver))
+    if driver == "postgresql+pg8000":
+        async_url = async_url.set(query=_pg8000_to_libpq(parsed.query))
+    return async_url.render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Engine for the real-time call path, created on first use so the async driver is
+    not imported at app startup. Queries await the driver instead of blocking the
+    event loop that paces every call's audio.
+    """
+    global _engine, _sessionmaker
+    if _engine is None:
+        url = to_async_url(database_url)
+        engine_kwargs = {"pool_pre_ping": True}
+        if url.startswith("sqlite"):
+            # sqlite's busy timeout, so concurrent call writes wait instead of failing.
+            engine_kwargs["connect_args"] = {"timeout": settings.DB_POOL_TIMEOUT_SECONDS}
+        else:
+            engine_kwargs.update(
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+                pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+                connect_args={
+                    "connect_timeout": settings.DB_CONNECT_TIMEOUT_SECONDS,
+                    "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}",
+                },
+            )
+        _engine = create_async_engine(url, **engine_kwargs)
+        _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False, autoflush=False)
+    return _engine
+
+
+def async_session() -> AsyncSession:
+    """New AsyncSession; use as `async with async_session() as db:`."""
+    if _sessionmaker is None:
+        get_async_engine()
+    return _sessionmaker()
+
+
+async def dispose_async_engine() -> None:
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _sessionmaker = None
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
@@ -27,3 +27,37 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def ensure_columns():
+    """
+    Adds nullable columns declared on models but missing from existing tables, plus
+    the indexes declared on them (e.g. content_hash), so upgraded databases get the
+    same lookups as fresh ones. create_all only creates new tables, and the app has
+    no migration tool.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            # Includes indexes on columns an earlier startup added without them.
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                try:
+                    with conn.begin_nested():
+                        index.create(bind=conn, checkfirst=True)
+                except Exception as e:
+                    print(f"Failed to create index {index.name} on {table.name}: {e}")
+
+def init_db():
+    """Creates missing tables/columns. Called from the app lifespan, not at import time."""
+    Base.metadata.create_all(bind=engine)
+    ensure_columns()
@@ -13,7 +13,84 @@ class Settings(BaseSettings):
     
     # Database Settings
     DATABASE_URL: str = "sqlite:///./test.db"
+    # Async engine used on the call path (config/async_database.py)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 5 # wait for a pooled connection (sqlite: busy timeout)
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_CONNECT_TIMEOUT_SECONDS: int = 5
+    DB_STATEMENT_TIMEOUT_MS: int = 5000
     
+    # Cold start: time from importing main to the app accepting requests
+    STARTUP_TARGET_MS: int = 1500
+    STARTUP_WARM_CLIENTS: bool = True # warm cloud clients in the background after startup
+
+    # Worker pools (0 = one process per CPU)
+    CPU_WORKER_PROCESSES: int = 2
+
+    # Consultation ingestion
+    INGESTION_ASYNC_DEFAULT: bool = False
+    INGESTION_WORKERS: int = 2
+    INGESTION_MAX_PENDING: int = 100
+    INGESTION_SPOOL_DIR: str = "uploads"
+    MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024
+    UPLOAD_READ_CHUNK_BYTES: int = 1024 * 1024
+    # Resumable upload chunk size; GCS requires a multiple of 256 KiB.
+    GCS_UPLOAD_CHUNK_BYTES: int = 8 * 1024 * 1024
+
+    # Duplicate upload detection (by PDF content hash, per patient)
+    UPLOAD_DEDUPE_ENABLED: bool = True
+    UPLOAD_DEDUPE_DISABLED_DOCTORS: str = "" # comma-separated doctor ids that always re-ingest
+
+    # Bulk ingestion
+    BULK_MAX_ARCHIVE_BYTES: int = 1024 * 1024 * 1024
+    BULK_PARSE_CONCURRENCY: int = 4 # documents parsed/uploaded ahead of the embed stage
+    BULK_PIPELINE_DEPTH: int = 32 # parsed documents buffered for cross-document embedding batches
+    BULK_UPSERT_BATCH_SIZE: int = 100
+
+    # Chunking (token estimates, ~4 characters per token)
+    CHUNK_MAX_TOKENS: int = 256
+    CHUNK_OVERLAP_TOKENS: int = 32
+
+    # PDF text extraction
+    PDF_TEXT_BACKEND: str = "pypdfium2" # pypdfium2 (fast, pdfplumber fallback per page) or pdfplumber
+    PDF_MIN_PAGE_CHARS: int = 20 # pages with fewer alphanumerics are retried with pdfplumber
+    PDF_PAGES_PER_TASK: int = 8
+    PDF_EXTRACT_TIMEOUT_SECONDS: float = 60
+
+    # Live calls
+    CALL_PREWARM_ENABLED: bool = True # build the agent + greeting audio when Twilio fetches TwiML
+    CALL_PREWARM_TTL_SECONDS: float = 60 # drop pre-warmed sessions whose media stream never opens
+    LLM_STREAMING_TURNS: bool = True # stream Gemini replies and synthesize them sentence by sentence
+    LLM_TIMEOUT_SECONDS: float = 20 # max wait for Gemini's reply (streaming: first piece and each gap between pieces)
+    BARGE_IN_ENABLED: bool = True # stop agent speech (and its pending LLM/TTS work) when the patient talks over it
+    STT_STREAM_ROTATE_SECONDS: float = 240 # open the next STT stream this far into the current one (Google caps streams at ~5 min)
+    STT_STREAM_MAX_SECONDS: float = 280 # retire the old stream by now even if the patient is mid-utterance
+    STT_REPLAY_MS: int = 1500 # recent audio replayed into each new stream so nothing falls in the handoff gap
+    STT_QUEUE_MAX_CHUNKS: int = 500 # per-stream backlog (~10s of 20ms frames); oldest audio is dropped beyond it
+    STT_ENDPOINTING_ENABLED: bool = True # start turns from stable interim results instead of waiting for Google's final
+    STT_ENDPOINT_SILENCE_MS: int = 500 # inbound silence after a stable interim that ends the utterance
+    STT_ENDPOINT_MIN_STABILITY: float = 0.8 # minimum interim stability to endpoint on
+    STT_ENDPOINT_RESUME_MS: int = 200 # renewed speech that cancels a speculative turn
+    STT_VAD_ENABLED: bool = True # gate inbound audio with local VAD before it goes to Google STT
+    STT_COALESCE_MS: int = 100 # merge 20ms Twilio frames into requests of this length
+    STT_VAD_MIN_SPEECH_MS: int = 60 # voiced audio needed before a speech segment starts
+    STT_VAD_HANGOVER_MS: int = 800 # trailing silence still sent after speech so Google can finalize
+    STT_VAD_PREROLL_MS: int = 200 # audio kept from before a speech onset so the first word is not clipped
+    STT_KEEPALIVE_MS: int = 3000 # during long silence send one padding request this often to keep the stream open
+    BARGE_IN_ON_VAD: bool = False # also barge in on VAD speech onset (faster than interim results, noise-prone)
+    STT_VOICE_RMS: float = 300 # inbound frame RMS (16-bit scale) counted as speech by the silence timer
+    OUTBOUND_AUDIO_LEAD_MS: int = 60 # how far ahead of real time outbound audio frames are sent to Twilio
+    PHRASE_CACHE_ENABLED: bool = True # serve fixed agent phrases from pre-rendered audio
+    PHRASE_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    PHRASE_CACHE_PATH: str = "" # e.g. "cache/phrases"; empty keeps rendered audio in-process only
+    PHRASE_CACHE_PRERENDER: bool = True # render fixed phrases during startup warm-up
+
+    CALL_TURN_FLUSH_MS: int = 500 # write-behind interval for call_turns rows
+    CALL_TURN_BATCH_SIZE: int = 50 # flush early once this many rows are waiting
+    CALL_TURN_BUFFER_MAX: int = 10000 # rows kept for retry while the database is unavailable
+    CALL_RECOVERY_AFTER_MINUTES: int = 30 # "started" calls older than this are rebuilt from call_turns at startup
+
     # Twilio Settings
     TWILIO_ACCOUNT_SID: str = ""
     TWILIO_AUTH_TOKEN: str = ""
@@ -27,11 +104,26 @@ class Settings(BaseSettings):
     
     # Vertex AI Settings
     VERTEX_AI_MODEL: str = "gemini-2.5-flash"
+    EMBEDDING_MODEL: str = "text-embedding-004"
+    # text-embedding-004 accepts up to 250 inputs / 20k tokens per request.
+    EMBEDDING_BATCH_SIZE: int = 250
+    EMBEDDING_BATCH_MAX_TOKENS: int = 20000
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_MAX_RETRIES: int = 3
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10000
+    EMBEDDING_CACHE_PATH: str = "" # e.g. "cache/embeddings.sqlite3"; empty keeps the cache in-process only
     
     # Pinecone
     PINECONE_API_KEY: str = ""
     PINECONE_ENV: str = ""
 
+    # Vector store
+    VECTOR_STORE_BACKEND: str = "pinecone" # pinecone (managed) or local (memory-mapped NumPy arrays)
+    VECTOR_STORE_PATH: str = "vector_store" # local backend directory, relative to the repository root
+    VECTOR_STORE_QUANTIZE: bool = False # local backend: int8 vectors with per-row scales (4x smaller)
+    VECTOR_DIMENSION: int = 768 # text-embedding-004
+
     # Hostname (for Twilio Webhooks)
     HOST_DOMAIN: str = "" # e.g. "my-app-xyz.a.run.app"
 
@@ -1,19 +1,76 @@
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, Response
 from config.settings import settings
-from config.database import engine, Base
-from routes import followups, twilio_webhook, patient_routes, upload
+from config.database import init_db
+from config.async_database import dispose_async_engine
+from routes import followups, twilio_webhook, patient_routes, upload, metrics, ingestion_jobs
+from agents.prompts import AGENT_PHRASES, GREETING_CARRIER
 from services import scheduler
+from services.clients import client_registry
+from services.call_turns import call_turn_writer, recover_call_transcripts
+from services.ingestion_queue import ingestion_queue
+from services.startup_metrics import startup_metrics
+from services.text_to_speech import TTSService
+from services.worker_pools import shutdown_pools
+
+# Heavy cloud SDKs are imported lazily by services/clients.py, so this stays cheap.
+startup_metrics.begin(_import_started)
+startup_metrics.record("imports", _import_started)
+
+async def _warm_clients():
+    started = time.perf_counter()
+    await client_registry.startup()
+    startup_metrics.record("client_warmup", started)
+    if settings.PHRASE_CACHE_ENABLED and settings.PHRASE_CACHE_PRERENDER:
+        started = time.perf_counter()
+        try:
+            await TTSService(client=client_registry.get_tts_client()).prerender([*AGENT_PHRASES.values(), GREETING_CARRIER])
+        except Exception as e:
+            print(f"Phrase pre-render skipped: {e}")
+        startup_metrics.record("phrase_prerender", started)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create database tables (off the import path so importing main stays side-effect free)
+    started = time.perf_counter()
+    await asyncio.to_thread(init_db)
+    startup_metrics.record("init_db", started)
+    await call_turn_writer.start()
+    recovery_task = asyncio.create_task(asyncio.to_thread(recover_call_transcripts))
+
+    # Cloud clients are created once and shared by every request and call. Warming
+    # (vertexai.init, bucket/index checks) runs after the app starts accepting requests;
+    # anything not warmed yet is created on first use.
+    app.state.clients = client_registry
+    warmup_task = asyncio.create_task(_warm_clients()) if settings.STARTUP_WARM_CLIENTS else None
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    await ingestion_queue.start()
+    startup_metrics.record("ingestion_queue", started)
+    startup_metrics.mark_ready()
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    await asyncio.gather(recovery_task, return_exceptions=True)
+    await ingestion_queue.stop()
+    await call_turn_writer.stop()
+    await dispose_async_engine()
+    shutdown_pools()
+    await client_registry.shutdown()
 
 app = FastAPI(
     title=settings.APP_NAME,
-    description="Backend for AI Patient Follow-up Agent hosted on Google Cloud Run"
+    description="Backend for AI Patient Follow-up Agent hosted on Google Cloud Run",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -30,6 +87,8 @@ app.include_router(patient_routes.router)
 app.include_router(twilio_webhook.router)
 app.include_router(scheduler.router)
 app.include_router(upload.router)
+app.include_router(metrics.router)
+app.include_router(ingestion_jobs.router)
 
 FAVICON_PATH = Path(__file__).resolve().parents[1] / "frontend" / "src" / "app" / "favicon.ico"
 
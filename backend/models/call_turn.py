@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Uuid, Boolean
+from sqlalchemy.sql import func
+from config.database import Base
+import uuid
+
+class CallTurn(Base):
+    """
+    Append-only transcript rows for a call. A line that is later edited (marked as
+    interrupted) or retracted (a cancelled speculative turn) gets a new row with the
+    same seq and a higher revision; the transcript is the latest revision of each seq.
+    """
+    __tablename__ = "call_turns"
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4, index=True)
+    call_log_id = Column(Uuid, ForeignKey("call_logs.id"), index=True, nullable=True)
+    conversation_id = Column(String, index=True)
+    seq = Column(Integer) # line position in the transcript
+    revision = Column(Integer) # per-call write order
+    speaker = Column(String) # "AI" or "Patient"
+    text = Column(String)
+    offset_ms = Column(Integer) # since the agent session started
+    response_ms = Column(Integer, nullable=True) # AI lines: time since the patient line they answer
+    interrupted = Column(Boolean, default=False)
+    retracted = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
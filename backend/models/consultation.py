@@ -13,6 +13,10 @@ class Consultation(Base):
     doctor_id = Column(String)
     pdf_url = Column(String)
     summary_text = Column(String)
+    content_hash = Column(String, index=True) # sha256 of the uploaded PDF
+    vector_consultation_id = Column(Uuid, nullable=True) # consultation whose vectors hold this PDF's chunks, when reused
+    rag_context = Column(String, nullable=True) # top chunks for the call prompt, computed at ingestion
+    rag_context_version = Column(String, nullable=True) # see services.rag_context.rag_context_version
     follow_up_date = Column(DateTime(timezone=True))
     status = Column(String, default="pending") # pending, calling, completed, escalated
     created_at = Column(DateTime(timezone=True), server_default=func.now())
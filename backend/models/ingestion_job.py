@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime, JSON, Uuid
+from sqlalchemy.sql import func
+from config.database import Base
+import uuid
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4, index=True)
+    status = Column(String, default="queued") # queued, running, succeeded, failed
+    filename = Column(String)
+    pdf_path = Column(String) # local spool copy of the uploaded PDF
+    payload = Column(JSON) # validated upload form fields
+    stages = Column(JSON, default=dict) # stage name -> status/timing
+    consultation_id = Column(Uuid, nullable=True)
+    error = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True) # e.g. dedupe decision
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,20 @@
+import uuid
+import asyncio
+from fastapi import APIRouter, HTTPException
+
+from services.ingestion_queue import ingestion_queue
+
+router = APIRouter(prefix="/ingestion-jobs", tags=["upload"])
+
+@router.get("/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """Reports overall status plus per-stage status and timing for a queued upload."""
+    try:
+        job_uuid = uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid UUID format")
+
+    job = await asyncio.to_thread(ingestion_queue.get_job, job_uuid)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job
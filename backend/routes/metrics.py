@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+
+from services.call_metrics import call_metrics
+from services.embedding_cache import embedding_cache
+from services.phrase_cache import phrase_cache
+from services.startup_metrics import startup_metrics
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/embedding-cache")
+def get_embedding_cache_stats():
+    """Hit/miss/eviction counters for the embedding cache."""
+    if not embedding_cache:
+        return {"enabled": False}
+    return {"enabled": True, **embedding_cache.stats()}
+
+@router.get("/startup")
+def get_startup_metrics():
+    """Cold-start timings and which heavy SDKs were imported before the app was ready."""
+    return startup_metrics.snapshot()
+
+@router.get("/calls")
+def get_call_metrics():
+    """Live-call counters (pre-warm hits/misses) and latency percentiles."""
+    return call_metrics.stats()
+
+@router.get("/phrase-cache")
+def get_phrase_cache_stats():
+    """Hit/miss/eviction counters for pre-rendered agent phrase audio."""
+    if not phrase_cache:
+        return {"enabled": False}
+    return {"enabled": True, **phrase_cache.stats()}
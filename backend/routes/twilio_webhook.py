@@ -1,25 +1,38 @@
 from fastapi import APIRouter, WebSocket, Request, Response
-import json
 import asyncio
 import time
+import orjson
 import uuid
 from config.settings import settings
 from services.gemini_service import GeminiService
+from services.call_metrics import call_metrics
+from services.call_prewarm import call_prewarmer
+from services.outbound_audio import OutboundAudioStream
 from agents.triage_logic import TriageAnalyzer
 from services.escalation_service import notify_doctor
 from services.session_state import session_state_store
-from config.database import SessionLocal
+from services.call_turns import call_turn_writer
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from config.async_database import async_session
 from models.consultation import Consultation
 from models.call_log import CallLog
 
 router = APIRouter(prefix="/twilio", tags=["twilio"])
 
+# Call finalizations in flight, held so a cancelled handler's shielded task is not garbage collected.
+_finalizing: set[asyncio.Task] = set()
+
 @router.post("/twiml")
 async def generate_twiml(request: Request, consultation_id: str):
     """
     Endpoint Twilio hits when the call connects.
-    Returns TwiML instructing Twilio to start a WebSocket Media Stream.
+    Returns TwiML instructing Twilio to start a WebSocket Media Stream, and starts
+    pre-warming the agent so the greeting is ready when the stream opens.
     """
+    if settings.CALL_PREWARM_ENABLED:
+        call_prewarmer.prewarm(consultation_id, registry=getattr(request.app.state, "clients", None))
+
     wss_url = f"wss://{settings.HOST_DOMAIN}/twilio/stream/{consultation_id}"
     
     twiml = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -47,135 +60,56 @@ async def websocket_endpoint(websocket: WebSocket, consultation_id: str):
 
     session_state_store.start(conversation_id=conversation_id, consultation_id=str(consultation_id))
 
-    def _load_consultation(db):
-        try:
-            consultation_uuid = uuid.UUID(consultation_id)
-        except ValueError:
-            consultation_uuid = None
-        if consultation_uuid is not None:
-            return db.query(Consultation).filter(Consultation.id == consultation_uuid).first(), consultation_uuid
-        return db.query(Consultation).filter(Consultation.id == consultation_id).first(), consultation_uuid
-
-    db = SessionLocal()
     try:
-        consultation, consultation_uuid = _load_consultation(db)
-        draft_log = CallLog(
-            conversation_id=conversation_id,
-            consultation_id=consultation.id if consultation else consultation_uuid,
-            transcript="",
-            ai_summary="",
-            urgency_level="low",
-            call_duration=0,
-            call_status=call_status,
-            dashboard_alert=False,
-        )
-        db.add(draft_log)
-        db.commit()
-        db.refresh(draft_log)
-        call_log_id = draft_log.id
-    except Exception as e:
-        print(f"Failed to create draft call log for consultation {consultation_id}: {e}")
-        db.rollback()
-    finally:
-        db.close()
+        consultation_uuid = uuid.UUID(consultation_id)
+    except ValueError:
+        consultation_uuid = None
 
-    async def persist_transcript_checkpoint(transcript: str):
-        session_state_store.update_transcript(conversation_id, transcript)
-        if not call_log_id:
-            return
-        db_local = SessionLocal()
+    async def _load_consultation(db):
+        # Patient is eager-loaded: lazy loads cannot run on an AsyncSession.
+        query = select(Consultation).options(selectinload(Consultation.patient))
+        key = consultation_uuid if consultation_uuid is not None else consultation_id
+        return (await db.execute(query.where(Consultation.id == key))).scalar_one_or_none()
+
+    async with async_session() as db:
         try:
-            log = db_local.query(CallLog).filter(CallLog.id == call_log_id).first()
-            if log:
-                log.transcript = transcript
-                log.call_duration = int(max(0, time.monotonic() - call_started_at))
-                db_local.commit()
+            consultation = await _load_consultation(db)
+            draft_log = CallLog(
+                conversation_id=conversation_id,
+                consultation_id=consultation.id if consultation else consultation_uuid,
+                transcript="",
+                ai_summary="",
+                urgency_level="low",
+                call_duration=0,
+                call_status=call_status,
+                dashboard_alert=False,
+            )
+            db.add(draft_log)
+            await db.commit()
+            call_log_id = draft_log.id
         except Exception as e:
-            db_local.rollback()
-            print(f"Failed to persist transcript checkpoint for call {conversation_id}: {e}")
-        finally:
-            db_local.close()
-    
-    # Initialize our AI agent which encapsulates Vertex AI, Google STT, and Google TTS
-    agent = GeminiService(consultation_id=consultation_id, on_transcript_update=persist_transcript_checkpoint)
-    try:
-        await agent.initialize()
-    except Exception as e:
-        print(f"Agent initialization failed for consultation {consultation_id}: {e}")
-        call_status = "failed"
-        session_state_store.end(conversation_id)
-        session_state_store.cleanup(conversation_id)
-        try:
-            await websocket.close()
-        except Exception:
-            pass
-        return
+            print(f"Failed to create draft call log for consultation {consultation_id}: {e}")
+            await db.rollback()
 
-    # Task to read audio from Agent's TTS and forward to Twilio
-    async def send_to_twilio():
-        async for tts_chunk in agent.get_audio_chunks():
-            if stream_sid:
-                media_message = {
-                    "event": "media",
-                    "streamSid": stream_sid,
-                    "media": {
-                        "payload": tts_chunk
-                    }
-                }
-                await websocket.send_json(media_message)
-
-    sender_task = asyncio.create_task(send_to_twilio())
-
-    try:
-        while True:
-            message = await websocket.receive_text()
-            data = json.loads(message)
-            event_type = data.get("event", "")
-            seq = str(data.get("sequenceNumber", ""))
-            media_fallback = ""
-            if event_type == "media" and not seq:
-                media_fallback = str(data.get("media", {}).get("timestamp", "")) or str(hash(data.get("media", {}).get("payload", "")))
-            event_key = f"{stream_sid or 'nostream'}:{event_type}:{seq or media_fallback}"
-            if not session_state_store.mark_event_processed(conversation_id, event_key):
-                continue
-
-            if event_type == 'start':
-                stream_sid = data['start']['streamSid']
-                session_state_store.update_stream_sid(conversation_id, stream_sid)
-                print(f"Stream started: {stream_sid}")
-                # Tell Agent to speak the greeting
-                await agent.start_conversation()
-
-            elif event_type == 'media':
-                # Incoming audio payload from Twilio (mulaw 8000Hz base64)
-                payload = data['media']['payload']
-                # Feed the raw payload to the Agent's STT processor
-                await agent.process_incoming_audio(payload)
-                if agent.should_end_conversation():
-                    call_status = "completed"
-                    break
+    async def persist_transcript_checkpoint(transcript: str):
+        # In-memory only; the database gets append-only call_turns rows via the write-behind writer.
+        session_state_store.update_transcript(conversation_id, transcript)
 
-            elif event_type == 'stop':
-                print(f"Stream stopped: {stream_sid}")
-                call_status = "completed"
-                break
+    def record_turn(turn: dict):
+        call_turn_writer.add({**turn, "call_log_id": call_log_id, "conversation_id": conversation_id})
 
-    except Exception as e:
-        print(f"WebSocket disconnected: {e}")
-        call_status = "failed"
-    finally:
-        session_state_store.end(conversation_id)
-        sender_task.cancel()
+    async def finalize_call():
         try:
             await websocket.close()
         except Exception:
             pass
         await agent.close()
 
+        # The transcript is materialized once, here; call_turns holds the line-by-line history.
         transcript = agent.get_transcript()
 
         try:
-            triage_result = TriageAnalyzer().analyze_call(transcript)
+            triage_result = await asyncio.to_thread(TriageAnalyzer().analyze_call, transcript)
         except Exception as e:
             print(f"Triage failed for consultation {consultation_id}: {e}")
             triage_result = {
@@ -194,44 +128,137 @@ async def websocket_endpoint(websocket: WebSocket, consultation_id: str):
         dashboard_alert = urgency in {"medium", "high"}
         call_duration = int(max(0, time.monotonic() - call_started_at))
 
-        db = SessionLocal()
+        doctor_phone_number = None
         try:
-            consultation, consultation_uuid = _load_consultation(db)
-
-            if consultation:
-                consultation.status = new_status
-
-            if call_log_id:
-                call_log = db.query(CallLog).filter(CallLog.id == call_log_id).first()
-            else:
-                call_log = None
-            if not call_log:
-                call_log = CallLog(
-                    conversation_id=conversation_id,
-                    consultation_id=consultation.id if consultation else consultation_uuid,
-                )
-                db.add(call_log)
+            async with async_session() as db:
+                try:
+                    consultation = await _load_consultation(db)
 
-            call_log.transcript = transcript
-            call_log.ai_summary = triage_result.get("summary", "")
-            call_log.urgency_level = urgency
-            call_log.call_duration = call_duration
-            call_log.call_status = call_status
-            call_log.dashboard_alert = dashboard_alert
+                    if consultation:
+                        consultation.status = new_status
+                        doctor_phone_number = getattr(consultation.patient, "doctor_id", None)
+
+                    call_log = await db.get(CallLog, call_log_id) if call_log_id else None
+                    if not call_log:
+                        call_log = CallLog(
+                            conversation_id=conversation_id,
+                            consultation_id=consultation.id if consultation else consultation_uuid,
+                        )
+                        db.add(call_log)
+
+                    call_log.transcript = transcript
+                    call_log.ai_summary = triage_result.get("summary", "")
+                    call_log.urgency_level = urgency
+                    call_log.call_duration = call_duration
+                    call_log.call_status = call_status
+                    call_log.dashboard_alert = dashboard_alert
+
+                    await db.commit()
+                except Exception as e:
+                    print(f"Failed to finalize call for consultation {consultation_id}: {e}")
+                    await db.rollback()
 
             if urgency == "high" and requires_doctor:
-                doctor_phone_number = getattr(getattr(consultation, "patient", None), "doctor_id", None)
-                notify_doctor(
+                await asyncio.to_thread(
+                    notify_doctor,
                     consultation_id=consultation_id,
                     summary=triage_result.get("summary", ""),
                     urgency=urgency,
                     doctor_phone_number=doctor_phone_number
                 )
-
-            db.commit()
         except Exception as e:
             print(f"Failed to finalize call for consultation {consultation_id}: {e}")
-            db.rollback()
         finally:
-            db.close()
             session_state_store.cleanup(conversation_id)
+
+    # Initialize our AI agent which encapsulates Vertex AI, Google STT, and Google TTS.
+    # A session pre-warmed at TwiML time already has its context and greeting audio.
+    agent = await call_prewarmer.claim(consultation_id)
+    if agent is None:
+        agent = GeminiService(
+            consultation_id=consultation_id,
+            registry=getattr(websocket.app.state, "clients", None),
+        )
+    agent.on_transcript_update = persist_transcript_checkpoint
+    agent.on_turn = record_turn
+    try:
+        await agent.initialize()
+    except Exception as e:
+        print(f"Agent initialization failed for consultation {consultation_id}: {e}")
+        call_status = "failed"
+        session_state_store.end(conversation_id)
+        session_state_store.cleanup(conversation_id)
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+        return
+
+    stream_started_at = None
+
+    def record_first_audio(sent_at: float):
+        if stream_started_at is not None:
+            call_metrics.observe("start_to_first_audio", (sent_at - stream_started_at) * 1000)
+
+    # Task to frame the Agent's TTS audio and pace it out to Twilio in real time
+    outbound = OutboundAudioStream(websocket, agent.audio_out_queue, on_first_frame=record_first_audio)
+    sender_task = asyncio.create_task(outbound.run())
+    agent.outbound = outbound
+
+    # Highest media sequenceNumber handled; Twilio numbers the stream's messages in order.
+    media_high_water = 0
+
+    try:
+        while True:
+            message = await websocket.receive_text()
+            data = orjson.loads(message)
+            event_type = data.get("event", "")
+
+            if event_type == "media":
+                # Hot path (~50 frames/sec): dedupe on the sequence number's high-water mark
+                # instead of building keys for the shared session store.
+                media = data["media"]
+                seq = data.get("sequenceNumber")
+                if seq is not None:
+                    sequence = int(seq)
+                    if sequence <= media_high_water:
+                        continue
+                    media_high_water = sequence
+                # Feed the raw payload (mulaw 8000Hz base64) to the Agent's STT processor
+                await agent.process_incoming_audio(media["payload"])
+                if agent.should_end_conversation():
+                    call_status = "completed"
+                    break
+                continue
+
+            seq = str(data.get("sequenceNumber", ""))
+            event_key = f"{stream_sid or 'nostream'}:{event_type}:{seq}"
+            if not session_state_store.mark_event_processed(conversation_id, event_key):
+                continue
+
+            if event_type == 'start':
+                stream_sid = data['start']['streamSid']
+                stream_started_at = time.monotonic()
+                session_state_store.update_stream_sid(conversation_id, stream_sid)
+                outbound.set_stream_sid(stream_sid)
+                print(f"Stream started: {stream_sid}")
+                # Tell Agent to speak the greeting
+                await agent.start_conversation()
+
+            elif event_type == 'stop':
+                print(f"Stream stopped: {stream_sid}")
+                call_status = "completed"
+                break
+
+    except Exception as e:
+        print(f"WebSocket disconnected: {e}")
+        call_status = "failed"
+    finally:
+        session_state_store.end(conversation_id)
+        sender_task.cancel()
+        print(f"Outbound audio for {conversation_id}: {outbound.stats()}")
+        # Shielded: a dropped connection can cancel this handler, but the call still gets finalized.
+        finalize = asyncio.create_task(finalize_call())
+        _finalizing.add(finalize)
+        finalize.add_done_callback(_finalizing.discard)
+        await asyncio.shield(finalize)
@@ -1,16 +1,26 @@
-from datetime import datetime, timedelta, timezone
+import asyncio
+import json
+import shutil
 import uuid
+import zipfile
+from pathlib import Path
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from config.database import get_db
-from models.consultation import Consultation
-from models.patient import Patient
-from services.pdf_parser import extract_text_from_pdf
-from services.embedding_service import EmbeddingService
-from services.pinecone_service import PineconeService
-from services.gcs_service import GCSService
-from utils.helpers import chunk_text, normalize_phone_number
+from config.settings import settings
+from services.clients import ClientRegistry, get_client_registry
+from services.bulk_ingestion import BulkIngestor, StagedPdfs, extract_archive, prepare_documents, read_manifest
+from services.ingestion_service import (
+    IngestionError,
+    UploadTooLarge,
+    build_consultation_upload,
+    get_spool_dir,
+    ingest_consultation,
+    spool_upload,
+)
+from services.ingestion_queue import IngestionQueueFull, ingestion_queue
 
 router = APIRouter(tags=["upload"])
 
@@ -22,10 +32,14 @@ async def upload_consultation(
     followup_datetime: str | None = Form(None),
     file: UploadFile = File(...),
     doctor_id: str = Form("default-doctor"),
+    async_ingestion: bool = Form(settings.INGESTION_ASYNC_DEFAULT),
     db: Session = Depends(get_db),
+    clients: ClientRegistry = Depends(get_client_registry),
 ):
     """
     Receives a consultation PDF, stores consultation + vectors, and schedules follow-up date.
+    With async_ingestion the PDF is stored, a job id is returned with 202 Accepted,
+    and processing continues on the ingestion worker pool.
     """
     if not file:
         raise HTTPException(
@@ -37,132 +51,62 @@ async def upload_consultation(
             status_code=400,
             detail={"error": "INVALID_FILE_TYPE", "message": "Only PDF files are accepted."},
         )
-    follow_up_date: datetime
-    if followup_datetime:
-        try:
-            parsed = datetime.fromisoformat(followup_datetime.replace("Z", "+00:00"))
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail={"error": "INVALID_FOLLOWUP_DATETIME", "message": "followup_datetime must be ISO-8601."},
-            )
-
-        # Treat naive datetimes as UTC to keep the API deterministic.
-        if parsed.tzinfo is None:
-            parsed = parsed.replace(tzinfo=timezone.utc)
-        follow_up_date = parsed.astimezone(timezone.utc)
-        if follow_up_date <= datetime.now(timezone.utc):
-            raise HTTPException(
-                status_code=400,
-                detail={"error": "INVALID_FOLLOWUP_DATETIME", "message": "followup_datetime must be in the future."},
-            )
-    else:
-        if followup_days is None:
-            raise HTTPException(
-                status_code=400,
-                detail={"error": "MISSING_FOLLOWUP", "message": "Provide followup_datetime or followup_days."},
-            )
-        if followup_days < 0:
-            raise HTTPException(
-                status_code=400,
-                detail={"error": "INVALID_FOLLOWUP_DAYS", "message": "followup_days must be >= 0."},
-            )
-        follow_up_date = datetime.now(timezone.utc) + timedelta(days=followup_days)
-
-    ok_phone, normalized_phone = normalize_phone_number(phone_number)
-    if not ok_phone:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "INVALID_PHONE_NUMBER", "message": "Phone number must be valid E.164."},
-        )
-
-    content = await file.read()
-    if not content:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "EMPTY_FILE", "message": "Uploaded PDF is empty."},
-        )
-
     try:
-        gcs_service = GCSService()
-        embedder = EmbeddingService()
-        pinecone_db = PineconeService()
-    except Exception as e:
-        raise HTTPException(
-            status_code=502,
-            detail={"error": "SERVICE_INIT_FAILED", "message": f"Cloud service initialization failed: {str(e)}"},
+        upload = build_consultation_upload(
+            patient_name=patient_name,
+            phone_number=phone_number,
+            doctor_id=doctor_id,
+            filename=file.filename,
+            followup_days=followup_days,
+            followup_datetime=followup_datetime,
         )
+    except IngestionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.to_detail())
 
-    destination_name = f"{uuid.uuid4()}_{file.filename}"
-    pdf_url = gcs_service.upload_pdf(content, destination_name)
-    if not pdf_url:
+    try:
+        pdf_path, size, content_hash = await spool_upload(file)
+    except UploadTooLarge:
         raise HTTPException(
-            status_code=502,
-            detail={"error": "GCS_UPLOAD_FAILED", "message": "Failed to upload consultation PDF."},
+            status_code=413,
+            detail={"error": "FILE_TOO_LARGE", "message": f"PDF exceeds the {settings.MAX_UPLOAD_BYTES} byte upload limit."},
         )
-
-    summary_text = extract_text_from_pdf(content)
-    if not summary_text:
+    if not size:
+        pdf_path.unlink(missing_ok=True)
         raise HTTPException(
             status_code=400,
-            detail={"error": "PDF_TEXT_EXTRACTION_FAILED", "message": "Could not extract text from PDF."},
+            detail={"error": "EMPTY_FILE", "message": "Uploaded PDF is empty."},
         )
+    upload.content_hash = content_hash
 
-    patient = db.query(Patient).filter(Patient.phone_number == normalized_phone).first()
-    if not patient:
-        patient = Patient(name=patient_name.strip(), phone_number=normalized_phone, doctor_id=doctor_id)
-        db.add(patient)
-        db.flush()
-
-    consultation = Consultation(
-        patient_id=patient.id,
-        doctor_id=doctor_id,
-        pdf_url=pdf_url,
-        summary_text=summary_text,
-        follow_up_date=follow_up_date,
-        status="pending",
-    )
-    db.add(consultation)
-    db.flush()
-
-    chunks = chunk_text(summary_text, chunk_size=800, overlap=100) or [summary_text]
-    vectors_to_upsert = []
-    for i, chunk in enumerate(chunks):
-        vector = embedder.generate_embedding(chunk)
-        if not vector:
-            db.rollback()
+    if async_ingestion:
+        # The queued job takes ownership of the spool file.
+        try:
+            job = await ingestion_queue.enqueue(upload, pdf_path)
+        except IngestionQueueFull:
+            pdf_path.unlink(missing_ok=True)
             raise HTTPException(
-                status_code=502,
-                detail={"error": "EMBEDDING_FAILED", "message": "Failed to generate embedding from consultation text."},
+                status_code=503,
+                detail={"error": "INGESTION_QUEUE_FULL", "message": "Too many uploads in progress. Retry shortly."},
             )
-        vectors_to_upsert.append(
-            {
-                "id": f"{consultation.id}_chunk_{i}",
-                "values": vector,
-                "metadata": {
-                    "consultation_id": str(consultation.id),
-                    "patient_id": str(patient.id),
-                    "patient_name": patient.name,
-                    "doctor_id": doctor_id,
-                    "diagnosis": "",
-                    "follow_up_date": follow_up_date.isoformat(),
-                    "summary_text": chunk,
-                    "chunk_index": i,
-                },
-            }
+        return JSONResponse(
+            status_code=202,
+            content={
+                "success": True,
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "status_url": f"/ingestion-jobs/{job['job_id']}",
+            },
         )
 
-    if not pinecone_db.upsert_chunks(vectors_to_upsert):
-        db.rollback()
-        raise HTTPException(
-            status_code=502,
-            detail={"error": "PINECONE_UPSERT_FAILED", "message": "Failed to store consultation vectors."},
-        )
-
-    db.commit()
-    db.refresh(consultation)
+    try:
+        result = await ingest_consultation(db, upload, pdf_path, registry=clients)
+    except IngestionError as e:
+        await asyncio.to_thread(db.rollback)
+        raise HTTPException(status_code=e.status_code, detail=e.to_detail())
+    finally:
+        pdf_path.unlink(missing_ok=True)
 
-    return {"success": True, "consultation_id": str(consultation.id)}
+    return {"success": True, "consultation_id": result.consultation_id, "dedupe": result.dedupe}
 
 @router.post("/upload/consultation")
 async def upload_consultation_legacy(
@@ -172,7 +116,9 @@ async def upload_consultation_legacy(
     followup_datetime: str | None = Form(None),
     file: UploadFile = File(...),
     doctor_id: str = Form("default-doctor"),
+    async_ingestion: bool = Form(settings.INGESTION_ASYNC_DEFAULT),
     db: Session = Depends(get_db),
+    clients: ClientRegistry = Depends(get_client_registry),
 ):
     return await upload_consultation(
         patient_name=patient_name,
@@ -181,5 +127,74 @@ async def upload_consultation_legacy(
         followup_datetime=followup_datetime,
         file=file,
         doctor_id=doctor_id,
+        async_ingestion=async_ingestion,
         db=db,
+        clients=clients,
     )
+
+@router.post("/upload/bulk")
+async def upload_bulk(
+    archive: UploadFile | None = File(None),
+    manifest: UploadFile | None = File(None),
+    files: list[UploadFile] | None = File(None),
+    clients: ClientRegistry = Depends(get_client_registry),
+):
+    """
+    Bulk onboarding of historical consultations. Send either a zip archive with PDFs and
+    a manifest.csv/manifest.json, or a manifest file plus the PDFs as repeated `files` parts.
+    Manifest columns: filename, patient_name, phone_number, followup_days or
+    followup_datetime, optional doctor_id. Returns per-document results and throughput.
+    """
+    work_dir = get_spool_dir() / f"bulk-{uuid.uuid4()}"
+    spooled = StagedPdfs()
+    try:
+        if archive:
+            try:
+                archive_path, _, _ = await spool_upload(archive, settings.BULK_MAX_ARCHIVE_BYTES)
+            except UploadTooLarge:
+                raise HTTPException(
+                    status_code=413,
+                    detail={"error": "FILE_TOO_LARGE", "message": f"Archive exceeds the {settings.BULK_MAX_ARCHIVE_BYTES} byte limit."},
+                )
+            try:
+                documents = await asyncio.to_thread(extract_archive, archive_path, work_dir)
+            except zipfile.BadZipFile:
+                raise HTTPException(
+                    status_code=400,
+                    detail={"error": "INVALID_ARCHIVE", "message": "Archive must be a zip file."},
+                )
+            except IngestionError as e:
+                raise HTTPException(status_code=e.status_code, detail=e.to_detail())
+            except (ValueError, UnicodeDecodeError):
+                raise HTTPException(
+                    status_code=400,
+                    detail={"error": "INVALID_MANIFEST", "message": "Manifest must be CSV with a header row or a JSON list."},
+                )
+            finally:
+                archive_path.unlink(missing_ok=True)
+        elif manifest:
+            try:
+                rows = read_manifest(await manifest.read(), manifest.filename or "manifest.csv")
+            except (ValueError, UnicodeDecodeError, json.JSONDecodeError):
+                raise HTTPException(
+                    status_code=400,
+                    detail={"error": "INVALID_MANIFEST", "message": "Manifest must be CSV with a header row or a JSON list."},
+                )
+            for pdf in files or []:
+                try:
+                    pdf_path, _, _ = await spool_upload(pdf)
+                except UploadTooLarge:
+                    spooled.reject_too_large(Path(pdf.filename).name)
+                    continue
+                spooled.add(Path(pdf.filename).name, pdf_path)
+            documents = prepare_documents(rows, spooled.resolve)
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail={"error": "MISSING_BULK_INPUT", "message": "Provide a zip archive or a manifest with files."},
+            )
+
+        return await BulkIngestor(registry=clients).run(documents)
+    finally:
+        spooled.cleanup()
+        await asyncio.to_thread(shutil.rmtree, work_dir, True)
@@ -0,0 +1,371 @@
+import asyncio
+import csv
+import io
+import json
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from config.database import SessionLocal
+from config.settings import settings
+from services.ingestion_service import (
+    ConsultationUpload,
+    IngestionError,
+    build_chunk_vectors,
+    apply_duplicate_upload,
+    build_consultation_upload,
+    dedupe_enabled_for,
+    find_patient,
+    hash_file,
+    init_cloud_services,
+    persist_consultation,
+)
+from services.pdf_parser import extract_text
+from services.rag_context import select_rag_context
+from utils.helpers import chunk_text_structured
+
+MANIFEST_NAMES = ("manifest.csv", "manifest.json")
+
+
+@dataclass
+class BulkDocument:
+    """One manifest row: validated upload fields plus the PDF on local disk."""
+    source: str
+    upload: ConsultationUpload | None = None
+    pdf_path: Path | None = None
+    error: dict | None = None
+
+
+@dataclass
+class _ParsedDocument:
+    index: int
+    doc: BulkDocument
+    pdf_url: str
+    summary_text: str
+    chunks: list[str] = field(default_factory=list)
+    rag_context: str | None = None
+
+
+class StagedPdfs:
+    """
+    PDFs spooled to local disk, looked up by base name from manifest rows. Files over
+    MAX_UPLOAD_BYTES and base names that appear more than once are remembered, so the
+    rows naming them fail with FILE_TOO_LARGE / DUPLICATE_FILENAME instead of MISSING_PDF.
+    """
+
+    def __init__(self):
+        self.paths: dict[str, Path] = {}
+        self.too_large: set[str] = set()
+        self.duplicates: set[str] = set()
+        self.spooled: list[Path] = []
+
+    def _claim(self, name: str) -> bool:
+        if name in self.paths or name in self.too_large or name in self.duplicates:
+            self.duplicates.add(name)
+            return False
+        return True
+
+    def add(self, name: str, path: Path) -> None:
+        self.spooled.append(path)
+        if self._claim(name):
+            self.paths[name] = path
+
+    def reject_too_large(self, name: str) -> None:
+        if self._claim(name):
+            self.too_large.add(name)
+
+    def resolve(self, source: str) -> Path | None:
+        name = Path(source).name
+        if name in self.duplicates:
+            raise IngestionError(400, "DUPLICATE_FILENAME", f"More than one file is named {name}.")
+        if name in self.too_large:
+            raise IngestionError(413, "FILE_TOO_LARGE", f"{name} exceeds the {settings.MAX_UPLOAD_BYTES} byte upload limit.")
+        return self.paths.get(name)
+
+    def cleanup(self) -> None:
+        for path in self.spooled:
+            path.unlink(missing_ok=True)
+
+
+def read_manifest(data: bytes, name: str) -> list[dict]:
+    """Parses manifest rows from CSV (header row) or JSON (list of objects)."""
+    if name.lower().endswith(".json"):
+        rows = json.loads(data.decode("utf-8"))
+        if not isinstance(rows, list):
+            raise ValueError("JSON manifest must be a list of objects.")
+        return [dict(row) for row in rows]
+    return list(csv.DictReader(io.StringIO(data.decode("utf-8-sig"))))
+
+
+def prepare_documents(rows: list[dict], resolve_pdf) -> list[BulkDocument]:
+    """
+    Validates manifest rows. Expected columns: filename, patient_name, phone_number,
+    followup_days or followup_datetime, and optional doctor_id.
+    resolve_pdf maps a manifest filename to a local Path (or None if missing), and
+    may raise IngestionError to reject the row's file.
+    """
+    documents = []
+    for position, row in enumerate(rows, start=1):
+        source = str(row.get("filename") or f"row {position}").strip()
+        doc = BulkDocument(source=source)
+        documents.append(doc)
+        try:
+            if not row.get("filename") or not source.lower().endswith(".pdf"):
+                raise IngestionError(400, "INVALID_FILE_TYPE", "Only PDF files are accepted.")
+            followup_days = row.get("followup_days")
+            doc.upload = build_consultation_upload(
+                patient_name=str(row.get("patient_name") or "").strip(),
+                phone_number=str(row.get("phone_number") or ""),
+                doctor_id=str(row.get("doctor_id") or "default-doctor"),
+                filename=Path(source).name,
+                followup_days=int(followup_days) if followup_days not in (None, "") else None,
+                followup_datetime=row.get("followup_datetime") or None,
+            )
+            if not doc.upload.patient_name:
+                raise IngestionError(400, "MISSING_PATIENT_NAME", "patient_name is required.")
+            doc.pdf_path = resolve_pdf(source)
+            if not doc.pdf_path:
+                raise IngestionError(400, "MISSING_PDF", f"{source} was not found.")
+        except IngestionError as e:
+            doc.error = e.to_detail()
+        except ValueError:
+            doc.error = {"error": "INVALID_FOLLOWUP_DAYS", "message": "followup_days must be an integer."}
+    return documents
+
+
+def extract_archive(archive_path: Path, dest_dir: Path) -> list[BulkDocument]:
+    """Unpacks a zip of PDFs plus manifest.csv/manifest.json and validates its rows."""
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    pdfs = StagedPdfs()
+    rows = None
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            # Only base names are used on disk, so archive paths cannot escape dest_dir.
+            name = Path(info.filename).name
+            if name.lower() in MANIFEST_NAMES:
+                rows = read_manifest(archive.read(info), name)
+            elif name.lower().endswith(".pdf"):
+                if info.file_size > settings.MAX_UPLOAD_BYTES:
+                    pdfs.reject_too_large(name)
+                    continue
+                target = dest_dir / f"{uuid.uuid4()}.pdf"
+                with archive.open(info) as src, open(target, "wb") as dst:
+                    while chunk := src.read(settings.UPLOAD_READ_CHUNK_BYTES):
+                        dst.write(chunk)
+                pdfs.add(name, target)
+    if rows is None:
+        raise IngestionError(400, "MISSING_MANIFEST", "Archive must contain manifest.csv or manifest.json.")
+    return prepare_documents(rows, pdfs.resolve)
+
+
+def _apply_duplicate_in_session(upload: ConsultationUpload):
+    db = SessionLocal()
+    try:
+        return apply_duplicate_upload(db, upload)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class BulkIngestor:
+    """
+    Ingests many consultations with one set of cloud clients. Parsing (process pool)
+    and GCS uploads run ahead of a single embed/store stage that embeds chunks from
+    several documents per request; failures are recorded per document.
+    """
+
+    def __init__(self, gcs_service=None, embedder=None, vector_store=None, registry=None):
+        self.registry = registry
+        self.gcs_service = gcs_service
+        self.embedder = embedder
+        self.vector_store = vector_store
+
+    async def run(self, documents: list[BulkDocument], on_progress=None) -> dict:
+        if self.gcs_service is None or self.embedder is None or self.vector_store is None:
+            gcs_service, embedder, vector_store = await asyncio.to_thread(init_cloud_services, self.registry)
+            self.gcs_service = self.gcs_service or gcs_service
+            self.embedder = self.embedder or embedder
+            self.vector_store = self.vector_store or vector_store
+
+        started = time.perf_counter()
+        results: list[dict] = [{"filename": doc.source, "status": "pending"} for doc in documents]
+        counters = {"processed": 0, "succeeded": 0, "failed": 0, "chunks": 0}
+
+        def _progress() -> dict:
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            return {
+                "total": len(documents),
+                **counters,
+                "elapsed_seconds": round(elapsed, 3),
+                "documents_per_second": round(counters["processed"] / elapsed, 3),
+                "chunks_per_second": round(counters["chunks"] / elapsed, 3),
+            }
+
+        def _finish(
+            index: int,
+            error: dict | None = None,
+            consultation_id: str | None = None,
+            chunks: int = 0,
+            dedupe: dict | None = None,
+        ):
+            counters["processed"] += 1
+            if error:
+                counters["failed"] += 1
+                results[index].update(status="failed", error=error)
+            else:
+                counters["succeeded"] += 1
+                counters["chunks"] += chunks
+                results[index].update(status="succeeded", consultation_id=consultation_id, chunks=chunks, dedupe=dedupe)
+            if on_progress:
+                on_progress(_progress())
+
+        parsed_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.BULK_PIPELINE_DEPTH)
+        parse_slots = asyncio.Semaphore(settings.BULK_PARSE_CONCURRENCY)
+
+        async def _parse(index: int, doc: BulkDocument) -> None:
+            try:
+                await _parse_document(index, doc)
+            except Exception as e:
+                _finish(index, {"error": "INGESTION_FAILED", "message": str(e)})
+
+        async def _parse_document(index: int, doc: BulkDocument) -> None:
+            doc.upload.content_hash = await asyncio.to_thread(hash_file, doc.pdf_path)
+            if dedupe_enabled_for(doc.upload.doctor_id):
+                duplicate = await asyncio.to_thread(_apply_duplicate_in_session, doc.upload)
+                if duplicate:
+                    _finish(index, consultation_id=duplicate.consultation_id, dedupe=duplicate.dedupe)
+                    return
+            async with parse_slots:
+                destination_name = f"{uuid.uuid4()}_{doc.upload.filename}"
+                upload_task = asyncio.create_task(
+                    asyncio.to_thread(self.gcs_service.upload_pdf_file, str(doc.pdf_path), destination_name)
+                )
+                summary_text = await extract_text(doc.pdf_path)
+                pdf_url = await upload_task
+            if not pdf_url:
+                _finish(index, {"error": "GCS_UPLOAD_FAILED", "message": "Failed to upload consultation PDF."})
+                return
+            if not summary_text:
+                _finish(index, {"error": "PDF_TEXT_EXTRACTION_FAILED", "message": "Could not extract text from PDF."})
+                return
+            chunks = chunk_text_structured(summary_text, settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS) or [summary_text]
+            await parsed_queue.put(_ParsedDocument(index, doc, pdf_url, summary_text, chunks))
+
+        async def _produce() -> None:
+            try:
+                await asyncio.gather(*(
+                    _parse(index, doc) for index, doc in enumerate(documents) if not doc.error
+                ))
+            finally:
+                await parsed_queue.put(None)
+
+        for index, doc in enumerate(documents):
+            if doc.error:
+                _finish(index, doc.error)
+
+        db = SessionLocal()
+        new_patient_ids: dict[str, uuid.UUID] = {}
+        producer = asyncio.create_task(_produce())
+        try:
+            done = False
+            while not done:
+                batch = []
+                batch_chunks = 0
+                # Take whatever is parsed (at least one doc) up to one full embedding request.
+                while batch_chunks < settings.EMBEDDING_BATCH_SIZE:
+                    if batch and parsed_queue.empty():
+                        break
+                    item = await parsed_queue.get()
+                    if item is None:
+                        done = True
+                        break
+                    batch.append(item)
+                    batch_chunks += len(item.chunks)
+                if batch:
+                    await self._embed_and_store(db, batch, new_patient_ids, _finish)
+            await producer
+        finally:
+            producer.cancel()
+            await asyncio.to_thread(db.close)
+
+        return {**_progress(), "results": results}
+
+    async def _embed_and_store(self, db, batch: list[_ParsedDocument], new_patient_ids: dict, finish) -> None:
+        # Each document's full text is embedded with its chunks; it is the RAG query for its calls.
+        texts = [item.chunks + [item.summary_text] for item in batch]
+        all_texts = [text for doc_texts in texts for text in doc_texts]
+        vectors = await asyncio.to_thread(self.embedder.generate_embeddings, all_texts)
+
+        per_doc_vectors = []
+        if len(vectors) == len(all_texts):
+            offset = 0
+            for doc_texts in texts:
+                per_doc_vectors.append(vectors[offset:offset + len(doc_texts)])
+                offset += len(doc_texts)
+        else:
+            # Isolate the failing document(s) by embedding one document at a time.
+            for doc_texts in texts:
+                per_doc_vectors.append(await asyncio.to_thread(self.embedder.generate_embeddings, doc_texts))
+
+        staged = []
+        for item, doc_vectors in zip(batch, per_doc_vectors):
+            if len(doc_vectors) != len(item.chunks) + 1:
+                finish(item.index, {"error": "EMBEDDING_FAILED", "message": "Failed to generate embedding from consultation text."})
+                continue
+            try:
+                query_vector, doc_vectors = doc_vectors[-1], doc_vectors[:-1]
+                item.rag_context = select_rag_context(query_vector, item.chunks, doc_vectors)
+                upload = item.doc.upload
+                patient = await asyncio.to_thread(find_patient, db, upload.phone_number)
+                if patient:
+                    patient_id, patient_name = patient.id, patient.name
+                else:
+                    patient_id = new_patient_ids.setdefault(upload.phone_number, uuid.uuid4())
+                    patient_name = upload.patient_name.strip()
+                consultation_id = uuid.uuid4()
+                chunk_vectors = build_chunk_vectors(consultation_id, patient_id, patient_name, upload, item.chunks, doc_vectors)
+            except Exception as e:
+                # One document's lookup failing must not leave the rest of the batch pending.
+                await asyncio.to_thread(db.rollback)
+                finish(item.index, {"error": "INGESTION_FAILED", "message": str(e)})
+                continue
+            staged.append((item, patient, patient_id, consultation_id, chunk_vectors))
+
+        if not staged:
+            return
+
+        combined = [vector for entry in staged for vector in entry[4]]
+        upserted = await asyncio.to_thread(self.vector_store.upsert_chunks, combined, settings.BULK_UPSERT_BATCH_SIZE)
+
+        for item, patient, patient_id, consultation_id, chunk_vectors in staged:
+            if not upserted and not await asyncio.to_thread(self.vector_store.upsert_chunks, chunk_vectors):
+                finish(item.index, {"error": "PINECONE_UPSERT_FAILED", "message": "Failed to store consultation vectors."})
+                continue
+            try:
+                await asyncio.to_thread(
+                    persist_consultation,
+                    db,
+                    item.doc.upload,
+                    consultation_id,
+                    patient,
+                    patient_id,
+                    item.pdf_url,
+                    item.summary_text,
+                    item.rag_context,
+                )
+            except Exception as e:
+                await asyncio.to_thread(db.rollback)
+                finish(item.index, {"error": "DATABASE_WRITE_FAILED", "message": f"Failed to save consultation: {str(e)}"})
+                continue
+            dedupe = {
+                "decision": "new" if dedupe_enabled_for(item.doc.upload.doctor_id) else "disabled",
+                "content_hash": item.doc.upload.content_hash,
+                "matched_consultation_id": None,
+            }
+            finish(item.index, consultation_id=str(consultation_id), chunks=len(item.chunks), dedupe=dedupe)
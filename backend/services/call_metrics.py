@@ -0,0 +1,45 @@
+from collections import deque
+from threading import Lock
+
+
+class CallMetrics:
+    """
+    In-process counters and latency samples for live calls, served at /metrics/calls.
+    Latencies keep the most recent samples per name, so percentiles reflect recent traffic.
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self._lock = Lock()
+        self._max_samples = max_samples
+        self._counters: dict[str, int] = {}
+        self._samples: dict[str, deque] = {}
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, value_ms: float) -> None:
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self._max_samples)
+            samples.append(value_ms)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = {name: _summarize(list(samples)) for name, samples in self._samples.items()}
+            return {"counters": dict(self._counters), "latencies_ms": latencies}
+
+
+def _summarize(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def _pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1)
+
+    return {"count": len(ordered), "p50": _pct(0.50), "p95": _pct(0.95), "max": round(ordered[-1], 1)}
+
+
+call_metrics = CallMetrics()
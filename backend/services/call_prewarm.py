@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from config.settings import settings
+from services.call_metrics import call_metrics
+from services.gemini_service import GeminiService
+
+
+class CallPrewarmer:
+    """
+    Builds a call's agent (context, RAG, Gemini chat, greeting audio) while Twilio is
+    still fetching TwiML, keyed by consultation_id. The media stream claims it when it
+    opens; sessions nobody claims are dropped after CALL_PREWARM_TTL_SECONDS.
+    Per-instance only: a stream that lands on another instance simply warms cold.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._sessions: dict[str, tuple[asyncio.Task, asyncio.TimerHandle]] = {}
+
+    def prewarm(self, consultation_id: str, registry=None) -> None:
+        if consultation_id in self._sessions:
+            # Twilio may fetch TwiML more than once for the same call.
+            return
+        agent = GeminiService(consultation_id=consultation_id, registry=registry)
+        task = asyncio.create_task(self._prepare(agent))
+        expiry = asyncio.get_running_loop().call_later(self.ttl_seconds, self._expire, consultation_id, task)
+        self._sessions[consultation_id] = (task, expiry)
+        call_metrics.incr("prewarm_started")
+
+    async def claim(self, consultation_id: str) -> GeminiService | None:
+        """Returns the pre-warmed agent (waiting for it if still warming), or None."""
+        entry = self._sessions.pop(consultation_id, None)
+        if entry is None:
+            call_metrics.incr("prewarm_miss")
+            return None
+        task, expiry = entry
+        expiry.cancel()
+        try:
+            agent = await task
+        except Exception as e:
+            print(f"Pre-warm failed for consultation {consultation_id}: {e}")
+            call_metrics.incr("prewarm_failed")
+            return None
+        call_metrics.incr("prewarm_hit")
+        return agent
+
+    async def _prepare(self, agent: GeminiService) -> GeminiService:
+        started = time.perf_counter()
+        await agent.prepare(synthesize_greeting=True)
+        call_metrics.observe("prewarm", (time.perf_counter() - started) * 1000)
+        return agent
+
+    def _expire(self, consultation_id: str, task: asyncio.Task) -> None:
+        entry = self._sessions.get(consultation_id)
+        if entry and entry[0] is task:
+            del self._sessions[consultation_id]
+            task.cancel()
+            # Retrieve the outcome so a failed pre-warm is not reported as never retrieved.
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            call_metrics.incr("prewarm_expired")
+
+    def pending(self) -> int:
+        return len(self._sessions)
+
+
+call_prewarmer = CallPrewarmer(ttl_seconds=settings.CALL_PREWARM_TTL_SECONDS)
@@ -1,12 +1,12 @@
-from twilio.rest import Client
 from config.settings import settings
+from services.clients import client_registry
 from utils.helpers import normalize_phone_number
 
 def get_twilio_client():
-    if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN:
+    client = client_registry.get_twilio_client()
+    if not client:
         print("Warning: Twilio credentials not fully set up")
-        return None
-    return Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    return client
 
 def initiate_outbound_call(phone_number: str, consultation_id: str):
     """
@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+from config.async_database import async_session
+from config.database import SessionLocal
+from config.settings import settings
+from models.call_log import CallLog
+from models.call_turn import CallTurn
+from services.call_metrics import call_metrics
+
+
+class CallTurnWriter:
+    """
+    Write-behind buffer for call_turns. Agents add rows without touching the
+    database; a background task inserts them in batches every flush_ms, or sooner
+    once batch_size rows are waiting. Failed batches are retried on the next flush,
+    up to max_buffered rows.
+    """
+
+    def __init__(self, flush_ms: int, batch_size: int, max_buffered: int):
+        self.flush_seconds = max(1, flush_ms) / 1000
+        self.batch_size = max(1, batch_size)
+        self.max_buffered = max(self.batch_size, max_buffered)
+        self._buffer: list[dict] = []
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._flush_lock: asyncio.Lock | None = None
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            # Holding the flush lock, the task is never cancelled mid-insert (which would lose that batch).
+            async with self._flush_lock:
+                self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def add(self, row: dict) -> None:
+        if len(self._buffer) >= self.max_buffered:
+            call_metrics.incr("call_turns_dropped")
+            print("Call turn buffer full; dropping transcript row.")
+            return
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Writes everything buffered so far (e.g. before materializing a transcript)."""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            while self._buffer:
+                batch, self._buffer = self._buffer[: self.batch_size], self._buffer[self.batch_size :]
+                try:
+                    await _insert_turns(batch)
+                    call_metrics.incr("call_turns_written", len(batch))
+                    call_metrics.incr("call_turn_batches")
+                except Exception as e:
+                    print(f"Failed to write {len(batch)} call turns: {e}")
+                    self._buffer = batch + self._buffer
+                    return
+
+
+async def _insert_turns(rows: list[dict]) -> None:
+    async with async_session() as db:
+        try:
+            await db.execute(insert(CallTurn), rows)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+
+def materialize_transcript(db, call_log_id=None, conversation_id: str | None = None) -> str:
+    """Rebuilds a call transcript from its turns: the latest revision of each line, minus retractions."""
+    query = db.query(CallTurn)
+    if call_log_id is not None:
+        query = query.filter(CallTurn.call_log_id == call_log_id)
+    else:
+        query = query.filter(CallTurn.conversation_id == conversation_id)
+    latest: dict[int, CallTurn] = {}
+    for turn in query.order_by(CallTurn.revision):
+        latest[turn.seq] = turn
+    return "\n".join(
+        f"{turn.speaker}: {turn.text}" for seq, turn in sorted(latest.items()) if not turn.retracted
+    ).strip()
+
+
+def recover_call_transcripts() -> int:
+    """
+    Startup recovery for calls whose process died mid-call: call logs still marked
+    "started" well past any real call length get their transcript rebuilt from turns.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=settings.CALL_RECOVERY_AFTER_MINUTES)
+    db = SessionLocal()
+    recovered = 0
+    try:
+        stale = db.query(CallLog).filter(CallLog.call_status == "started", CallLog.created_at < cutoff).all()
+        for call_log in stale:
+            transcript = materialize_transcript(db, call_log_id=call_log.id)
+            if transcript:
+                call_log.transcript = transcript
+            call_log.call_status = "failed"
+            recovered += 1
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Call transcript recovery failed: {e}")
+    finally:
+        db.close()
+    return recovered
+
+
+call_turn_writer = CallTurnWriter(
+    flush_ms=settings.CALL_TURN_FLUSH_MS,
+    batch_size=settings.CALL_TURN_BATCH_SIZE,
+    max_buffered=settings.CALL_TURN_BUFFER_MAX,
+)
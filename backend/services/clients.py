@@ -0,0 +1,200 @@
+import asyncio
+from pathlib import Path
+from threading import Lock
+
+from fastapi import Request
+
+from config.settings import settings
+
+# Cloud SDKs are imported inside the getters: importing vertexai, google.cloud.*,
+# pinecone and twilio costs seconds, and a cold start should not pay for them
+# before the first request that needs them.
+
+PINECONE_INDEX_NAME = "followup-consultations"
+
+
+class ClientRegistry:
+    """
+    Application-lifetime cloud clients shared by routes and services.
+    startup() (scheduled from the FastAPI lifespan) initializes Vertex AI and runs the
+    bucket/index existence checks once; getters create anything still missing on first
+    use, so CLIs and workers outside the app can use the same registry.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.gcs_bucket_name = f"{settings.GOOGLE_PROJECT_ID}-consultation-pdfs"
+        self._vertexai_ready = False
+        self._gcs_client = None
+        self._gcs_bucket = None
+        self._pinecone = None
+        self._pinecone_index = None
+        self._embedding_model = None
+        self._twilio_client = None
+        self._speech_client = None
+        self._tts_client = None
+        self._local_vector_store = None
+
+    async def startup(self) -> None:
+        """Warms every client; failures are logged and retried lazily on first use."""
+        for name, getter in (
+            ("Vertex AI", self.init_vertexai),
+            ("GCS", self.get_gcs_bucket),
+            ("Vector store", self._warm_vector_store),
+            ("Vertex embeddings", self.get_embedding_model),
+            ("Twilio", self.get_twilio_client),
+        ):
+            try:
+                await asyncio.to_thread(getter)
+            except Exception as e:
+                print(f"{name} client initialization deferred: {e}")
+        # The gRPC asyncio clients bind to the running event loop.
+        for name, getter in (("Speech-to-Text", self.get_speech_client), ("Text-to-Speech", self.get_tts_client)):
+            try:
+                getter()
+            except Exception as e:
+                print(f"{name} client initialization deferred: {e}")
+
+    def _warm_vector_store(self):
+        if settings.VECTOR_STORE_BACKEND == "local":
+            return self.get_local_vector_store()
+        return self.get_pinecone_index()
+
+    async def shutdown(self) -> None:
+        for client in (self._speech_client, self._tts_client):
+            transport = getattr(client, "transport", None)
+            if transport is not None:
+                try:
+                    await transport.close()
+                except Exception:
+                    pass
+        if self._gcs_client is not None:
+            try:
+                self._gcs_client.close()
+            except Exception:
+                pass
+
+    def init_vertexai(self) -> None:
+        """Runs vertexai.init exactly once per process."""
+        if not self._vertexai_ready:
+            with self._lock:
+                if not self._vertexai_ready:
+                    import vertexai
+                    vertexai.init(project=settings.GOOGLE_PROJECT_ID, location=settings.GCP_LOCATION)
+                    self._vertexai_ready = True
+
+    def get_gcs_bucket(self):
+        if self._gcs_bucket is None:
+            with self._lock:
+                if self._gcs_bucket is None:
+                    from google.cloud import storage
+
+                    # Implicitly uses GOOGLE_APPLICATION_CREDENTIALS
+                    self._gcs_client = self._gcs_client or storage.Client(project=settings.GOOGLE_PROJECT_ID)
+                    try:
+                        self._gcs_bucket = self._gcs_client.get_bucket(self.gcs_bucket_name)
+                    except Exception:
+                        print(f"Bucket {self.gcs_bucket_name} not found. Creating...")
+                        self._gcs_bucket = self._gcs_client.create_bucket(self.gcs_bucket_name, location=settings.GCP_LOCATION)
+        return self._gcs_bucket
+
+    def get_pinecone(self):
+        if self._pinecone is None:
+            with self._lock:
+                if self._pinecone is None:
+                    from pinecone import Pinecone
+                    self._pinecone = Pinecone(api_key=settings.PINECONE_API_KEY)
+        return self._pinecone
+
+    def get_pinecone_index(self):
+        if self._pinecone_index is None:
+            pc = self.get_pinecone()
+            with self._lock:
+                if self._pinecone_index is None:
+                    listed = pc.list_indexes()
+                    try:
+                        existing_indexes = [index_info["name"] for index_info in listed]
+                    except Exception:
+                        try:
+                            existing_indexes = [index_info.name for index_info in listed.indexes]
+                        except Exception:
+                            existing_indexes = []
+
+                    if PINECONE_INDEX_NAME not in existing_indexes:
+                        from pinecone import ServerlessSpec
+                        pc.create_index(
+                            name=PINECONE_INDEX_NAME,
+                            dimension=settings.VECTOR_DIMENSION, # Dimension for text-embedding-004
+                            metric="cosine",
+                            spec=ServerlessSpec(
+                                cloud="aws",
+                                region="us-east-1"
+                            )
+                        )
+                    self._pinecone_index = pc.Index(PINECONE_INDEX_NAME)
+        return self._pinecone_index
+
+    def get_local_vector_store(self):
+        """The process-wide local vector store (one memory map per process)."""
+        if self._local_vector_store is None:
+            with self._lock:
+                if self._local_vector_store is None:
+                    from config.settings import ROOT_DIR
+                    from services.local_vector_store import LocalVectorStore
+                    path = Path(settings.VECTOR_STORE_PATH)
+                    self._local_vector_store = LocalVectorStore(
+                        path if path.is_absolute() else ROOT_DIR / path,
+                        dimension=settings.VECTOR_DIMENSION,
+                        quantize=settings.VECTOR_STORE_QUANTIZE,
+                    )
+        return self._local_vector_store
+
+    def get_embedding_model(self):
+        if self._embedding_model is None:
+            self.init_vertexai()
+            with self._lock:
+                if self._embedding_model is None:
+                    from vertexai.language_models import TextEmbeddingModel
+                    self._embedding_model = TextEmbeddingModel.from_pretrained(settings.EMBEDDING_MODEL)
+        return self._embedding_model
+
+    def get_twilio_client(self):
+        """Shared Twilio REST client (its HTTP session keeps connections pooled). None if unconfigured."""
+        if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN:
+            return None
+        if self._twilio_client is None:
+            with self._lock:
+                if self._twilio_client is None:
+                    from twilio.rest import Client as TwilioClient
+                    self._twilio_client = TwilioClient(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        return self._twilio_client
+
+    def get_speech_client(self):
+        if self._speech_client is None:
+            with self._lock:
+                if self._speech_client is None:
+                    from google.cloud import speech
+                    self._speech_client = speech.SpeechAsyncClient()
+        return self._speech_client
+
+    def get_generative_model(self, model_name: str | None = None, **kwargs):
+        """A Gemini GenerativeModel (cheap to construct; shares the process-wide Vertex init)."""
+        self.init_vertexai()
+        from vertexai.generative_models import GenerativeModel
+        return GenerativeModel(model_name=model_name or settings.VERTEX_AI_MODEL, **kwargs)
+
+    def get_tts_client(self):
+        if self._tts_client is None:
+            with self._lock:
+                if self._tts_client is None:
+                    from google.cloud import texttospeech
+                    self._tts_client = texttospeech.TextToSpeechAsyncClient()
+        return self._tts_client
+
+
+client_registry = ClientRegistry()
+
+
+def get_client_registry(request: Request) -> ClientRegistry:
+    """FastAPI dependency returning the registry created in the app lifespan."""
+    return getattr(request.app.state, "clients", client_registry)
@@ -0,0 +1,159 @@
+import hashlib
+import re
+import sqlite3
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+
+from config.settings import settings, ROOT_DIR
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace so trivially reformatted chunks share a cache entry."""
+    return _WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache.
+    Keys are sha256(model name + normalized text). A bounded in-process LRU sits in
+    front of an optional SQLite tier that survives restarts.
+    """
+
+    def __init__(self, max_entries: int = 10000, db_path: str | None = None):
+        self.max_entries = max(1, max_entries)
+        self._lock = Lock()
+        self._entries: OrderedDict[str, list[float]] = OrderedDict()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+        if db_path:
+            self._open_disk_tier(db_path)
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(normalize_text(text).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _open_disk_tier(self, db_path: str) -> None:
+        path = Path(db_path)
+        if not path.is_absolute():
+            path = ROOT_DIR / path
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        except Exception as e:
+            print(f"Embedding cache disk tier unavailable ({path}): {e}")
+            self._db = None
+
+    def get_many(self, model_name: str, texts: list[str]) -> list[list[float] | None]:
+        """Returns cached vectors aligned with texts, None where missing."""
+        keys = [self.make_key(model_name, t) for t in texts]
+        found: list[list[float] | None] = [None] * len(texts)
+        disk_lookups: dict[str, list[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[i] = vector
+                    self.hits += 1
+                else:
+                    disk_lookups.setdefault(key, []).append(i)
+
+            if disk_lookups and self._db is not None:
+                for key, vector in self._read_disk(list(disk_lookups)).items():
+                    for i in disk_lookups.pop(key):
+                        found[i] = vector
+                        self.disk_hits += 1
+                    self._remember(key, vector)
+
+            self.misses += sum(len(positions) for positions in disk_lookups.values())
+        return found
+
+    def put_many(self, model_name: str, texts: list[str], vectors: list[list[float]]) -> None:
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                if not vector:
+                    continue
+                key = self.make_key(model_name, text)
+                self._remember(key, list(vector))
+                rows.append((key, model_name, array("f", vector).tobytes(), time.time()))
+            self.writes += len(rows)
+            if rows and self._db is not None:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, model, vector, created_at) VALUES (?, ?, ?, ?)",
+                        rows,
+                    )
+                    self._db.commit()
+                except Exception as e:
+                    print(f"Embedding cache disk write failed: {e}")
+
+    def _remember(self, key: str, vector: list[float]) -> None:
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _read_disk(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        try:
+            # Stay well under SQLite's bound-parameter limit.
+            for offset in range(0, len(keys), 500):
+                part = keys[offset:offset + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        except Exception as e:
+            print(f"Embedding cache disk read failed: {e}")
+        return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_tier": self._db is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "writes": self.writes,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+embedding_cache = (
+    EmbeddingCache(
+        max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+        db_path=settings.EMBEDDING_CACHE_PATH or None,
+    )
+    if settings.EMBEDDING_CACHE_ENABLED
+    else None
+)
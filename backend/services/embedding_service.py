@@ -1,21 +1,115 @@
-from vertexai.language_models import TextEmbeddingModel
-import vertexai
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from config.settings import settings
+from services.clients import client_registry
+from services.embedding_cache import embedding_cache
+from utils.helpers import estimate_tokens
 
 # Usually global init happens in main or once per service
 # vertexai.init(project=settings.GOOGLE_PROJECT_ID, location=settings.GCP_LOCATION)
 
 class EmbeddingService:
-    def __init__(self):
-        # We use a standard text embedding model (e.g., text-embedding-004)
-        self.model = TextEmbeddingModel.from_pretrained("text-embedding-004")
+    def __init__(self, registry=None):
+        # We use a standard text embedding model (e.g., text-embedding-004), shared app-wide
+        self.model_name = settings.EMBEDDING_MODEL
+        self.model = (registry or client_registry).get_embedding_model()
+        self.cache = embedding_cache
 
     def generate_embedding(self, text: str) -> list[float]:
+        if self.cache:
+            cached = self.cache.get_many(self.model_name, [text])[0]
+            if cached is not None:
+                return cached
         try:
             embeddings = self.model.get_embeddings([text])
             if embeddings:
+                if self.cache:
+                    self.cache.put_many(self.model_name, [text], [embeddings[0].values])
                 return embeddings[0].values
             return []
         except Exception as e:
             print(f"Error generating embedding: {e}")
             return []
+
+    def generate_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embeds many texts using batched requests sent concurrently.
+        Results keep the input order. Returns [] if any batch still fails after retries.
+        """
+        if not texts:
+            return []
+
+        results: list[list[float] | None] = (
+            self.cache.get_many(self.model_name, texts) if self.cache else [None] * len(texts)
+        )
+
+        # Only embed each distinct missing text once.
+        pending: dict[str, list[int]] = {}
+        for i, text in enumerate(texts):
+            if results[i] is None:
+                pending.setdefault(text, []).append(i)
+        if not pending:
+            return results
+
+        missing = list(pending)
+        embedded = self._embed_uncached(missing)
+        if not embedded:
+            return []
+        if self.cache:
+            self.cache.put_many(self.model_name, missing, embedded)
+        for text, vector in zip(missing, embedded):
+            for i in pending[text]:
+                results[i] = vector
+
+        return results
+
+    def _embed_uncached(self, texts: list[str]) -> list[list[float]]:
+        batches = self._plan_batches(texts)
+        results: list[list[float] | None] = [None] * len(texts)
+        workers = max(1, min(settings.EMBEDDING_MAX_CONCURRENCY, len(batches)))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self._embed_batch, texts[start:end]): (start, end) for start, end in batches}
+            for future in as_completed(futures):
+                start, end = futures[future]
+                vectors = future.result()
+                if vectors is None:
+                    for pending in futures:
+                        pending.cancel()
+                    return []
+                results[start:end] = vectors
+
+        return results
+
+    def _plan_batches(self, texts: list[str]) -> list[tuple[int, int]]:
+        """Groups consecutive texts into (start, end) ranges within the model's per-request limits."""
+        batches = []
+        start = 0
+        batch_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            batch_len = i - start
+            if batch_len and (
+                batch_len >= settings.EMBEDDING_BATCH_SIZE
+                or batch_tokens + tokens > settings.EMBEDDING_BATCH_MAX_TOKENS
+            ):
+                batches.append((start, i))
+                start = i
+                batch_tokens = 0
+            batch_tokens += tokens
+        batches.append((start, len(texts)))
+        return batches
+
+    def _embed_batch(self, batch: list[str]) -> list[list[float]] | None:
+        """Embeds one batch, retrying only this batch with exponential backoff."""
+        for attempt in range(settings.EMBEDDING_MAX_RETRIES + 1):
+            try:
+                embeddings = self.model.get_embeddings(batch)
+                if len(embeddings) == len(batch):
+                    return [e.values for e in embeddings]
+                print(f"Embedding batch returned {len(embeddings)} vectors for {len(batch)} inputs")
+            except Exception as e:
+                print(f"Error generating batch embeddings (attempt {attempt + 1}): {e}")
+            if attempt < settings.EMBEDDING_MAX_RETRIES:
+                time.sleep(min(2 ** attempt * 0.5, 8))
+        return None
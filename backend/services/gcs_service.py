@@ -1,22 +1,16 @@
-from google.cloud import storage
 from config.settings import settings
+from services.clients import client_registry
 
 class GCSService:
-    def __init__(self):
-        # Implicitly uses GOOGLE_APPLICATION_CREDENTIALS 
-        self.client = storage.Client(project=settings.GOOGLE_PROJECT_ID)
-        self.bucket_name = f"{settings.GOOGLE_PROJECT_ID}-consultation-pdfs"
-        
-        # Ensure bucket exists
+    def __init__(self, registry=None):
+        # Bucket lookup/creation happens once in the shared client registry.
+        registry = registry or client_registry
+        self.bucket_name = registry.gcs_bucket_name
         try:
-             self.bucket = self.client.get_bucket(self.bucket_name)
-        except Exception:
-             print(f"Bucket {self.bucket_name} not found. Creating...")
-             try:
-                 self.bucket = self.client.create_bucket(self.bucket_name, location=settings.GCP_LOCATION)
-             except Exception as e:
-                 print(f"Failed to create bucket: {e}")
-                 self.bucket = None
+            self.bucket = registry.get_gcs_bucket()
+        except Exception as e:
+            print(f"Failed to create bucket: {e}")
+            self.bucket = None
 
     def upload_pdf(self, file_content: bytes, destination_blob_name: str) -> str:
         """Uploads a file to the bucket and returns the standard gs:// URL."""
@@ -32,3 +26,18 @@ class GCSService:
         except Exception as e:
             print(f"Error uploading to GCS: {e}")
             return ""
+
+    def upload_pdf_file(self, file_path: str, destination_blob_name: str) -> str:
+        """Streams a local file to the bucket with a chunked, resumable upload."""
+        if not self.bucket:
+             print("GCS Bucket not initialized.")
+             return ""
+
+        try:
+            blob = self.bucket.blob(destination_blob_name, chunk_size=settings.GCS_UPLOAD_CHUNK_BYTES)
+            blob.upload_from_filename(file_path, content_type="application/pdf")
+
+            return f"gs://{self.bucket_name}/{destination_blob_name}"
+        except Exception as e:
+            print(f"Error uploading to GCS: {e}")
+            return ""
@@ -1,87 +1,182 @@
 import asyncio
 import re
+import time
 import uuid
-import vertexai
-from vertexai.generative_models import GenerativeModel
 from config.settings import settings
-from agents.prompts import get_system_prompt
+from agents.prompts import AGENT_PHRASES, GREETING_CARRIER, get_system_prompt, greeting_opening
 from services.embedding_service import EmbeddingService
-from services.pinecone_service import PineconeService
+from services.vector_store import get_vector_store
 from services.speech_to_text import STTService
 from services.text_to_speech import TTSService
-from config.database import SessionLocal
+from services.outbound_audio import TURN_END
+from services.call_metrics import call_metrics
+from services.clients import client_registry
+from services.rag_context import RAG_TOP_K, rag_context_version
+from sqlalchemy import select, update
+from sqlalchemy.orm import selectinload
+from config.async_database import async_session
 from models.consultation import Consultation
 from models.patient import Patient
+from utils.helpers import split_complete_sentences, transcript_words
+
+INTERRUPTED_MARK = "[interrupted by patient]"
 
 class GeminiService:
-    def __init__(self, consultation_id: str, on_transcript_update=None):
+    def __init__(self, consultation_id: str, on_transcript_update=None, registry=None):
         self.consultation_id = consultation_id
+        self.registry = registry or client_registry
         self.patient_name = "Patient"
         self.consultation_summary = "General follow-up."
         self.transcript_lines: list[str] = []
         self.end_requested = False
         self.force_escalation = False
         self.on_transcript_update = on_transcript_update
+        # Set by the media stream handler: receives one append-only call_turns row per transcript change.
+        self.on_turn = None
         self.empty_turns = 0
+        self._session_started_at = time.perf_counter()
+        self._turn_revision = 0
+        self._last_patient_line_at: float | None = None
         
         # Audio handling sub-services (Google Cloud native)
-        self.stt = STTService(callback=self._on_patient_speaking)
-        self.tts = TTSService()
+        self.stt = STTService(
+            callback=self._on_patient_speaking,
+            client=self.registry.get_speech_client(),
+            on_speech_start=self._on_speech_start if settings.BARGE_IN_ENABLED else None,
+            on_endpoint=self._on_endpoint if settings.STT_ENDPOINTING_ENABLED else None,
+            on_endpoint_retracted=self._on_endpoint_retracted if settings.STT_ENDPOINTING_ENABLED else None,
+            on_voice_activity=self._on_voice_activity,
+        )
+        self.tts = TTSService(client=self.registry.get_tts_client())
         self.audio_out_queue = asyncio.Queue()
         self.chat = None
+        self.prepared = False
+        self.greeting = ""
+        self.greeting_audio: list[bytes] | None = None
+        self._turn_started_at: float | None = None
+        # Set by the media stream handler; barge-in clears its unplayed audio.
+        self.outbound = None
+        self._turn_task: asyncio.Task | None = None
+        self._turn_spoken: list[str] = []
+        self.patient_speaking = False
+        # Speculative (endpointed) turn awaiting Google's final: its text and what to roll back.
+        self._speculation: dict | None = None
+        self._llm_call: asyncio.Future | None = None
+        self._history_rollback: tuple[int, asyncio.Future | None] | None = None
 
     async def initialize(self):
         """Fetch RAG context from Pinecone, initialize Vertex AI, start Google STT listening loops."""
-        db = SessionLocal()
-        consultation = None
+        if not self.prepared:
+            await self.prepare()
+        # Start Google Speech-to-Text streaming
+        await self.stt.initialize()
+
+    async def prepare(self, synthesize_greeting: bool = False):
+        """
+        Everything that does not need the live media stream: DB lookup, RAG context,
+        the Gemini chat and (optionally) the greeting audio. Used to pre-warm a call
+        while Twilio is still fetching TwiML.
+        """
+        await self._load_context()
+        self.greeting = self._greeting_text()
+        if synthesize_greeting:
+            self.greeting_audio = [chunk async for chunk in self.tts.synthesize_spliced(self._greeting_parts())]
+        self.prepared = True
+
+    async def _load_context(self):
+        consultation = await self._load_consultation()
+
+        # Precomputed at ingestion; the live embed + Pinecone lookup only runs for
+        # consultations ingested before that (or under an older embedding model).
+        if consultation and consultation.rag_context_version == rag_context_version():
+            rag_context = consultation.rag_context or ""
+        else:
+            rag_context = await asyncio.to_thread(self._lookup_rag_context, consultation)
+            if consultation:
+                await self._store_rag_context(consultation.id, rag_context)
+
+        # Vertex AI SDK (gemini-2.5-flash); vertexai.init runs once per process in the registry
+        def _start_chat():
+            model = self.registry.get_generative_model(
+                settings.VERTEX_AI_MODEL,
+                system_instruction=get_system_prompt(self.patient_name, self.consultation_summary, rag_context=rag_context)
+            )
+            return model.start_chat()
+
+        self.chat = await asyncio.to_thread(_start_chat)
+
+    async def _load_consultation(self) -> Consultation | None:
         try:
-            try:
-                consultation_key = uuid.UUID(str(self.consultation_id))
-            except ValueError:
-                consultation_key = self.consultation_id
-
-            consultation = db.query(Consultation).filter(Consultation.id == consultation_key).first()
-            if consultation and consultation.patient:
-                self.patient_name = consultation.patient.name
-                self.consultation_summary = consultation.summary_text or self.consultation_summary
+            consultation_key = uuid.UUID(str(self.consultation_id))
+        except ValueError:
+            consultation_key = self.consultation_id
+        try:
+            async with async_session() as db:
+                consultation = (await db.execute(
+                    select(Consultation).options(selectinload(Consultation.patient)).where(Consultation.id == consultation_key)
+                )).scalar_one_or_none()
         except Exception as e:
             print(f"Error fetching DB patient: {e}")
-        finally:
-            db.close()
+            return None
+        if consultation and consultation.patient:
+            self.patient_name = consultation.patient.name
+            self.consultation_summary = consultation.summary_text or self.consultation_summary
+        return consultation
 
-        rag_context = ""
+    def _lookup_rag_context(self, consultation) -> str:
         try:
-            pinecone_db = PineconeService()
-            embedder = EmbeddingService()
+            vector_store = get_vector_store(self.registry)
+            embedder = EmbeddingService(self.registry)
             query_vector = embedder.generate_embedding(self.consultation_summary)
-            top_matches = pinecone_db.query_similar_chunks(
+            # Reused (deduplicated) uploads point at the consultation that owns the vectors.
+            vector_owner_id = (consultation.vector_consultation_id or consultation.id) if consultation else None
+            top_matches = vector_store.query_similar_chunks(
                 query_vector=query_vector,
-                consultation_id=str(consultation.id) if consultation else None,
-                top_k=3,
+                consultation_id=str(vector_owner_id) if vector_owner_id else None,
+                top_k=RAG_TOP_K,
             )
-            rag_context = " ".join([m.get("summary_text", "") for m in top_matches if m.get("summary_text")]).strip()
+            return " ".join([m.get("summary_text", "") for m in top_matches if m.get("summary_text")]).strip()
         except Exception as e:
             print(f"RAG context lookup failed: {e}")
+            return ""
 
-        # Vertex AI SDK (gemini-2.5-flash)
-        vertexai.init(project=settings.GOOGLE_PROJECT_ID, location=settings.GCP_LOCATION)
-        model = GenerativeModel(
-            model_name=settings.VERTEX_AI_MODEL,
-            system_instruction=get_system_prompt(self.patient_name, self.consultation_summary, rag_context=rag_context)
-        )
-        self.chat = model.start_chat()
-        
-        # Start Google Speech-to-Text streaming
-        await self.stt.initialize()
+    async def _store_rag_context(self, consultation_id, rag_context: str) -> None:
+        """Backfills the precomputed context so later calls skip the lookup."""
+        if not rag_context:
+            return
+        try:
+            async with async_session() as db:
+                await db.execute(
+                    update(Consultation)
+                    .where(Consultation.id == consultation_id)
+                    .values(rag_context=rag_context, rag_context_version=rag_context_version())
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"Failed to store RAG context for consultation {consultation_id}: {e}")
+
+    def _greeting_text(self) -> str:
+        return f"{greeting_opening(self.patient_name)} {GREETING_CARRIER}"
+
+    def _greeting_parts(self) -> list[tuple[str, bool]]:
+        # Only the short per-patient opening goes to TTS; the carrier phrase is cached.
+        return [(greeting_opening(self.patient_name), False), (GREETING_CARRIER, True)]
 
     async def start_conversation(self):
-        """Initiate the call with a synthesized greeting from Google TTS."""
-        greeting = f"Hi {self.patient_name}, this is Emily calling from the clinic to see how you're feeling since your last visit. Is now a good time to talk?"
+        """Initiate the call with a synthesized greeting from Google TTS (pre-synthesized when pre-warmed)."""
+        greeting = self.greeting or self._greeting_text()
         print("Gemini Agent Speaking:", greeting)
         await self._append_transcript_line(f"AI: {greeting}")
-        
-        async for chunk in self.tts.synthesize(greeting):
-            await self.audio_out_queue.put(chunk)
+
+        try:
+            if self.greeting_audio:
+                for chunk in self.greeting_audio:
+                    self.audio_out_queue.put_nowait(chunk)
+                return
+            async for chunk in self.tts.synthesize_spliced(self._greeting_parts()):
+                await self.audio_out_queue.put(chunk)
+        finally:
+            self.audio_out_queue.put_nowait(TURN_END)
 
     async def process_incoming_audio(self, mulaw_b64: str):
         """Receive Twilio audio via WebSocket and funnel it to Google STT"""
@@ -89,24 +184,157 @@ class GeminiService:
 
     async def _on_patient_speaking(self, text: str):
         """Callback from Google STT when the patient finishes a sentence."""
+        if self._speculation is not None:
+            if transcript_words(self._speculation["text"]) == transcript_words(text):
+                # The speculative turn already answered exactly this.
+                self._speculation = None
+                call_metrics.incr("endpoint_confirmed")
+                return
+            await self._retract_speculation()
+        if self.end_requested:
+            return
+        if not settings.BARGE_IN_ENABLED:
+            await self._run_turn(text)
+            return
+        # A reply still in flight is superseded by what the patient just said.
+        await self._barge_in()
+        # The turn runs beside the STT loop so the patient can interrupt it.
+        self._turn_task = asyncio.create_task(self._run_turn(text))
+
+    async def _run_turn(self, text: str):
+        self._turn_spoken = []
+        try:
+            await self._handle_turn(text)
+        finally:
+            # Lets the outbound stream tell a finished reply from audio arriving late.
+            self.audio_out_queue.put_nowait(TURN_END)
+
+    async def _on_endpoint(self, text: str):
+        """STT endpointed a stable interim; start the turn before Google's final arrives."""
+        if self.end_requested or self._speculation is not None:
+            return
+        await self._barge_in()
+        self._speculation = {
+            "text": text,
+            "transcript_lines": len(self.transcript_lines),
+            "history": self._history_length(),
+            "end_requested": self.end_requested,
+            "force_escalation": self.force_escalation,
+            "empty_turns": self.empty_turns,
+        }
+        self._turn_task = asyncio.create_task(self._run_turn(text))
+
+    async def _on_endpoint_retracted(self):
+        """The patient kept talking after the endpoint; the final result will start the real turn."""
+        await self._retract_speculation()
+
+    async def _retract_speculation(self):
+        speculation, self._speculation = self._speculation, None
+        if speculation is None:
+            return
+        if self._turn_task is not None and not self._turn_task.done():
+            self._turn_task.cancel()
+            await asyncio.gather(self._turn_task, return_exceptions=True)
+        if self.outbound is not None:
+            try:
+                await self.outbound.clear()
+            except Exception as e:
+                print(f"Failed to clear outbound audio: {e}")
+        self.end_requested = speculation["end_requested"]
+        self.force_escalation = speculation["force_escalation"]
+        self.empty_turns = speculation["empty_turns"]
+        if len(self.transcript_lines) > speculation["transcript_lines"]:
+            for seq in range(speculation["transcript_lines"], len(self.transcript_lines)):
+                self._record_turn(seq, retracted=True)
+            del self.transcript_lines[speculation["transcript_lines"]:]
+            await self._notify_transcript()
+        if speculation["history"] is not None:
+            # A cancelled Gemini call may still land in the chat history; trim it before the next send.
+            self._history_rollback = (speculation["history"], self._llm_call)
+        self._turn_spoken = []
+
+    def _history_length(self) -> int | None:
+        try:
+            return len(self.chat.history) if self.chat is not None else None
+        except Exception:
+            return None
+
+    async def _apply_history_rollback(self):
+        if self._history_rollback is None:
+            return
+        length, pending_call = self._history_rollback
+        self._history_rollback = None
+        if pending_call is not None:
+            await asyncio.gather(pending_call, return_exceptions=True)
+        try:
+            del self.chat.history[length:]
+        except Exception as e:
+            print(f"Failed to roll back speculative Gemini turn: {e}")
+
+    async def _on_voice_activity(self, speaking: bool):
+        """Local VAD speech/non-speech change on the inbound track."""
+        self.patient_speaking = speaking
+        if speaking:
+            call_metrics.incr("vad_speech_segments")
+            # Onsets arrive before STT's first interim, but line noise can trigger them too.
+            if settings.BARGE_IN_ON_VAD and settings.BARGE_IN_ENABLED and not self.end_requested and self._speculation is None:
+                await self._barge_in()
+
+    async def _on_speech_start(self):
+        """STT heard the patient start talking; interrupt the agent if it is mid-reply."""
         if self.end_requested:
             return
+        await self._barge_in()
+
+    async def _barge_in(self):
+        turn_active = self._turn_task is not None and not self._turn_task.done()
+        playing = self.outbound is not None and self.outbound.is_playing()
+        if not (turn_active or playing):
+            return
+
+        if turn_active:
+            # Cancels the pending Gemini/TTS work for the interrupted turn.
+            self._turn_task.cancel()
+            await asyncio.gather(self._turn_task, return_exceptions=True)
+        cut_ms = 0
+        if self.outbound is not None:
+            try:
+                cut_ms = await self.outbound.clear()
+            except Exception as e:
+                print(f"Failed to clear outbound audio: {e}")
+        call_metrics.incr("barge_ins")
+        call_metrics.observe("barge_in_cut_ms", cut_ms)
+        print(f"Patient barged in; dropped {cut_ms}ms of agent audio")
+        await self._mark_interrupted()
+
+    async def _mark_interrupted(self):
+        """Flags the agent line the patient talked over (or what was spoken of it) in the transcript."""
+        if self.transcript_lines and self.transcript_lines[-1].startswith("AI: "):
+            if not self.transcript_lines[-1].endswith(INTERRUPTED_MARK):
+                self.transcript_lines[-1] += f" {INTERRUPTED_MARK}"
+                self._record_turn(len(self.transcript_lines) - 1, interrupted=True)
+                await self._notify_transcript()
+        elif self._turn_spoken:
+            # A streamed reply is only logged once complete; keep the sentences already queued.
+            await self._append_transcript_line(f"AI: {' '.join(self._turn_spoken)} {INTERRUPTED_MARK}")
+        self._turn_spoken = []
+
+    async def _handle_turn(self, text: str):
+        self._turn_started_at = time.perf_counter()
 
         if not (text or "").strip():
             self.empty_turns += 1
             if self.empty_turns <= 2:
-                reprompt = "I could not hear you clearly. Could you please repeat that?"
+                reprompt = AGENT_PHRASES["reprompt"]
                 await self._append_transcript_line(f"AI: {reprompt}")
-                async for chunk in self.tts.synthesize(reprompt):
-                    await self.audio_out_queue.put(chunk)
+                await self._speak(reprompt, cacheable=True)
                 return
 
-            ai_text = "I am still unable to hear you. We will follow up again soon. Goodbye."
+            ai_text = AGENT_PHRASES["no_audio_goodbye"]
             self.force_escalation = True
             self.end_requested = True
             await self._append_transcript_line(f"AI: {ai_text}")
-            async for chunk in self.tts.synthesize(ai_text):
-                await self.audio_out_queue.put(chunk)
+            await self._speak(ai_text, cacheable=True)
             return
 
         self.empty_turns = 0
@@ -125,61 +353,130 @@ class GeminiService:
         ]
 
         if any(re.search(p, lower) for p in ok_patterns):
-            ai_text = "Glad to hear you're feeling okay. Thank you for your time. Goodbye."
+            ai_text = AGENT_PHRASES["ok_goodbye"]
             print("Gemini Agent Replying:", ai_text)
             await self._append_transcript_line(f"AI: {ai_text}")
             self.end_requested = True
-            async for chunk in self.tts.synthesize(ai_text):
-                await self.audio_out_queue.put(chunk)
+            await self._speak(ai_text, cacheable=True)
             return
 
         if any(re.search(p, lower) for p in problem_patterns):
-            ai_text = "Thank you for sharing that. I will alert your doctor right away. Goodbye."
+            ai_text = AGENT_PHRASES["problem_goodbye"]
             print("Gemini Agent Replying:", ai_text)
             await self._append_transcript_line(f"AI: {ai_text}")
             self.force_escalation = True
             self.end_requested = True
-            async for chunk in self.tts.synthesize(ai_text):
-                await self.audio_out_queue.put(chunk)
+            await self._speak(ai_text, cacheable=True)
             return
 
         try:
-            response = await asyncio.wait_for(asyncio.to_thread(self.chat.send_message, text), timeout=20)
-            ai_text = response.text
+            await self._apply_history_rollback()
+            if settings.LLM_STREAMING_TURNS:
+                # Each sentence is spoken as soon as Gemini finishes it; only Gemini's pace is timed.
+                ai_text = await self._stream_reply(text)
+            else:
+                # Shielded so a cancelled turn still leaves a handle on the running call.
+                self._llm_call = asyncio.ensure_future(asyncio.to_thread(self.chat.send_message, text))
+                response = await asyncio.wait_for(asyncio.shield(self._llm_call), timeout=settings.LLM_TIMEOUT_SECONDS)
+                ai_text = response.text
             print("Gemini Agent Replying:", ai_text)
             await self._append_transcript_line(f"AI: {ai_text}")
+            self._turn_spoken = [] # the full reply is logged now
             if "goodbye" in ai_text.lower():
                 self.end_requested = True
-            
-            # Send the LLM output back to TTS
-            async for chunk in self.tts.synthesize(ai_text):
-                await self.audio_out_queue.put(chunk)
+
+            if not settings.LLM_STREAMING_TURNS:
+                # Send the LLM output back to TTS
+                await self._speak(ai_text)
         except asyncio.TimeoutError:
-            ai_text = "I am having trouble processing right now. I will notify your doctor to follow up. Goodbye."
+            await self._log_spoken_part()
+            ai_text = AGENT_PHRASES["timeout_goodbye"]
             self.force_escalation = True
             self.end_requested = True
             await self._append_transcript_line(f"AI: {ai_text}")
-            async for chunk in self.tts.synthesize(ai_text):
-                await self.audio_out_queue.put(chunk)
+            await self._speak(ai_text, cacheable=True)
         except Exception as e:
             print(f"Vertex AI (Gemini) Error: {e}")
-            ai_text = "I am having technical trouble. Your doctor will follow up soon. Goodbye."
+            await self._log_spoken_part()
+            ai_text = AGENT_PHRASES["error_goodbye"]
             self.force_escalation = True
             self.end_requested = True
             await self._append_transcript_line(f"AI: {ai_text}")
-            async for chunk in self.tts.synthesize(ai_text):
-                await self.audio_out_queue.put(chunk)
+            await self._speak(ai_text, cacheable=True)
+
+    async def _log_spoken_part(self):
+        """Keeps the sentences of a failed streamed reply that the patient already heard."""
+        if self._turn_spoken:
+            await self._append_transcript_line(f"AI: {' '.join(self._turn_spoken)}")
+        self._turn_spoken = []
+
+    async def _stream_reply(self, text: str) -> str:
+        """
+        Streams the Gemini reply, handing each complete sentence to TTS while later
+        sentences are still generating. Returns the assembled reply. LLM_TIMEOUT_SECONDS
+        bounds the wait for the first piece and between pieces, not the speaking.
+        """
+        loop = asyncio.get_running_loop()
+        pieces: asyncio.Queue = asyncio.Queue()
+        sentences: asyncio.Queue = asyncio.Queue()
+
+        def _pump():
+            # The Vertex SDK stream is blocking; iterate it on a worker thread.
+            try:
+                for response in self.chat.send_message(text, stream=True):
+                    try:
+                        piece = response.text
+                    except ValueError:
+                        continue # chunk without text (e.g. safety metadata only)
+                    loop.call_soon_threadsafe(pieces.put_nowait, piece)
+            except Exception as e:
+                loop.call_soon_threadsafe(pieces.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(pieces.put_nowait, None)
+
+        async def _speak_sentences():
+            while (sentence := await sentences.get()) is not None:
+                await self._speak(sentence)
 
-    async def get_audio_chunks(self):
-        """Generator to drain audio out queue to Twilio WebSockets."""
-        while True:
-            chunk = await self.audio_out_queue.get()
-            if chunk is None:
-                break
-            yield chunk
+        speaker = asyncio.create_task(_speak_sentences())
+        pump = asyncio.create_task(asyncio.to_thread(_pump))
+        self._llm_call = pump
+        parts: list[str] = []
+        pending = ""
+        try:
+            while (piece := await asyncio.wait_for(pieces.get(), timeout=settings.LLM_TIMEOUT_SECONDS)) is not None:
+                if isinstance(piece, Exception):
+                    raise piece
+                parts.append(piece)
+                complete, pending = split_complete_sentences(pending + piece)
+                for sentence in complete:
+                    sentences.put_nowait(sentence)
+            if pending.strip():
+                sentences.put_nowait(pending.strip())
+            sentences.put_nowait(None)
+            await speaker
+        except BaseException:
+            speaker.cancel()
+            # The worker thread finishes on its own; only its result is dropped.
+            pump.add_done_callback(lambda t: t.cancelled() or t.exception())
+            raise
+        return "".join(parts)
+
+    async def _speak(self, text: str, cacheable: bool = False):
+        """Synthesizes text and queues the audio; records the turn's time-to-first-audio."""
+        async for chunk in self.tts.synthesize(text, cacheable=cacheable):
+            if self._turn_started_at is not None:
+                latency_ms = (time.perf_counter() - self._turn_started_at) * 1000
+                self._turn_started_at = None
+                call_metrics.observe("turn_first_audio", latency_ms)
+                print(f"Turn time-to-first-audio: {latency_ms:.0f}ms")
+            await self.audio_out_queue.put(chunk)
+        self._turn_spoken.append(text)
 
     async def close(self):
         """Cleanup Streams."""
+        if self._turn_task is not None:
+            self._turn_task.cancel()
         await self.stt.close()
         await self.audio_out_queue.put(None)
 
@@ -188,13 +485,45 @@ class GeminiService:
         return "\n".join(self.transcript_lines).strip()
 
     def should_end_conversation(self) -> bool:
-        return self.end_requested
+        # A speculative goodbye only ends the call once Google's final confirms it.
+        return self.end_requested and self._speculation is None
 
     def should_force_escalation(self) -> bool:
         return self.force_escalation
 
     async def _append_transcript_line(self, line: str) -> None:
         self.transcript_lines.append(line)
+        self._record_turn(len(self.transcript_lines) - 1, interrupted=line.endswith(INTERRUPTED_MARK))
+        await self._notify_transcript()
+
+    def _record_turn(self, seq: int, interrupted: bool = False, retracted: bool = False) -> None:
+        """Emits the current state of transcript line `seq` as a new call_turns revision."""
+        if not self.on_turn:
+            return
+        now = time.perf_counter()
+        speaker, _, text = self.transcript_lines[seq].partition(": ")
+        response_ms = None
+        if speaker == "Patient":
+            if not retracted:
+                self._last_patient_line_at = now
+        elif self._last_patient_line_at is not None and not (interrupted or retracted):
+            response_ms = int((now - self._last_patient_line_at) * 1000)
+        self._turn_revision += 1
+        try:
+            self.on_turn({
+                "seq": seq,
+                "revision": self._turn_revision,
+                "speaker": speaker,
+                "text": text,
+                "offset_ms": int((now - self._session_started_at) * 1000),
+                "response_ms": response_ms,
+                "interrupted": interrupted,
+                "retracted": retracted,
+            })
+        except Exception as e:
+            print(f"Failed to record call turn: {e}")
+
+    async def _notify_transcript(self) -> None:
         if self.on_transcript_update:
             try:
                 await self.on_transcript_update(self.get_transcript())
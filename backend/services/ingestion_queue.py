@@ -0,0 +1,207 @@
+import asyncio
+import uuid
+from pathlib import Path
+
+from config.database import SessionLocal
+from config.settings import settings
+from models.ingestion_job import IngestionJob
+from services.ingestion_service import ConsultationUpload, IngestionError, StageTracker, get_spool_dir, ingest_consultation
+
+
+class IngestionQueueFull(Exception):
+    pass
+
+
+def serialize_job(job: IngestionJob) -> dict:
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "filename": job.filename,
+        "consultation_id": str(job.consultation_id) if job.consultation_id else None,
+        "error": job.error,
+        "result": job.result,
+        "stages": job.stages or {},
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+class IngestionQueue:
+    """
+    Bounded background worker pool for consultation ingestion.
+    Jobs are persisted in the application database and the PDF is spooled to local
+    disk, so it runs without external queue services and resumes pending jobs on restart.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.spool_dir = get_spool_dir()
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._pending = 0
+
+    async def start(self) -> None:
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        for job_id in await asyncio.to_thread(self._recover_jobs):
+            self._pending += 1
+            self._queue.put_nowait(job_id)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, upload: ConsultationUpload, pdf_path: Path) -> dict:
+        """Records a queued job for an already spooled PDF and hands it to the workers."""
+        if self._queue is None:
+            raise RuntimeError("Ingestion queue is not running.")
+        if self._pending >= self.max_pending:
+            raise IngestionQueueFull()
+        self._pending += 1
+        try:
+            job_id = uuid.uuid4()
+            job = await asyncio.to_thread(self._create_job, job_id, upload, pdf_path)
+        except BaseException:
+            self._pending -= 1
+            raise
+        self._queue.put_nowait(job_id)
+        return job
+
+    def get_job(self, job_id: uuid.UUID) -> dict | None:
+        db = SessionLocal()
+        try:
+            job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+            return serialize_job(job) if job else None
+        finally:
+            db.close()
+
+    def _create_job(self, job_id: uuid.UUID, upload: ConsultationUpload, pdf_path: Path) -> dict:
+        db = SessionLocal()
+        try:
+            job = IngestionJob(
+                id=job_id,
+                status="queued",
+                filename=upload.filename,
+                pdf_path=str(pdf_path),
+                payload=upload.to_payload(),
+                stages={},
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            return serialize_job(job)
+        finally:
+            db.close()
+
+    def _recover_jobs(self) -> list[uuid.UUID]:
+        """Requeues jobs left queued/running by a previous process."""
+        db = SessionLocal()
+        try:
+            jobs = db.query(IngestionJob).filter(IngestionJob.status.in_(["queued", "running"])).all()
+            recovered = []
+            for job in jobs:
+                if job.pdf_path and Path(job.pdf_path).exists():
+                    job.status = "queued"
+                    recovered.append(job.id)
+                else:
+                    job.status = "failed"
+                    job.error = {"error": "SPOOL_MISSING", "message": "Stored PDF was lost before processing."}
+            db.commit()
+            return recovered
+        except Exception as e:
+            db.rollback()
+            print(f"Failed to recover ingestion jobs: {e}")
+            return []
+        finally:
+            db.close()
+
+    def _update_job(self, job_id: uuid.UUID, **fields) -> None:
+        db = SessionLocal()
+        try:
+            job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+            if job:
+                for key, value in fields.items():
+                    setattr(job, key, value)
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Failed to update ingestion job {job_id}: {e}")
+        finally:
+            db.close()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"Ingestion job {job_id} crashed: {e}")
+            finally:
+                self._pending -= 1
+                self._queue.task_done()
+
+    async def _run(self, job_id: uuid.UUID) -> None:
+        job = await asyncio.to_thread(self._load_job_input, job_id)
+        if not job:
+            return
+        payload, pdf_path = job
+        update_lock = asyncio.Lock()
+
+        async def _on_stage_change(stages: dict):
+            async with update_lock:
+                await asyncio.to_thread(self._update_job, job_id, stages=stages)
+
+        await asyncio.to_thread(self._update_job, job_id, status="running")
+        tracker = StageTracker(on_change=_on_stage_change)
+        db = SessionLocal()
+        try:
+            result = await ingest_consultation(db, ConsultationUpload.from_payload(payload), Path(pdf_path), tracker)
+        except IngestionError as e:
+            await asyncio.to_thread(db.rollback)
+            async with update_lock:
+                await asyncio.to_thread(
+                    self._update_job, job_id, status="failed", error=e.to_detail(), stages=tracker.snapshot()
+                )
+            return
+        except Exception as e:
+            await asyncio.to_thread(db.rollback)
+            async with update_lock:
+                await asyncio.to_thread(
+                    self._update_job,
+                    job_id,
+                    status="failed",
+                    error={"error": "INGESTION_FAILED", "message": str(e)},
+                    stages=tracker.snapshot(),
+                )
+            return
+        finally:
+            await asyncio.to_thread(db.close)
+            Path(pdf_path).unlink(missing_ok=True)
+
+        async with update_lock:
+            await asyncio.to_thread(
+                self._update_job,
+                job_id,
+                status="succeeded",
+                consultation_id=uuid.UUID(result.consultation_id),
+                result={"dedupe": result.dedupe},
+                stages=tracker.snapshot(),
+            )
+
+    def _load_job_input(self, job_id: uuid.UUID) -> tuple[dict, str] | None:
+        db = SessionLocal()
+        try:
+            job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+            return (job.payload, job.pdf_path) if job else None
+        finally:
+            db.close()
+
+
+ingestion_queue = IngestionQueue(
+    workers=settings.INGESTION_WORKERS,
+    max_pending=settings.INGESTION_MAX_PENDING,
+)
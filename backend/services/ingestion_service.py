@@ -0,0 +1,410 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+
+from config.settings import settings, ROOT_DIR
+
+from models.consultation import Consultation
+from models.patient import Patient
+from services.pdf_parser import extract_text
+from services.embedding_service import EmbeddingService
+from services.vector_store import get_vector_store
+from services.gcs_service import GCSService
+from services.clients import ClientRegistry, client_registry
+from services.rag_context import rag_context_version, select_rag_context
+from utils.helpers import chunk_text_structured, normalize_phone_number
+
+
+@dataclass
+class ConsultationUpload:
+    """Validated upload form fields, shared by the sync route and queued jobs."""
+    patient_name: str
+    phone_number: str
+    doctor_id: str
+    follow_up_date: datetime
+    filename: str
+    content_hash: str = ""
+
+    def to_payload(self) -> dict:
+        return {
+            "patient_name": self.patient_name,
+            "phone_number": self.phone_number,
+            "doctor_id": self.doctor_id,
+            "follow_up_date": self.follow_up_date.isoformat(),
+            "filename": self.filename,
+            "content_hash": self.content_hash,
+        }
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "ConsultationUpload":
+        return cls(
+            patient_name=payload["patient_name"],
+            phone_number=payload["phone_number"],
+            doctor_id=payload["doctor_id"],
+            follow_up_date=datetime.fromisoformat(payload["follow_up_date"]),
+            filename=payload["filename"],
+            content_hash=payload.get("content_hash", ""),
+        )
+
+
+@dataclass
+class IngestionResult:
+    consultation_id: str
+    dedupe: dict
+
+
+class IngestionError(Exception):
+    """Pipeline failure carrying the API error code the upload route reports."""
+
+    def __init__(self, status_code: int, error: str, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.error = error
+        self.message = message
+
+    def to_detail(self) -> dict:
+        return {"error": self.error, "message": self.message}
+
+
+def build_consultation_upload(
+    patient_name: str,
+    phone_number: str,
+    doctor_id: str,
+    filename: str,
+    followup_days: int | None = None,
+    followup_datetime: str | None = None,
+) -> ConsultationUpload:
+    """Validates upload fields (follow-up schedule, phone number). Raises IngestionError(400)."""
+    follow_up_date: datetime
+    if followup_datetime:
+        try:
+            parsed = datetime.fromisoformat(followup_datetime.replace("Z", "+00:00"))
+        except ValueError:
+            raise IngestionError(400, "INVALID_FOLLOWUP_DATETIME", "followup_datetime must be ISO-8601.")
+
+        # Treat naive datetimes as UTC to keep the API deterministic.
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        follow_up_date = parsed.astimezone(timezone.utc)
+        if follow_up_date <= datetime.now(timezone.utc):
+            raise IngestionError(400, "INVALID_FOLLOWUP_DATETIME", "followup_datetime must be in the future.")
+    else:
+        if followup_days is None:
+            raise IngestionError(400, "MISSING_FOLLOWUP", "Provide followup_datetime or followup_days.")
+        if followup_days < 0:
+            raise IngestionError(400, "INVALID_FOLLOWUP_DAYS", "followup_days must be >= 0.")
+        follow_up_date = datetime.now(timezone.utc) + timedelta(days=followup_days)
+
+    ok_phone, normalized_phone = normalize_phone_number(phone_number)
+    if not ok_phone:
+        raise IngestionError(400, "INVALID_PHONE_NUMBER", "Phone number must be valid E.164.")
+
+    return ConsultationUpload(
+        patient_name=patient_name,
+        phone_number=normalized_phone,
+        doctor_id=doctor_id,
+        follow_up_date=follow_up_date,
+        filename=filename,
+    )
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def get_spool_dir() -> Path:
+    spool_dir = Path(settings.INGESTION_SPOOL_DIR)
+    return spool_dir if spool_dir.is_absolute() else ROOT_DIR / spool_dir
+
+
+async def spool_upload(file: UploadFile, max_bytes: int | None = None) -> tuple[Path, int, str]:
+    """
+    Streams an upload to a spool file in fixed-size chunks, so at most one chunk of the
+    PDF is held in memory. Raises UploadTooLarge past max_bytes.
+    Returns (path, size, sha256 hex digest of the content).
+    """
+    max_bytes = settings.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    spool_dir = get_spool_dir()
+    await asyncio.to_thread(spool_dir.mkdir, parents=True, exist_ok=True)
+    pdf_path = spool_dir / f"{uuid.uuid4()}.pdf"
+    size = 0
+    digest = hashlib.sha256()
+    handle = await asyncio.to_thread(open, pdf_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(settings.UPLOAD_READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge()
+            digest.update(chunk)
+            await asyncio.to_thread(handle.write, chunk)
+    except BaseException:
+        await asyncio.to_thread(handle.close)
+        pdf_path.unlink(missing_ok=True)
+        raise
+    await asyncio.to_thread(handle.close)
+    return pdf_path, size, digest.hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(settings.UPLOAD_READ_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dedupe_enabled_for(doctor_id: str) -> bool:
+    disabled = {d.strip() for d in settings.UPLOAD_DEDUPE_DISABLED_DOCTORS.split(",") if d.strip()}
+    return settings.UPLOAD_DEDUPE_ENABLED and doctor_id not in disabled
+
+
+def apply_duplicate_upload(db: Session, upload: ConsultationUpload) -> IngestionResult | None:
+    """
+    Looks for an earlier consultation with the same PDF for the same patient.
+    A still-pending match is only rescheduled; otherwise a new consultation reuses the
+    stored PDF, extracted text and vectors. Returns None when the upload is new.
+    """
+    if not upload.content_hash:
+        return None
+    patient = find_patient(db, upload.phone_number)
+    if not patient:
+        return None
+    existing = (
+        db.query(Consultation)
+        .filter(Consultation.patient_id == patient.id, Consultation.content_hash == upload.content_hash)
+        .order_by(Consultation.created_at.desc())
+        .first()
+    )
+    if not existing or not existing.summary_text or not existing.pdf_url:
+        return None
+
+    dedupe = {"decision": "rescheduled", "content_hash": upload.content_hash, "matched_consultation_id": str(existing.id)}
+    if existing.status == "pending":
+        existing.follow_up_date = upload.follow_up_date
+        db.commit()
+        return IngestionResult(consultation_id=str(existing.id), dedupe=dedupe)
+
+    consultation = Consultation(
+        patient_id=patient.id,
+        doctor_id=upload.doctor_id,
+        pdf_url=existing.pdf_url,
+        summary_text=existing.summary_text,
+        content_hash=upload.content_hash,
+        vector_consultation_id=existing.vector_consultation_id or existing.id,
+        rag_context=existing.rag_context,
+        rag_context_version=existing.rag_context_version,
+        follow_up_date=upload.follow_up_date,
+        status="pending",
+    )
+    db.add(consultation)
+    db.commit()
+    return IngestionResult(consultation_id=str(consultation.id), dedupe={**dedupe, "decision": "reused"})
+
+
+class StageTracker:
+    """Records status and timing per pipeline stage; stages may overlap."""
+
+    def __init__(self, on_change=None):
+        self.stages: dict[str, dict] = {}
+        self.on_change = on_change
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        entry = {
+            "status": "running",
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "finished_at": None,
+            "duration_ms": None,
+            "error": None,
+        }
+        self.stages[name] = entry
+        await self._notify()
+        started = time.perf_counter()
+        try:
+            yield
+        except IngestionError as e:
+            entry["status"] = "failed"
+            entry["error"] = e.error
+            raise
+        except BaseException as e:
+            entry["status"] = "failed"
+            entry["error"] = type(e).__name__
+            raise
+        else:
+            entry["status"] = "succeeded"
+        finally:
+            entry["finished_at"] = datetime.now(timezone.utc).isoformat()
+            entry["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            await self._notify()
+
+    def snapshot(self) -> dict:
+        return {name: dict(entry) for name, entry in self.stages.items()}
+
+    async def _notify(self) -> None:
+        if self.on_change:
+            try:
+                await self.on_change(self.snapshot())
+            except Exception as e:
+                print(f"Stage status update failed: {e}")
+
+
+async def ingest_consultation(
+    db: Session,
+    upload: ConsultationUpload,
+    pdf_path: Path,
+    tracker: StageTracker | None = None,
+    registry: ClientRegistry | None = None,
+) -> IngestionResult:
+    """
+    Staged ingestion pipeline: GCS upload overlaps parse + embed, and all blocking
+    work runs in worker threads/processes. The PDF is read from its spool file by
+    each stage rather than held in memory. Repeat uploads of the same PDF for a
+    patient short-circuit before any GCS, Vertex or vector store call.
+    """
+    tracker = tracker or StageTracker()
+
+    dedupe = {"decision": "disabled", "content_hash": upload.content_hash, "matched_consultation_id": None}
+    if dedupe_enabled_for(upload.doctor_id):
+        async with tracker.stage("dedupe"):
+            if not upload.content_hash:
+                upload.content_hash = await asyncio.to_thread(hash_file, pdf_path)
+            try:
+                duplicate = await asyncio.to_thread(apply_duplicate_upload, db, upload)
+            except Exception as e:
+                await asyncio.to_thread(db.rollback)
+                raise IngestionError(500, "DATABASE_WRITE_FAILED", f"Failed to save consultation: {str(e)}")
+        if duplicate:
+            return duplicate
+        dedupe = {**dedupe, "decision": "new", "content_hash": upload.content_hash}
+
+    async with tracker.stage("init_services"):
+        try:
+            gcs_service, embedder, vector_store = await asyncio.to_thread(init_cloud_services, registry)
+        except Exception as e:
+            raise IngestionError(502, "SERVICE_INIT_FAILED", f"Cloud service initialization failed: {str(e)}")
+
+    # The GCS upload runs alongside parsing and embedding.
+    destination_name = f"{uuid.uuid4()}_{upload.filename}"
+
+    async def _upload_pdf() -> str:
+        async with tracker.stage("gcs_upload"):
+            pdf_url = await asyncio.to_thread(gcs_service.upload_pdf_file, str(pdf_path), destination_name)
+            if not pdf_url:
+                raise IngestionError(502, "GCS_UPLOAD_FAILED", "Failed to upload consultation PDF.")
+            return pdf_url
+
+    upload_task = asyncio.create_task(_upload_pdf())
+    try:
+        # CPU-bound parsing, fanned out by page range across the process pool.
+        async with tracker.stage("extract_text"):
+            summary_text = await extract_text(pdf_path)
+            if not summary_text:
+                raise IngestionError(400, "PDF_TEXT_EXTRACTION_FAILED", "Could not extract text from PDF.")
+
+        # Chunk + embed on worker threads (network bound).
+        async with tracker.stage("embed"):
+            chunks = chunk_text_structured(summary_text, settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS) or [summary_text]
+            # The full text rides along in the same request; it is the call-time RAG query.
+            vectors = await asyncio.to_thread(embedder.generate_embeddings, chunks + [summary_text])
+            if len(vectors) != len(chunks) + 1:
+                raise IngestionError(502, "EMBEDDING_FAILED", "Failed to generate embedding from consultation text.")
+            query_vector, vectors = vectors[-1], vectors[:-1]
+            rag_context = select_rag_context(query_vector, chunks, vectors)
+
+        pdf_url = await upload_task
+    except BaseException:
+        if not upload_task.done():
+            # Let the upload finish in the background; only its result is dropped.
+            upload_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        raise
+
+    # Ids are assigned up front so vectors are written before the single, short DB transaction.
+    consultation_id = uuid.uuid4()
+    async with tracker.stage("vector_upsert"):
+        patient = await asyncio.to_thread(find_patient, db, upload.phone_number)
+        patient_id = patient.id if patient else uuid.uuid4()
+        patient_name = patient.name if patient else upload.patient_name.strip()
+        vectors_to_upsert = build_chunk_vectors(consultation_id, patient_id, patient_name, upload, chunks, vectors)
+        if not await asyncio.to_thread(vector_store.upsert_chunks, vectors_to_upsert):
+            raise IngestionError(502, "PINECONE_UPSERT_FAILED", "Failed to store consultation vectors.")
+
+    async with tracker.stage("persist"):
+        try:
+            await asyncio.to_thread(
+                persist_consultation, db, upload, consultation_id, patient, patient_id, pdf_url, summary_text, rag_context
+            )
+        except Exception as e:
+            await asyncio.to_thread(db.rollback)
+            raise IngestionError(500, "DATABASE_WRITE_FAILED", f"Failed to save consultation: {str(e)}")
+
+    return IngestionResult(consultation_id=str(consultation_id), dedupe=dedupe)
+
+def init_cloud_services(registry: ClientRegistry | None = None):
+    """Thin per-request service wrappers around the application-lifetime clients."""
+    registry = registry or client_registry
+    return GCSService(registry), EmbeddingService(registry), get_vector_store(registry)
+
+def find_patient(db: Session, phone_number: str) -> Patient | None:
+    return db.query(Patient).filter(Patient.phone_number == phone_number).first()
+
+def persist_consultation(
+    db: Session,
+    upload: ConsultationUpload,
+    consultation_id: uuid.UUID,
+    patient: Patient | None,
+    patient_id: uuid.UUID,
+    pdf_url: str,
+    summary_text: str,
+    rag_context: str | None = None,
+) -> None:
+    # The patient may have been created by an earlier document in the same bulk run.
+    if not patient and db.get(Patient, patient_id) is None:
+        db.add(Patient(id=patient_id, name=upload.patient_name.strip(), phone_number=upload.phone_number, doctor_id=upload.doctor_id))
+        db.flush()
+
+    db.add(
+        Consultation(
+            id=consultation_id,
+            patient_id=patient_id,
+            doctor_id=upload.doctor_id,
+            pdf_url=pdf_url,
+            summary_text=summary_text,
+            content_hash=upload.content_hash or None,
+            rag_context=rag_context,
+            rag_context_version=rag_context_version() if rag_context is not None else None,
+            follow_up_date=upload.follow_up_date,
+            status="pending",
+        )
+    )
+    db.commit()
+
+def build_chunk_vectors(consultation_id, patient_id, patient_name, upload: ConsultationUpload, chunks, vectors) -> list[dict]:
+    vectors_to_upsert = []
+    for i, (chunk, vector) in enumerate(zip(chunks, vectors)):
+        vectors_to_upsert.append(
+            {
+                "id": f"{consultation_id}_chunk_{i}",
+                "values": vector,
+                "metadata": {
+                    "consultation_id": str(consultation_id),
+                    "patient_id": str(patient_id),
+                    "patient_name": patient_name,
+                    "doctor_id": upload.doctor_id,
+                    "diagnosis": "",
+                    "follow_up_date": upload.follow_up_date.isoformat(),
+                    "summary_text": chunk,
+                    "chunk_index": i,
+                },
+            }
+        )
+    return vectors_to_upsert
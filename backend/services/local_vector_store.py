@@ -0,0 +1,284 @@
+import json
+import os
+from pathlib import Path
+from threading import RLock
+
+import numpy as np
+
+from services.vector_store import VectorStore
+
+SCORE_BLOCK_ROWS = 4096 # keeps the int8 -> float32 scratch block cache-sized
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store for offline runs, tests and small deployments.
+
+    Vectors are L2-normalized on write and kept in one contiguous memory-mapped
+    array (float32, or int8 with a per-row scale when quantize=True), so cosine
+    scoring is a single matrix-vector product. Metadata lives in memory, rebuilt at
+    startup from an append-only JSONL log, with a row index per consultation_id so
+    filtered queries only touch that consultation's rows. Single-process writer.
+    """
+
+    def __init__(self, path: str | Path, dimension: int = 768, quantize: bool = False, initial_capacity: int = 1024):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.quantize = quantize
+        self._lock = RLock()
+        self._dtype = np.int8 if quantize else np.float32
+        self._vectors_path = self.path / ("vectors.i8.npy" if quantize else "vectors.f32.npy")
+        self._scales_path = self.path / "scales.f32.npy"
+        self._log_path = self.path / "metadata.jsonl"
+
+        self._ids: list[str | None] = []
+        self._metadata: list[dict | None] = []
+        self._rows: dict[str, int] = {}
+        self._by_consultation: dict[str, set[int]] = {}
+        self._free_rows: list[int] = []
+        self._open_arrays(initial_capacity)
+        self._replay_log()
+
+    # Storage
+
+    def _open_arrays(self, initial_capacity: int) -> None:
+        if self._vectors_path.exists():
+            self._vectors = np.lib.format.open_memmap(self._vectors_path, mode="r+")
+            if self._vectors.shape[1] != self.dimension or self._vectors.dtype != self._dtype:
+                raise ValueError(f"{self._vectors_path} holds {self._vectors.dtype} x {self._vectors.shape[1]} vectors")
+        else:
+            self._vectors = np.lib.format.open_memmap(
+                self._vectors_path, mode="w+", dtype=self._dtype, shape=(initial_capacity, self.dimension)
+            )
+        self._scales = None
+        if self.quantize:
+            if self._scales_path.exists():
+                self._scales = np.lib.format.open_memmap(self._scales_path, mode="r+")
+            else:
+                self._scales = np.lib.format.open_memmap(
+                    self._scales_path, mode="w+", dtype=np.float32, shape=(len(self._vectors),)
+                )
+        self._alive = np.zeros(len(self._vectors), dtype=bool)
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        self._vectors = self._resize(self._vectors, self._vectors_path, (new_capacity, self.dimension))
+        if self._scales is not None:
+            self._scales = self._resize(self._scales, self._scales_path, (new_capacity,))
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:capacity] = self._alive
+        self._alive = alive
+
+    @staticmethod
+    def _resize(array: np.memmap, path: Path, shape: tuple) -> np.memmap:
+        tmp_path = path.with_suffix(".tmp")
+        resized = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=array.dtype, shape=shape)
+        resized[: len(array)] = array
+        resized.flush()
+        del resized, array
+        os.replace(tmp_path, path)
+        return np.lib.format.open_memmap(path, mode="r+")
+
+    def _replay_log(self) -> None:
+        if not self._log_path.exists():
+            return
+        with open(self._log_path, encoding="utf-8") as log:
+            for line in log:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry["op"] == "upsert":
+                    self._index_row(entry["id"], entry["row"], entry["metadata"])
+                elif entry["op"] == "delete":
+                    for vector_id in entry["ids"]:
+                        self._unindex(vector_id)
+        used = len(self._ids)
+        self._free_rows = [row for row in range(used) if self._ids[row] is None]
+
+    def _append_log(self, entries: list[dict]) -> None:
+        with open(self._log_path, "a", encoding="utf-8") as log:
+            log.write("".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries))
+
+    def _index_row(self, vector_id: str, row: int, metadata: dict) -> None:
+        if row >= len(self._ids):
+            missing = row + 1 - len(self._ids)
+            self._ids.extend([None] * missing)
+            self._metadata.extend([None] * missing)
+        if vector_id in self._rows:
+            # Re-upserts may move a chunk to another consultation; rebuild its index entries.
+            self._unindex(vector_id)
+        self._ids[row] = vector_id
+        self._metadata[row] = metadata
+        self._rows[vector_id] = row
+        self._alive[row] = True
+        consultation_id = metadata.get("consultation_id")
+        if consultation_id:
+            self._by_consultation.setdefault(str(consultation_id), set()).add(row)
+
+    def _unindex(self, vector_id: str) -> int | None:
+        row = self._rows.pop(vector_id, None)
+        if row is None:
+            return None
+        consultation_id = (self._metadata[row] or {}).get("consultation_id")
+        rows = self._by_consultation.get(str(consultation_id)) if consultation_id else None
+        if rows is not None:
+            rows.discard(row)
+            if not rows:
+                del self._by_consultation[str(consultation_id)]
+        self._ids[row] = None
+        self._metadata[row] = None
+        self._alive[row] = False
+        return row
+
+    # VectorStore
+
+    def upsert_chunks(self, vectors: list[dict], batch_size: int | None = None) -> bool:
+        if not vectors:
+            return False
+        try:
+            values = np.asarray([vector["values"] for vector in vectors], dtype=np.float32)
+            if values.ndim != 2 or values.shape[1] != self.dimension:
+                raise ValueError(f"expected {self.dimension}-dimensional vectors, got shape {values.shape}")
+            norms = np.linalg.norm(values, axis=1, keepdims=True)
+            values /= np.where(norms == 0, 1.0, norms)
+
+            with self._lock:
+                rows = []
+                next_row = len(self._ids)
+                free = list(self._free_rows)
+                assigned: dict[str, int] = {}
+                for vector in vectors:
+                    row = self._rows.get(vector["id"], assigned.get(vector["id"]))
+                    if row is None:
+                        if free:
+                            row = free.pop()
+                        else:
+                            row = next_row
+                            next_row += 1
+                    assigned[vector["id"]] = row
+                    rows.append(row)
+                self._grow(next_row)
+
+                row_index = np.asarray(rows)
+                if self.quantize:
+                    scales = np.abs(values).max(axis=1) / 127.0
+                    scales[scales == 0] = 1.0
+                    self._vectors[row_index] = np.round(values / scales[:, None]).astype(np.int8)
+                    self._scales[row_index] = scales
+                    self._scales.flush()
+                else:
+                    self._vectors[row_index] = values
+                self._vectors.flush()
+
+                # Vectors are on disk before the log references their rows.
+                entries = []
+                for vector, row in zip(vectors, rows):
+                    metadata = dict(vector.get("metadata") or {})
+                    self._index_row(vector["id"], row, metadata)
+                    entries.append({"op": "upsert", "id": vector["id"], "row": row, "metadata": metadata})
+                self._free_rows = free
+                self._append_log(entries)
+            return True
+        except Exception as e:
+            print(f"Error upserting chunks to local vector store: {e}")
+            return False
+
+    def query_similar_chunks(
+        self,
+        query_vector: list[float],
+        consultation_id: str | None = None,
+        top_k: int = 3,
+        metadata_filter: dict | None = None,
+    ) -> list[dict]:
+        if not query_vector or top_k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query /= norm
+
+        with self._lock:
+            if consultation_id is not None:
+                rows = np.fromiter(sorted(self._by_consultation.get(str(consultation_id), ())), dtype=np.int64)
+            else:
+                rows = None
+            if metadata_filter:
+                candidates = rows if rows is not None else np.flatnonzero(self._alive[: len(self._ids)])
+                rows = np.asarray(
+                    [row for row in candidates if _matches(self._metadata[row], metadata_filter)], dtype=np.int64
+                )
+            if rows is not None and len(rows) == 0:
+                return []
+
+            scores, row_ids = self._score(query, rows)
+            if len(scores) == 0:
+                return []
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [dict(self._metadata[row_ids[i]]) for i in top if np.isfinite(scores[i])]
+
+    def _score(self, query: np.ndarray, rows: np.ndarray | None) -> tuple[np.ndarray, np.ndarray]:
+        """Cosine scores for the given rows (all live rows when None), in fixed-size blocks."""
+        if rows is not None:
+            return self._score_rows(query, rows), rows
+        used = len(self._ids)
+        scores = np.empty(used, dtype=np.float32)
+        for start in range(0, used, SCORE_BLOCK_ROWS):
+            stop = min(start + SCORE_BLOCK_ROWS, used)
+            scores[start:stop] = self._score_block(query, self._vectors[start:stop], start, stop)
+        scores[~self._alive[:used]] = -np.inf
+        return scores, np.arange(used)
+
+    def _score_rows(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), SCORE_BLOCK_ROWS):
+            block_rows = rows[start:start + SCORE_BLOCK_ROWS]
+            block = self._vectors[block_rows]
+            if self.quantize:
+                scores[start:start + len(block_rows)] = (block.astype(np.float32) @ query) * self._scales[block_rows]
+            else:
+                scores[start:start + len(block_rows)] = block @ query
+        return scores
+
+    def _score_block(self, query: np.ndarray, block: np.ndarray, start: int, stop: int) -> np.ndarray:
+        if self.quantize:
+            return (block.astype(np.float32) @ query) * self._scales[start:stop]
+        return block @ query
+
+    def fetch(self, ids: list[str]) -> dict[str, dict]:
+        fetched = {}
+        with self._lock:
+            for vector_id in ids:
+                row = self._rows.get(vector_id)
+                if row is None:
+                    continue
+                values = self._vectors[row].astype(np.float32)
+                if self.quantize:
+                    values *= self._scales[row]
+                fetched[vector_id] = {"id": vector_id, "values": values.tolist(), "metadata": dict(self._metadata[row])}
+        return fetched
+
+    def delete_consultation(self, consultation_id: str) -> bool:
+        with self._lock:
+            ids = [self._ids[row] for row in self._by_consultation.get(str(consultation_id), ())]
+            if not ids:
+                return True
+            for vector_id in ids:
+                row = self._unindex(vector_id)
+                if row is not None:
+                    self._free_rows.append(row)
+            self._append_log([{"op": "delete", "ids": ids}])
+        return True
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+def _matches(metadata: dict | None, metadata_filter: dict) -> bool:
+    return metadata is not None and all(metadata.get(key) == value for key, value in metadata_filter.items())
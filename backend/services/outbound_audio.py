@@ -0,0 +1,146 @@
+import asyncio
+import base64
+import json
+import time
+from collections import deque
+
+from config.settings import settings
+from services.call_metrics import call_metrics
+
+SAMPLE_RATE = 8000
+FRAME_MS = 20
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000 # 160 bytes of 8kHz mulaw
+MULAW_SILENCE = b"\xff"
+
+# Queued by the agent after its last clip of a turn, so a drained buffer before it
+# counts as an underrun (audio arrived late) rather than the agent having finished.
+TURN_END = object()
+
+
+class OutboundAudioStream:
+    """
+    Paces agent audio to Twilio in real time. Raw mulaw clips from the agent's queue
+    are cut into 20 ms frames with memoryview slices (no copies), each frame is
+    base64-encoded once into a pre-serialized media message, and frames are sent
+    against a monotonic clock with a small lead so Twilio's buffer stays shallow.
+    """
+
+    def __init__(self, websocket, source: asyncio.Queue, lead_ms: int | None = None, on_first_frame=None):
+        self.websocket = websocket
+        self.on_first_frame = on_first_frame
+        self.source = source
+        self.lead = (settings.OUTBOUND_AUDIO_LEAD_MS if lead_ms is None else lead_ms) / 1000
+        self.frames: deque[memoryview] = deque()
+        self.in_turn = False
+        self.frames_sent = 0
+        self.underruns = 0
+        self.first_frame_at = None
+        self._prefix = ""
+        self._clear_message = ""
+        self._suffix = '"}}'
+        self._stream_ready = asyncio.Event()
+        self._clock_start = 0.0
+        self._clock_frames = 0
+
+    def set_stream_sid(self, stream_sid: str) -> None:
+        # Everything but the payload is serialized once per stream.
+        self._prefix = '{"event":"media","streamSid":' + json.dumps(stream_sid) + ',"media":{"payload":"'
+        self._clear_message = json.dumps({"event": "clear", "streamSid": stream_sid})
+        self._stream_ready.set()
+
+    def buffered_ms(self) -> int:
+        return len(self.frames) * FRAME_MS
+
+    def _playback_end(self) -> float:
+        return self._clock_start + self._clock_frames * FRAME_MS / 1000
+
+    def is_playing(self) -> bool:
+        """True while agent audio is queued, buffered here, or still playing at Twilio."""
+        return bool(self.frames) or not self.source.empty() or time.monotonic() < self._playback_end()
+
+    async def clear(self) -> int:
+        """
+        Barge-in: drops all unplayed agent audio (queued, framed, and already in
+        Twilio's buffer via a clear event). Returns roughly how many ms were cut.
+        """
+        now = time.monotonic()
+        cut_ms = len(self.frames) * FRAME_MS + max(0.0, self._playback_end() - now) * 1000
+        self.frames.clear()
+        closing = False
+        while not self.source.empty():
+            item = self.source.get_nowait()
+            if item is None:
+                closing = True
+            elif item is not TURN_END and item:
+                cut_ms += len(item) / FRAME_BYTES * FRAME_MS
+        if closing:
+            self.source.put_nowait(None)
+        self.in_turn = False
+        self._clock_start = now
+        self._clock_frames = 0
+        if self._stream_ready.is_set():
+            await self.websocket.send_text(self._clear_message)
+        return int(cut_ms)
+
+    def _accept(self, item) -> bool:
+        """Queues a source item; returns False on the end-of-stream sentinel."""
+        if item is None:
+            return False
+        if item is TURN_END:
+            self.in_turn = False
+            return True
+        if not item:
+            return True
+        view = memoryview(item)
+        full = len(view) - len(view) % FRAME_BYTES
+        for offset in range(0, full, FRAME_BYTES):
+            self.frames.append(view[offset:offset + FRAME_BYTES])
+        if full < len(view):
+            # Pad the tail to a whole frame with mulaw silence (the only copy made).
+            self.frames.append(memoryview(bytes(view[full:]) + MULAW_SILENCE * (FRAME_BYTES - (len(view) - full))))
+        self.in_turn = True
+        call_metrics.observe("outbound_buffer_ms", self.buffered_ms())
+        return True
+
+    async def run(self) -> None:
+        await self._stream_ready.wait()
+        while True:
+            if not self.frames:
+                starved = self.in_turn
+                if not self._accept(await self.source.get()):
+                    return
+                if not self.frames:
+                    continue
+                now = time.monotonic()
+                if now >= self._playback_end():
+                    # Twilio has played everything we sent. If the turn was still going,
+                    # the next clip arrived too late and the caller heard a gap.
+                    if starved and self._clock_frames:
+                        self.underruns += 1
+                        call_metrics.incr("outbound_underruns")
+                        call_metrics.observe("outbound_underrun_gap_ms", (now - self._playback_end()) * 1000)
+                    self._clock_start = now
+                    self._clock_frames = 0
+                continue
+
+            # Pick up anything else already queued without waiting.
+            while not self.source.empty():
+                if not self._accept(self.source.get_nowait()):
+                    return
+
+            ahead = self._playback_end() - time.monotonic()
+            if ahead > self.lead:
+                await asyncio.sleep(ahead - self.lead)
+                continue
+
+            frame = self.frames.popleft()
+            await self.websocket.send_text(self._prefix + base64.b64encode(frame).decode("ascii") + self._suffix)
+            if self.first_frame_at is None:
+                self.first_frame_at = time.monotonic()
+                if self.on_first_frame:
+                    self.on_first_frame(self.first_frame_at)
+            self._clock_frames += 1
+            self.frames_sent += 1
+
+    def stats(self) -> dict:
+        return {"frames_sent": self.frames_sent, "underruns": self.underruns, "buffered_ms": self.buffered_ms()}
@@ -1,16 +1,134 @@
-import pdfplumber
+import asyncio
 import io
+import math
+from pathlib import Path
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
-    """Extracts text from a loaded PDF bytes object."""
-    text_content = []
+from config.settings import settings
+from services.worker_pools import process_pool_workers, submit_to_process
+
+BACKENDS = ("pypdfium2", "pdfplumber")
+
+
+def _pdfium_page_texts(source, page_indices: list[int]) -> list[str]:
+    """Fast text-layer extraction with pypdfium2 (no layout analysis)."""
+    import pypdfium2 as pdfium
+    texts = []
+    pdf = pdfium.PdfDocument(source)
     try:
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    text_content.append(text)
-        return "\n\n".join(text_content)
+        for i in page_indices:
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                texts.append(textpage.get_text_bounded().replace("\r\n", "\n").strip())
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+    return texts
+
+
+def _pdfplumber_page_texts(source, page_indices: list[int]) -> list[str]:
+    """Slower layout-aware extraction, used as a per-page fallback."""
+    # pdfplumber pulls in pdfminer; only pay for it when a page needs the fallback.
+    import pdfplumber
+    texts = []
+    with pdfplumber.open(source) as pdf:
+        for i in page_indices:
+            page = pdf.pages[i]
+            texts.append((page.extract_text() or "").strip())
+            # Release cached layout objects as we go on long reports.
+            page.close()
+    return texts
+
+
+def _is_useful(text: str) -> bool:
+    return sum(1 for ch in text if ch.isalnum()) >= settings.PDF_MIN_PAGE_CHARS
+
+
+def _open_source(pdf_source: bytes | str | Path):
+    return io.BytesIO(pdf_source) if isinstance(pdf_source, (bytes, bytearray)) else str(pdf_source)
+
+
+def extract_page_range(pdf_source: bytes | str | Path, start: int, end: int, backend: str | None = None) -> list[str]:
+    """
+    Extracts pages [start, end) with the configured backend, falling back to
+    pdfplumber only for pages where the fast backend produced nothing useful.
+    Module-level so it can run in the shared process pool.
+    """
+    backend = backend or settings.PDF_TEXT_BACKEND
+    page_indices = list(range(start, end))
+    if backend == "pdfplumber":
+        return _pdfplumber_page_texts(_open_source(pdf_source), page_indices)
+
+    texts = _pdfium_page_texts(_open_source(pdf_source), page_indices)
+    retry = [pos for pos, text in enumerate(texts) if not _is_useful(text)]
+    if retry:
+        fallback = _pdfplumber_page_texts(_open_source(pdf_source), [page_indices[pos] for pos in retry])
+        for pos, text in zip(retry, fallback):
+            if len(text) > len(texts[pos]):
+                texts[pos] = text
+    return texts
+
+
+def count_pages(pdf_source: bytes | str | Path) -> int:
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(_open_source(pdf_source))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def extract_text_from_pdf(pdf_source: bytes | str | Path, backend: str | None = None) -> str:
+    """Extracts text from PDF bytes or a file path in the current process."""
+    try:
+        texts = extract_page_range(pdf_source, 0, count_pages(pdf_source), backend)
+        return "\n\n".join(text for text in texts if text)
+    except Exception as e:
+        print(f"Error parsing PDF: {e}")
+        return ""
+
+
+async def extract_text(pdf_path: str | Path, backend: str | None = None) -> str:
+    """
+    Extracts text from a PDF on disk by spreading page ranges across the shared
+    process pool. Gives up after PDF_EXTRACT_TIMEOUT_SECONDS for the whole document and
+    cancels the ranges that have not started; ranges already in a worker run to completion.
+    """
+    try:
+        page_count = await asyncio.to_thread(count_pages, str(pdf_path))
+    except Exception as e:
+        print(f"Error parsing PDF: {e}")
+        return ""
+    if page_count == 0:
+        return ""
+
+    tasks = max(1, min(process_pool_workers(), math.ceil(page_count / settings.PDF_PAGES_PER_TASK)))
+    step = math.ceil(page_count / tasks)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+    futures = []
+    try:
+        futures = [submit_to_process(extract_page_range, str(pdf_path), start, end, backend) for start, end in ranges]
+        results = await asyncio.wait_for(
+            asyncio.gather(*(asyncio.wrap_future(future) for future in futures)),
+            timeout=settings.PDF_EXTRACT_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        # Ranges still queued are dropped. Ranges already handed to the pool (running, or
+        # in its small call queue) cannot be interrupted and keep workers busy until done.
+        cancelled = sum(future.cancel() for future in futures)
+        running = sum(not future.done() for future in futures)
+        print(
+            f"PDF extraction timed out after {settings.PDF_EXTRACT_TIMEOUT_SECONDS}s ({page_count} pages); "
+            f"cancelled {cancelled} queued page ranges, {running} could not be stopped"
+        )
+        return ""
     except Exception as e:
+        for future in futures:
+            future.cancel()
         print(f"Error parsing PDF: {e}")
         return ""
+
+    return "\n\n".join(text for texts in results for text in texts if text)
@@ -0,0 +1,133 @@
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+
+from config.settings import settings, ROOT_DIR
+from services.embedding_cache import normalize_text
+
+
+class PhraseAudioCache:
+    """
+    Rendered TTS audio for fixed agent phrases, keyed by sha256(voice/audio config +
+    normalized text). A byte-bounded in-process LRU sits in front of an optional
+    directory of .ulaw files that survives restarts (oldest files pruned first).
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, disk_dir: str | None = None, max_disk_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max(1, max_bytes)
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = Lock()
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._dir = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+        if disk_dir:
+            self._open_disk_tier(disk_dir)
+
+    @staticmethod
+    def make_key(voice_key: str, text: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(voice_key.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(normalize_text(text).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _open_disk_tier(self, disk_dir: str) -> None:
+        path = Path(disk_dir)
+        if not path.is_absolute():
+            path = ROOT_DIR / path
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            self._dir = path
+        except Exception as e:
+            print(f"Phrase cache disk tier unavailable ({path}): {e}")
+
+    def get(self, voice_key: str, text: str) -> bytes | None:
+        key = self.make_key(voice_key, text)
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return audio
+            if self._dir is not None:
+                try:
+                    audio = (self._dir / f"{key}.ulaw").read_bytes()
+                except FileNotFoundError:
+                    audio = None
+                except Exception as e:
+                    print(f"Phrase cache disk read failed: {e}")
+                    audio = None
+                if audio:
+                    self.disk_hits += 1
+                    self._remember(key, audio)
+                    return audio
+            self.misses += 1
+            return None
+
+    def put(self, voice_key: str, text: str, audio: bytes) -> None:
+        if not audio:
+            return
+        key = self.make_key(voice_key, text)
+        with self._lock:
+            self._remember(key, audio)
+            self.writes += 1
+            if self._dir is not None:
+                try:
+                    tmp_path = self._dir / f"{key}.tmp"
+                    tmp_path.write_bytes(audio)
+                    tmp_path.replace(self._dir / f"{key}.ulaw")
+                    self._prune_disk()
+                except Exception as e:
+                    print(f"Phrase cache disk write failed: {e}")
+
+    def _remember(self, key: str, audio: bytes) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = audio
+        self._bytes += len(audio)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def _prune_disk(self) -> None:
+        files = sorted(self._dir.glob("*.ulaw"), key=lambda f: f.stat().st_mtime)
+        total = sum(f.stat().st_size for f in files)
+        for f in files:
+            if total <= self.max_disk_bytes:
+                break
+            total -= f.stat().st_size
+            f.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_tier": self._dir is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "writes": self.writes,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+phrase_cache = (
+    PhraseAudioCache(
+        max_bytes=settings.PHRASE_CACHE_MAX_BYTES,
+        disk_dir=settings.PHRASE_CACHE_PATH or None,
+    )
+    if settings.PHRASE_CACHE_ENABLED
+    else None
+)
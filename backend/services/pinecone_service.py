@@ -1,33 +1,14 @@
-from pinecone import Pinecone, ServerlessSpec
-from config.settings import settings
+from services.clients import client_registry, PINECONE_INDEX_NAME
+from services.vector_store import VectorStore
 
-class PineconeService:
-    def __init__(self):
-        self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-        self.index_name = "followup-consultations"
-        
-        # Ensure index exists ideally, but doing it in __init__ is bad practice for production.
-        # Assuming the operator creates it, or we handle it here:
-        listed = self.pc.list_indexes()
-        try:
-            existing_indexes = [index_info["name"] for index_info in listed]
-        except Exception:
-            try:
-                existing_indexes = [index_info.name for index_info in listed.indexes]
-            except Exception:
-                existing_indexes = []
-        
-        if self.index_name not in existing_indexes:
-             self.pc.create_index(
-                 name=self.index_name,
-                 dimension=768, # Dimension for text-embedding-004
-                 metric="cosine",
-                 spec=ServerlessSpec(
-                     cloud="aws",
-                     region="us-east-1"
-                 ) 
-             )
-        self.index = self.pc.Index(self.index_name)
+class PineconeService(VectorStore):
+    def __init__(self, registry=None, namespace: str | None = None):
+        # The index existence check runs once in the shared client registry, not per request.
+        registry = registry or client_registry
+        self.index_name = PINECONE_INDEX_NAME
+        self.index = registry.get_pinecone_index()
+        self.namespace = namespace
+        self._ns = {"namespace": namespace} if namespace else {}
 
     def upsert_consultation(self, consultation_id: str, vector: list[float], metadata: dict):
         """Upserts a single consultation embedding to Pinecone."""
@@ -39,46 +20,70 @@ class PineconeService:
                         "values": vector,
                         "metadata": metadata
                     }
-                ]
+                ],
+                **self._ns,
             )
         except Exception as e:
              print(f"Error upserting to Pinecone: {e}")
 
-    def upsert_chunks(self, vectors: list[dict]):
-        """Upserts a batch of chunk vectors to Pinecone."""
+    def upsert_chunks(self, vectors: list[dict], batch_size: int | None = None):
+        """Upserts chunk vectors to Pinecone, split into requests of batch_size when given."""
         if not self.index or not vectors:
             return False
-            
+
         try:
-            self.index.upsert(vectors=vectors)
+            if batch_size:
+                self.index.upsert(vectors=vectors, batch_size=batch_size, show_progress=False, **self._ns)
+            else:
+                self.index.upsert(vectors=vectors, **self._ns)
             return True
         except Exception as e:
             print(f"Error upserting chunks to Pinecone: {e}")
             return False
 
-    def query_context(self, consultation_id: str) -> dict:
-        """Fetches metadata from first chunk by consultation id."""
+    def fetch(self, ids: list[str]) -> dict[str, dict]:
+        result = self.index.fetch(ids=ids, **self._ns)
+        vectors = result.get("vectors", {}) if isinstance(result, dict) else getattr(result, "vectors", {}) or {}
+        fetched = {}
+        for vector_id, vector in vectors.items():
+            if isinstance(vector, dict):
+                fetched[vector_id] = {"id": vector_id, "values": vector.get("values", []), "metadata": vector.get("metadata", {}) or {}}
+            else:
+                fetched[vector_id] = {"id": vector_id, "values": list(vector.values or []), "metadata": vector.metadata or {}}
+        return fetched
+
+    def delete_consultation(self, consultation_id: str) -> bool:
+        """Deletes a consultation's chunks by id prefix (serverless indexes cannot delete by metadata)."""
         try:
-            chunk_id = f"{consultation_id}_chunk_0"
-            result = self.index.fetch(ids=[chunk_id])
-            if result and "vectors" in result and chunk_id in result["vectors"]:
-                return result["vectors"][chunk_id].get("metadata", {})
-            return {}
+            for id_page in self.index.list(prefix=f"{consultation_id}_chunk_", **self._ns):
+                ids = list(id_page)
+                if ids:
+                    self.index.delete(ids=ids, **self._ns)
+            return True
         except Exception as e:
-            print(f"Pinecone Fetch Error: {e}")
-            return {}
+            print(f"Error deleting consultation {consultation_id} from Pinecone: {e}")
+            return False
 
-    def query_similar_chunks(self, query_vector: list[float], consultation_id: str | None = None, top_k: int = 3) -> list[dict]:
+    def query_similar_chunks(
+        self,
+        query_vector: list[float],
+        consultation_id: str | None = None,
+        top_k: int = 3,
+        metadata_filter: dict | None = None,
+    ) -> list[dict]:
         """Returns top-k matching vector metadata for RAG context injection."""
         if not query_vector:
             return []
         try:
-            pinecone_filter = {"consultation_id": str(consultation_id)} if consultation_id else None
+            pinecone_filter = dict(metadata_filter or {})
+            if consultation_id:
+                pinecone_filter["consultation_id"] = str(consultation_id)
             result = self.index.query(
                 vector=query_vector,
                 top_k=top_k,
                 include_metadata=True,
-                filter=pinecone_filter,
+                filter=pinecone_filter or None,
+                **self._ns,
             )
             matches = result.get("matches", []) if isinstance(result, dict) else getattr(result, "matches", [])
             normalized = []
@@ -0,0 +1,27 @@
+import numpy as np
+
+from config.settings import settings
+
+RAG_TOP_K = 3
+# Bump when the selection logic changes so stored contexts are recomputed.
+RAG_CONTEXT_ALGORITHM = "v1"
+
+
+def rag_context_version() -> str:
+    """Tag stored next to a precomputed context; a mismatch means it must be rebuilt."""
+    return f"{RAG_CONTEXT_ALGORITHM}:{settings.EMBEDDING_MODEL}:top{RAG_TOP_K}"
+
+
+def select_rag_context(query_vector: list[float], chunks: list[str], vectors: list[list[float]], top_k: int = RAG_TOP_K) -> str:
+    """
+    Same result as querying Pinecone (cosine) for the consultation's top_k chunks,
+    computed from the chunk vectors already in memory during ingestion.
+    """
+    if not query_vector or not chunks or len(chunks) != len(vectors):
+        return ""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    query = np.asarray(query_vector, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+    scores = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+    top = np.argsort(-scores, kind="stable")[:top_k]
+    return " ".join(chunks[i] for i in top if chunks[i]).strip()
@@ -1,9 +1,47 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from threading import Lock
 
+EVENT_DEDUPE_WINDOW = 4096 # most recent event ids remembered per session
 
-@dataclass
+
+class RecentEvents:
+    """
+    Fixed-size dedupe window: a preallocated ring of the most recent ids plus a set
+    for lookups. Adding an id is O(1) and, once full, evicts exactly the oldest id.
+    """
+
+    __slots__ = ("_ring", "_seen", "_pos", "_capacity")
+
+    def __init__(self, capacity: int = EVENT_DEDUPE_WINDOW):
+        self._capacity = max(1, capacity)
+        self._ring: list[str | None] = [None] * self._capacity
+        self._seen: set[str] = set()
+        self._pos = 0
+
+    def add(self, event_id: str) -> bool:
+        """Returns True if event_id is new, False if it is still inside the window."""
+        seen = self._seen
+        if event_id in seen:
+            return False
+        pos = self._pos
+        oldest = self._ring[pos]
+        if oldest is not None:
+            seen.discard(oldest)
+        self._ring[pos] = event_id
+        seen.add(event_id)
+        pos += 1
+        self._pos = pos if pos < self._capacity else 0
+        return True
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self._seen
+
+
+@dataclass(slots=True)
 class SessionState:
     conversation_id: str
     consultation_id: str
@@ -11,72 +49,75 @@ class SessionState:
     started_at: datetime
     last_transcript: str
     active: bool
-    processed_event_ids: set[str]
+    processed_events: RecentEvents = field(default_factory=RecentEvents)
+    lock: Lock = field(default_factory=Lock, repr=False, compare=False)
 
 
 class SessionStateStore:
     """
     Lightweight in-memory session store for active Twilio conversation sessions.
     Intended for per-instance runtime state only.
+
+    Each session has its own lock, so calls never contend with each other. Looking a
+    session up is a single dict read (atomic under the GIL); the store-wide lock is
+    only taken to add or remove sessions. Every operation holds a lock for O(1) work.
     """
 
-    def __init__(self):
-        self._lock = Lock()
+    def __init__(self, dedupe_window: int = EVENT_DEDUPE_WINDOW):
         self._sessions: dict[str, SessionState] = {}
+        self._lock = Lock()
+        self._dedupe_window = dedupe_window
 
     def start(self, conversation_id: str, consultation_id: str) -> None:
+        session = SessionState(
+            conversation_id=conversation_id,
+            consultation_id=consultation_id,
+            stream_sid=None,
+            started_at=datetime.now(timezone.utc),
+            last_transcript="",
+            active=True,
+            processed_events=RecentEvents(self._dedupe_window),
+        )
         with self._lock:
-            self._sessions[conversation_id] = SessionState(
-                conversation_id=conversation_id,
-                consultation_id=consultation_id,
-                stream_sid=None,
-                started_at=datetime.now(timezone.utc),
-                last_transcript="",
-                active=True,
-                processed_event_ids=set(),
-            )
+            self._sessions[conversation_id] = session
 
     def update_stream_sid(self, conversation_id: str, stream_sid: str) -> None:
-        with self._lock:
-            session = self._sessions.get(conversation_id)
-            if session:
+        session = self._sessions.get(conversation_id)
+        if session:
+            with session.lock:
                 session.stream_sid = stream_sid
 
     def update_transcript(self, conversation_id: str, transcript: str) -> None:
-        with self._lock:
-            session = self._sessions.get(conversation_id)
-            if session:
+        session = self._sessions.get(conversation_id)
+        if session:
+            with session.lock:
                 session.last_transcript = transcript
 
     def end(self, conversation_id: str) -> None:
-        with self._lock:
-            session = self._sessions.get(conversation_id)
-            if session:
+        session = self._sessions.get(conversation_id)
+        if session:
+            with session.lock:
                 session.active = False
 
     def mark_event_processed(self, conversation_id: str, event_id: str) -> bool:
         """
         Returns True if event is newly processed, False if duplicate/known.
         """
-        with self._lock:
-            session = self._sessions.get(conversation_id)
-            if not session:
-                return True
-            if event_id in session.processed_event_ids:
-                return False
-            session.processed_event_ids.add(event_id)
-            if len(session.processed_event_ids) > 5000:
-                # Keep memory bounded for long sessions.
-                session.processed_event_ids = set(list(session.processed_event_ids)[-3000:])
+        session = self._sessions.get(conversation_id)
+        if session is None:
             return True
+        with session.lock:
+            return session.processed_events.add(event_id)
 
     def get(self, conversation_id: str) -> SessionState | None:
-        with self._lock:
-            return self._sessions.get(conversation_id)
+        return self._sessions.get(conversation_id)
 
     def cleanup(self, conversation_id: str) -> None:
         with self._lock:
             self._sessions.pop(conversation_id, None)
 
+    def __len__(self) -> int:
+        return len(self._sessions)
+
 
 session_state_store = SessionStateStore()
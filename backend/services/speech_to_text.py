@@ -1,75 +1,350 @@
 import asyncio
 import base64
-from google.cloud import speech
-from google.api_core.exceptions import OutOfRange
+import time
+from collections import deque
+from config.settings import settings
+from services.call_metrics import call_metrics
+from services.clients import client_registry
+from services.voice_activity import InboundAudioGate
+from utils.audio import mulaw_rms
+from utils.helpers import transcript_words
+
+MULAW_BYTES_PER_SECOND = 8000
+DEDUPE_WINDOW_SECONDS = 10 # finals from another stream this recent may repeat replayed audio
+MAX_FAILED_STREAMS = 3 # consecutive streams that ended without a single response
+
+
+class _RecognizeStream:
+    """One Google streaming_recognize call and the audio queued for it."""
+
+    def __init__(self, number: int, replay: list[bytes], max_chunks: int):
+        self.number = number
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(max_chunks, len(replay) + 1))
+        for chunk in replay:
+            self.queue.put_nowait(chunk)
+        self.replay_seconds = sum(len(chunk) for chunk in replay) / MULAW_BYTES_PER_SECOND
+        self.started_at = time.monotonic()
+        self.in_utterance = False
+        self.responses = 0
+        self.closing = False
+        self.task: asyncio.Task | None = None
+
+    def age(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def feed(self, chunk: bytes) -> None:
+        if self.closing:
+            return
+        if self.queue.full():
+            # Google is not keeping up; drop the oldest audio rather than grow without bound.
+            self.queue.get_nowait()
+            call_metrics.incr("stt_audio_dropped")
+        self.queue.put_nowait(chunk)
+
+    def close(self) -> None:
+        if self.closing:
+            return
+        self.closing = True
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
 
 class STTService:
-    def __init__(self, callback):
+    """
+    Google streaming STT for a call. A single stream is capped at about five minutes,
+    so the service rotates streams: STT_STREAM_ROTATE_SECONDS into a stream it opens
+    the next one, replays the last STT_REPLAY_MS of audio into it, feeds both until
+    the old one finishes its current utterance, then closes the old one. Finals are
+    de-duplicated across the handoff.
+
+    With on_endpoint set, the service also endpoints on its own: once a stable
+    interim transcript is followed by STT_ENDPOINT_SILENCE_MS of inbound silence it
+    calls on_endpoint(text) to start the turn speculatively, and on_endpoint_retracted()
+    if the patient keeps talking. The final result is still delivered to callback so
+    the agent can confirm or replace the speculative turn.
+
+    With STT_VAD_ENABLED, inbound frames pass through a local VAD gate first: speech
+    goes to Google in ~100 ms requests, long silences only as occasional padding,
+    and speech/non-speech changes are reported to on_voice_activity(speaking).
+    """
+
+    def __init__(
+        self,
+        callback,
+        client=None,
+        on_speech_start=None,
+        on_endpoint=None,
+        on_endpoint_retracted=None,
+        on_voice_activity=None,
+    ):
         self.callback = callback
-        self.client = speech.SpeechAsyncClient()
+        self.on_voice_activity = on_voice_activity
+        self.on_speech_start = on_speech_start
+        self.on_endpoint = on_endpoint
+        self.on_endpoint_retracted = on_endpoint_retracted
+        self.client = client or client_registry.get_speech_client()
+        self.config = None
+        self.streaming_config = None
+
+        self.streams: list[_RecognizeStream] = []
+        self.stream_task = None
+        self.is_running = False
+        self._stream_count = 0
+        self._failed_streams = 0
+        self._replay: deque[bytes] = deque()
+        self._replay_bytes = 0
+        self._replay_max_bytes = settings.STT_REPLAY_MS * MULAW_BYTES_PER_SECOND // 1000
+        self._recent_finals: deque[tuple[float, int, list[str]]] = deque(maxlen=8)
+
+        self.gate = InboundAudioGate() if settings.STT_VAD_ENABLED else None
+
+        # Endpointing state (primary stream only)
+        self._last_voice_at: float | None = None
+        self._interim: tuple[str, float] | None = None
+        self._speculated: str | None = None
+        self._resumed_ms = 0
+
+    @property
+    def in_utterance(self) -> bool:
+        return bool(self.streams) and self.streams[-1].in_utterance
+
+    async def initialize(self):
+        from google.cloud import speech  # imported when the call starts, not at app startup
         self.config = speech.RecognitionConfig(
             encoding=speech.RecognitionConfig.AudioEncoding.MULAW,
             sample_rate_hertz=8000,
             language_code="en-US",
-            model="phone_call", 
+            model="phone_call",
             use_enhanced=True
         )
         self.streaming_config = speech.StreamingRecognitionConfig(
             config=self.config,
-            interim_results=False
+            # Interim results are only needed to notice speech early (barge-in, endpointing).
+            interim_results=self.on_speech_start is not None or self.on_endpoint is not None
         )
-        
-        self.audio_queue = asyncio.Queue()
-        self.stream_task = None
-        self.is_running = False
-
-    async def initialize(self):
         self.is_running = True
-        self.stream_task = asyncio.create_task(self._process_stream())
+        self.stream_task = asyncio.create_task(self._supervise())
         print("Initialized Google STT Stream")
 
     async def capture_input(self, audio_chunk_base64: str):
-        """Receives base64 audio from Twilio and passes to Google STT queue."""
+        """Receives base64 audio from Twilio and passes it to the open STT stream(s)."""
         if self.is_running:
             decoded_bytes = base64.b64decode(audio_chunk_base64)
-            await self.audio_queue.put(decoded_bytes)
+            if self.gate is None:
+                requests, voiced, changed = [decoded_bytes], mulaw_rms(decoded_bytes) >= settings.STT_VOICE_RMS, False
+            else:
+                requests, changed = self.gate.push(decoded_bytes)
+                voiced = self.gate.vad.voiced
+            for chunk in requests:
+                self._remember(chunk)
+                for stream in self.streams:
+                    stream.feed(chunk)
+            if changed and self.on_voice_activity:
+                await self.on_voice_activity(self.gate.vad.speaking)
+            if self.on_endpoint:
+                await self._track_endpoint(decoded_bytes, voiced)
 
-    async def _generator(self):
+    async def _track_endpoint(self, chunk: bytes, voiced: bool) -> None:
+        """Silence timer on the inbound audio; fires or retracts the speculative endpoint."""
+        now = time.monotonic()
+        if voiced:
+            self._last_voice_at = now
+
+        if self._speculated is not None:
+            self._resumed_ms = self._resumed_ms + len(chunk) * 1000 // MULAW_BYTES_PER_SECOND if voiced else 0
+            if self._resumed_ms >= settings.STT_ENDPOINT_RESUME_MS:
+                await self._retract_endpoint()
+            return
+
+        if self._interim is None or self._last_voice_at is None:
+            return
+        text, stability = self._interim
+        silence_ms = (now - self._last_voice_at) * 1000
+        if stability >= settings.STT_ENDPOINT_MIN_STABILITY and silence_ms >= settings.STT_ENDPOINT_SILENCE_MS:
+            self._interim = None
+            self._speculated = text
+            self._resumed_ms = 0
+            call_metrics.incr("endpoint_speculative")
+            call_metrics.observe("turn_endpoint_ms", silence_ms)
+            await self.on_endpoint(text)
+
+    async def _retract_endpoint(self) -> None:
+        self._speculated = None
+        self._resumed_ms = 0
+        call_metrics.incr("endpoint_retracted")
+        if self.on_endpoint_retracted:
+            await self.on_endpoint_retracted()
+
+    def _remember(self, chunk: bytes) -> None:
+        """Keeps the most recent audio for replay into the next stream."""
+        self._replay.append(chunk)
+        self._replay_bytes += len(chunk)
+        while self._replay_bytes > self._replay_max_bytes and len(self._replay) > 1:
+            self._replay_bytes -= len(self._replay.popleft())
+
+    def _open_stream(self, replay: bool) -> _RecognizeStream:
+        self._stream_count += 1
+        stream = _RecognizeStream(
+            self._stream_count,
+            list(self._replay) if replay else [],
+            settings.STT_QUEUE_MAX_CHUNKS,
+        )
+        stream.task = asyncio.create_task(self._process_stream(stream))
+        self.streams.append(stream)
+        return stream
+
+    async def _supervise(self):
+        """Opens, rotates and retires recognize streams for the life of the call."""
+        self._open_stream(replay=False)
+        while self.is_running:
+            await asyncio.sleep(0.25)
+            current = self.streams[-1]
+
+            for stream in self.streams[:-1]:
+                if stream.task.done():
+                    self.streams.remove(stream)
+                elif not stream.in_utterance or stream.age() >= settings.STT_STREAM_MAX_SECONDS:
+                    # Hand off between utterances; the replayed audio covers a forced cut.
+                    stream.close()
+
+            if current.task.done():
+                # Ended early (hit the limit or errored): replace it right away.
+                self.streams.remove(current)
+                self._failed_streams = 0 if current.responses else self._failed_streams + 1
+                if self._failed_streams >= MAX_FAILED_STREAMS:
+                    print("Google STT streams keep failing; speech recognition stopped for this call.")
+                    return
+                self._open_stream(replay=True)
+                call_metrics.incr("stt_stream_restarts")
+            elif current.age() >= settings.STT_STREAM_ROTATE_SECONDS and len(self.streams) == 1:
+                self._open_stream(replay=True)
+                call_metrics.incr("stt_stream_rotations")
+
+    async def _generator(self, stream: _RecognizeStream):
         """Yields audio chunks for Google's streaming GRPC client."""
+        from google.cloud import speech
         while self.is_running:
-            chunk = await self.audio_queue.get()
+            chunk = await stream.queue.get()
             if chunk is None:
                 return
             yield speech.StreamingRecognizeRequest(audio_content=chunk)
 
-    async def _process_stream(self):
+    async def _process_stream(self, stream: _RecognizeStream):
+        from google.api_core.exceptions import OutOfRange
         try:
-            requests = self._generator()
-            
+            requests = self._generator(stream)
+
             responses = await self.client.streaming_recognize(
                 config=self.streaming_config,
                 requests=requests
             )
-            
+
             async for response in responses:
+                stream.responses += 1
                 if not response.results:
                     continue
                 result = response.results[0]
                 if not result.alternatives:
                     continue
-                
+
                 transcript = result.alternatives[0].transcript
                 if result.is_final:
-                    # Pass transcribed sentence back to Agent loop
-                    await self.callback(transcript.strip())
-                    
+                    stream.in_utterance = False
+                    if stream is self.streams[-1]:
+                        self._finish_utterance()
+                    text = self._dedupe_final(stream, transcript.strip())
+                    if text is not None:
+                        # Pass transcribed sentence back to Agent loop
+                        await self.callback(text)
+                    continue
+
+                # Interims from a new stream's replayed audio describe speech already handled.
+                live = stream is self.streams[-1] and stream.age() >= stream.replay_seconds
+                if not live or not transcript.strip():
+                    continue
+                if not stream.in_utterance:
+                    stream.in_utterance = True
+                    if self.on_speech_start:
+                        await self.on_speech_start()
+                if self.on_endpoint:
+                    await self._on_interim(response.results)
+
         except OutOfRange:
-            print("Google STT Stream timed out (5m limit). Restart required for longer calls.")
+            print(f"Google STT stream {stream.number} hit the streaming limit; rotating.")
         except Exception as e:
             print(f"STT stream exception: {e}")
 
+    async def _on_interim(self, results) -> None:
+        # Google splits an interim into a stable head and unstable tail results. The tail
+        # reports ~0.01 until it settles, so endpoint on the head's stability; a tail that
+        # still changes shows up in the final, which confirms or retracts the turn.
+        text = "".join(r.alternatives[0].transcript for r in results if r.alternatives).strip()
+        stability = getattr(results[0], "stability", 0.0) or 0.0
+        if self._speculated is not None:
+            if transcript_words(text) != transcript_words(self._speculated):
+                # The transcript grew past what the speculative turn answered.
+                await self._retract_endpoint()
+            return
+        self._interim = (text, stability)
+
+    def _finish_utterance(self) -> None:
+        if self._last_voice_at is not None:
+            # What Google's own endpointing costs; turns not started speculatively wait this long.
+            latency_ms = (time.monotonic() - self._last_voice_at) * 1000
+            call_metrics.observe("stt_final_endpoint_ms", latency_ms)
+            if self._speculated is None:
+                call_metrics.observe("turn_endpoint_ms", latency_ms)
+        self._interim = None
+        self._speculated = None
+        self._resumed_ms = 0
+
+    def _dedupe_final(self, stream: _RecognizeStream, text: str) -> str | None:
+        """
+        Drops a final (or its leading words) already delivered by another stream during
+        a handoff. Returns None when nothing new is left.
+        """
+        if not text:
+            return text
+        words = text.split()
+        normalized = transcript_words(text)
+        now = time.monotonic()
+        trimmed = 0
+        for seen_at, number, previous in self._recent_finals:
+            if number == stream.number or now - seen_at > DEDUPE_WINDOW_SECONDS:
+                continue
+            if _contains(previous, normalized):
+                call_metrics.incr("stt_finals_deduped")
+                return None
+            # A final that starts where the other stream's final ended only repeats the overlap.
+            for size in range(min(len(previous), len(normalized) - 1), 1, -1):
+                if previous[-size:] == normalized[:size]:
+                    trimmed = max(trimmed, size)
+                    break
+        self._recent_finals.append((now, stream.number, normalized))
+        if trimmed:
+            call_metrics.incr("stt_finals_deduped")
+            return " ".join(words[trimmed:])
+        return text
+
     async def close(self):
         self.is_running = False
-        await self.audio_queue.put(None)
+        if self.gate is not None and self.gate.frames_in:
+            stats = self.gate.stats()
+            call_metrics.incr("stt_frames_in", stats["frames_in"])
+            call_metrics.incr("stt_requests_sent", stats["requests_out"])
+            call_metrics.observe("stt_vad_cpu_ms", stats["cpu_ms"])
+            print(f"STT input gate: {stats}")
+        for stream in self.streams:
+            stream.close()
         if self.stream_task:
             self.stream_task.cancel()
+        for stream in self.streams:
+            if stream.task:
+                stream.task.cancel()
+
+
+def _contains(haystack: list[str], needle: list[str]) -> bool:
+    if len(needle) > len(haystack):
+        return False
+    return any(haystack[i:i + len(needle)] == needle for i in range(len(haystack) - len(needle) + 1))
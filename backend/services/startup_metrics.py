@@ -0,0 +1,64 @@
+import sys
+import time
+
+from config.settings import settings
+
+# SDKs that should stay out of sys.modules until a request needs them.
+HEAVY_MODULES = (
+    "vertexai",
+    "google.cloud.speech",
+    "google.cloud.texttospeech",
+    "google.cloud.storage",
+    "pinecone",
+    "twilio.rest",
+    "pdfplumber",
+    "pypdfium2",
+)
+
+
+class StartupMetrics:
+    """
+    Cold-start timings for /metrics/startup. main.py calls begin() before its own
+    imports; phases are recorded from the lifespan. For a per-module breakdown run
+    `python -m benchmarks.cold_start`, which wraps `python -X importtime`.
+    """
+
+    def __init__(self):
+        self.started_at = None
+        self.phases: dict[str, float] = {}
+        self.ready_ms = None
+        self.heavy_modules_at_ready: list[str] = []
+
+    def begin(self, started: float | None = None) -> None:
+        if self.started_at is None:
+            self.started_at = started or time.perf_counter()
+
+    def elapsed_ms(self) -> float:
+        self.begin()
+        return round((time.perf_counter() - self.started_at) * 1000, 1)
+
+    def record(self, phase: str, started: float) -> None:
+        self.phases[phase] = round((time.perf_counter() - started) * 1000, 1)
+
+    def mark_ready(self) -> None:
+        self.ready_ms = self.elapsed_ms()
+        self.heavy_modules_at_ready = loaded_heavy_modules()
+        if self.ready_ms > settings.STARTUP_TARGET_MS:
+            print(f"Startup took {self.ready_ms}ms (target {settings.STARTUP_TARGET_MS}ms); phases: {self.phases}")
+
+    def snapshot(self) -> dict:
+        return {
+            "ready_ms": self.ready_ms,
+            "target_ms": settings.STARTUP_TARGET_MS,
+            "within_target": self.ready_ms is not None and self.ready_ms <= settings.STARTUP_TARGET_MS,
+            "phases_ms": dict(self.phases),
+            "heavy_modules_at_ready": self.heavy_modules_at_ready,
+            "heavy_modules_loaded_now": loaded_heavy_modules(),
+        }
+
+
+def loaded_heavy_modules() -> list[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+startup_metrics = StartupMetrics()
@@ -1,10 +1,19 @@
-import base64
 import asyncio
-from google.cloud import texttospeech
+from services.clients import client_registry
+from services.phrase_cache import phrase_cache
+
+def voice_cache_key(voice, audio_config) -> str:
+    """
+    Phrase cache namespace, e.g. "en-US/en-US-Journey-F/mulaw/8000": entries are only
+    valid for the exact voice and output format they were rendered with.
+    """
+    encoding = getattr(audio_config.audio_encoding, "name", audio_config.audio_encoding)
+    return f"{voice.language_code}/{voice.name}/{str(encoding).lower()}/{audio_config.sample_rate_hertz}"
 
 class TTSService:
-    def __init__(self):
-        self.client = texttospeech.TextToSpeechAsyncClient()
+    def __init__(self, client=None):
+        from google.cloud import texttospeech  # imported on first call, not at app startup
+        self.client = client or client_registry.get_tts_client()
         self.voice = texttospeech.VoiceSelectionParams(
             language_code="en-US",
             name="en-US-Journey-F", # Natural conversational voice
@@ -13,27 +22,81 @@ class TTSService:
             audio_encoding=texttospeech.AudioEncoding.MULAW,
             sample_rate_hertz=8000
         )
-        
-    async def synthesize(self, text: str):
-        """
-        Takes raw text, synthesizes it using Google Cloud TTS, 
-        and yields base64 encoded chunks suitable for Twilio WebSockets.
-        """
+        self.voice_key = voice_cache_key(self.voice, self.audio_config)
+        self.cache = phrase_cache
+
+    async def synthesize_audio(self, text: str, cacheable: bool = False) -> bytes:
+        """Raw 8kHz mulaw audio for text. Cacheable (fixed) phrases skip TTS on a cache hit."""
+        if cacheable and self.cache:
+            audio = await asyncio.to_thread(self.cache.get, self.voice_key, text)
+            if audio:
+                return audio
+
+        audio = await self._render(text)
+        if cacheable and self.cache:
+            await asyncio.to_thread(self.cache.put, self.voice_key, text, audio)
+        return audio
+
+    async def _render(self, text: str) -> bytes:
+        from google.cloud import texttospeech
         request = texttospeech.SynthesizeSpeechRequest(
             input=texttospeech.SynthesisInput(text=text),
             voice=self.voice,
             audio_config=self.audio_config
         )
-        
+        response = await self.client.synthesize_speech(request=request)
+        return strip_wav_header(response.audio_content)
+
+    async def synthesize(self, text: str, cacheable: bool = False):
+        """
+        Takes raw text, synthesizes it using Google Cloud TTS, and yields the raw
+        8kHz mulaw clip; OutboundAudioStream frames and paces it for Twilio.
+        """
         try:
-            response = await self.client.synthesize_speech(request=request)
-            encoded_audio = base64.b64encode(response.audio_content).decode("utf-8")
-            
-            # Chunking 8000hz mulaw bytes (~0.5 seconds of audio per chunk)
-            chunk_size = 4000 
-            for i in range(0, len(encoded_audio), chunk_size):
-                yield encoded_audio[i:i + chunk_size]
-                await asyncio.sleep(0.01) # Yield execution back to event loop
-                
+            audio = await self.synthesize_audio(text, cacheable=cacheable)
         except Exception as e:
             print(f"Error in Google TTS synthesis: {e}")
+            return
+        yield audio
+
+    async def synthesize_spliced(self, parts: list[tuple[str, bool]]):
+        """
+        Renders (text, cacheable) parts concurrently and plays them back to back,
+        e.g. a synthesized patient name followed by a cached carrier phrase.
+        """
+        try:
+            audio = await asyncio.gather(*(self.synthesize_audio(text, cacheable=cacheable) for text, cacheable in parts))
+        except Exception as e:
+            print(f"Error in Google TTS synthesis: {e}")
+            return
+        yield b"".join(audio)
+
+    async def prerender(self, phrases: list[str]) -> int:
+        """Renders fixed phrases into the cache ahead of the first call; returns how many were synthesized."""
+        if not self.cache:
+            return 0
+        rendered = 0
+        for text in phrases:
+            if await asyncio.to_thread(self.cache.get, self.voice_key, text):
+                continue
+            try:
+                audio = await self._render(text)
+                await asyncio.to_thread(self.cache.put, self.voice_key, text, audio)
+                rendered += 1
+            except Exception as e:
+                print(f"Phrase pre-render failed for {text!r}: {e}")
+        return rendered
+
+
+def strip_wav_header(audio: bytes) -> bytes:
+    """Google TTS wraps MULAW output in a WAV container; Twilio (and splicing) need raw samples."""
+    if len(audio) < 12 or audio[:4] != b"RIFF" or audio[8:12] != b"WAVE":
+        return audio
+    offset = 12
+    while offset + 8 <= len(audio):
+        chunk_id = audio[offset:offset + 4]
+        chunk_size = int.from_bytes(audio[offset + 4:offset + 8], "little")
+        if chunk_id == b"data":
+            return audio[offset + 8:offset + 8 + chunk_size]
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return audio
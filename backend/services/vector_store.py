@@ -0,0 +1,58 @@
+from abc import ABC, abstractmethod
+
+from config.settings import settings
+
+VECTOR_BACKENDS = ("pinecone", "local")
+
+
+class VectorStore(ABC):
+    """
+    Chunk vector storage used by ingestion and the call path. Vectors are dicts of
+    {"id", "values", "metadata"}; chunk ids are "<consultation_id>_chunk_<n>" and every
+    chunk's metadata carries its consultation_id.
+    """
+
+    @abstractmethod
+    def upsert_chunks(self, vectors: list[dict], batch_size: int | None = None) -> bool:
+        """Writes vectors, replacing any with the same id; False if the write failed."""
+
+    @abstractmethod
+    def query_similar_chunks(
+        self,
+        query_vector: list[float],
+        consultation_id: str | None = None,
+        top_k: int = 3,
+        metadata_filter: dict | None = None,
+    ) -> list[dict]:
+        """Returns metadata of the top_k chunks by cosine similarity, optionally filtered."""
+
+    @abstractmethod
+    def fetch(self, ids: list[str]) -> dict[str, dict]:
+        """Returns {id: {"id", "values", "metadata"}} for the ids that exist."""
+
+    @abstractmethod
+    def delete_consultation(self, consultation_id: str) -> bool:
+        """Removes every chunk stored for a consultation."""
+
+    def query_context(self, consultation_id: str) -> dict:
+        """Fetches metadata from first chunk by consultation id."""
+        chunk_id = f"{consultation_id}_chunk_0"
+        try:
+            return self.fetch([chunk_id]).get(chunk_id, {}).get("metadata", {})
+        except Exception as e:
+            print(f"Vector store fetch error: {e}")
+            return {}
+
+
+def get_vector_store(registry=None, backend: str | None = None) -> VectorStore:
+    """The configured backend (VECTOR_STORE_BACKEND): managed Pinecone or the local mmap store."""
+    from services.clients import client_registry
+
+    registry = registry or client_registry
+    backend = backend or settings.VECTOR_STORE_BACKEND
+    if backend == "local":
+        return registry.get_local_vector_store()
+    if backend == "pinecone":
+        from services.pinecone_service import PineconeService
+        return PineconeService(registry)
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND {backend!r}; expected one of {VECTOR_BACKENDS}")
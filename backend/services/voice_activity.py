@@ -0,0 +1,114 @@
+import time
+
+from config.settings import settings
+from utils.audio import frame_features
+
+MULAW_BYTES_PER_MS = 8
+MULAW_SILENCE = b"\xff"
+MAX_SPEECH_ZCR = 0.35 # quiet frames crossing zero this often are hiss, not voice
+
+
+class VoiceActivityDetector:
+    """
+    Frame-level speech detector for 8kHz mulaw call audio. A frame is voiced when its
+    RMS clears both STT_VOICE_RMS and a multiple of the tracked noise floor and its
+    zero-crossing rate looks like voice (loud frames pass regardless, for fricatives).
+    `speaking` adds an onset minimum and a hangover so short clicks and pauses
+    between words do not flip the state.
+    """
+
+    def __init__(self, min_speech_ms: int | None = None, hangover_ms: int | None = None):
+        self.min_speech_ms = settings.STT_VAD_MIN_SPEECH_MS if min_speech_ms is None else min_speech_ms
+        self.hangover_ms = settings.STT_VAD_HANGOVER_MS if hangover_ms is None else hangover_ms
+        self.noise_floor = float(settings.STT_VOICE_RMS) / 3
+        self.voiced = False
+        self.speaking = False
+        self._voiced_ms = 0
+        self._silent_ms = 0
+
+    def update(self, frame: bytes) -> bool:
+        """Classifies one frame; returns True when `speaking` changed."""
+        rms, zcr = frame_features(frame)
+        threshold = max(settings.STT_VOICE_RMS, 3 * self.noise_floor)
+        self.voiced = rms >= threshold and (zcr <= MAX_SPEECH_ZCR or rms >= 2 * threshold)
+        if not self.voiced:
+            # Slow-moving estimate of the line's background level.
+            self.noise_floor += 0.05 * (rms - self.noise_floor)
+
+        frame_ms = len(frame) // MULAW_BYTES_PER_MS
+        if self.voiced:
+            self._voiced_ms += frame_ms
+            self._silent_ms = 0
+        else:
+            self._silent_ms += frame_ms
+            if self._silent_ms >= self.min_speech_ms:
+                self._voiced_ms = 0
+
+        previous = self.speaking
+        if not self.speaking and self._voiced_ms >= self.min_speech_ms:
+            self.speaking = True
+        elif self.speaking and self._silent_ms >= self.hangover_ms:
+            self.speaking = False
+        return self.speaking != previous
+
+
+class InboundAudioGate:
+    """
+    Sits between Twilio's 20 ms frames and the STT stream. Speech (plus a short
+    pre-roll and the VAD hangover, which Google needs to finalize an utterance) is
+    merged into ~STT_COALESCE_MS requests; long silences only send a small padding
+    request every STT_KEEPALIVE_MS so the stream stays open.
+    """
+
+    def __init__(self):
+        self.vad = VoiceActivityDetector()
+        self.coalesce_bytes = settings.STT_COALESCE_MS * MULAW_BYTES_PER_MS
+        self.preroll_bytes = settings.STT_VAD_PREROLL_MS * MULAW_BYTES_PER_MS
+        self.keepalive_ms = settings.STT_KEEPALIVE_MS
+        self._pending = bytearray()
+        self._preroll = bytearray()
+        self._idle_ms = 0
+        self.frames_in = 0
+        self.requests_out = 0
+        self.cpu_seconds = 0.0
+
+    def push(self, frame: bytes) -> tuple[list[bytes], bool]:
+        """Takes one inbound frame; returns (audio requests to send now, speaking changed)."""
+        started = time.perf_counter()
+        self.frames_in += 1
+        changed = self.vad.update(frame)
+        out: list[bytes] = []
+
+        if self.vad.speaking:
+            if self._preroll:
+                self._pending += self._preroll
+                self._preroll.clear()
+            self._pending += frame
+            if len(self._pending) >= self.coalesce_bytes:
+                out.append(bytes(self._pending))
+                self._pending.clear()
+        else:
+            if self._pending:
+                # Speech just ended: flush the tail of the utterance right away.
+                out.append(bytes(self._pending))
+                self._pending.clear()
+            self._preroll += frame
+            if len(self._preroll) > self.preroll_bytes:
+                del self._preroll[: len(self._preroll) - self.preroll_bytes]
+            self._idle_ms += len(frame) // MULAW_BYTES_PER_MS
+            if self._idle_ms >= self.keepalive_ms:
+                out.append(MULAW_SILENCE * self.coalesce_bytes)
+
+        if out:
+            self._idle_ms = 0
+            self.requests_out += len(out)
+        self.cpu_seconds += time.perf_counter() - started
+        return out, changed
+
+    def stats(self) -> dict:
+        return {
+            "frames_in": self.frames_in,
+            "requests_out": self.requests_out,
+            "requests_saved_pct": round(100 * (1 - self.requests_out / self.frames_in), 1) if self.frames_in else 0.0,
+            "cpu_ms": round(self.cpu_seconds * 1000, 2),
+        }
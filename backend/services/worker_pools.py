@@ -0,0 +1,42 @@
+import asyncio
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+
+from config.settings import settings
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def process_pool_workers() -> int:
+    """Worker count of the shared pool; CPU_WORKER_PROCESSES=0 means one per CPU."""
+    return settings.CPU_WORKER_PROCESSES or os.cpu_count() or 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Shared process pool for CPU-bound work (PDF parsing) kept off the event loop."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=process_pool_workers())
+    return _process_pool
+
+
+async def run_in_process(func, *args, **kwargs):
+    """Runs a picklable, module-level function in the shared process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), partial(func, *args, **kwargs))
+
+
+def submit_to_process(func, *args, **kwargs) -> Future:
+    """
+    Like run_in_process, but returns the pool's Future so callers can cancel work
+    that has not started yet (asyncio.wrap_future to await it).
+    """
+    return get_process_pool().submit(func, *args, **kwargs)
+
+
+def shutdown_pools() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -0,0 +1,42 @@
+"""
+Shared test setup. Settings and both database engines read the environment at
+import time, so the test database, local vector store and spool directory are
+pointed at a temporary directory before any app module is imported.
+
+Run from the repository root or the backend directory:
+    python -m pytest
+"""
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="followup-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_TMP_DIR}/test.db",
+    VECTOR_STORE_BACKEND="local",
+    VECTOR_STORE_PATH=f"{_TMP_DIR}/vector_store",
+    INGESTION_SPOOL_DIR=f"{_TMP_DIR}/uploads",
+    EMBEDDING_CACHE_PATH="",
+    PHRASE_CACHE_PATH="",
+    STARTUP_WARM_CLIENTS="false",
+)
+
+import pytest
+
+from config.database import Base, SessionLocal, engine
+import models.call_log, models.call_turn, models.consultation, models.ingestion_job, models.patient  # noqa: E401,F401 (registers tables)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    engine.dispose()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,96 @@
+import asyncio
+import gc
+import time
+import uuid
+
+from sqlalchemy import text
+
+from config.async_database import async_session, dispose_async_engine
+from models.call_log import CallLog
+from models.call_turn import CallTurn
+from services.call_turns import CallTurnWriter
+
+CALLS = 30
+TURNS = 10
+TICK_MS = 20 # outbound audio frame interval
+MAX_LAG_MS = 40 # two frames: a paced call would audibly stutter past this
+
+
+async def _ticker(lags: list[float], stop: asyncio.Event) -> None:
+    interval = TICK_MS / 1000
+    expected = time.perf_counter() + interval
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, expected - time.perf_counter()))
+        now = time.perf_counter()
+        lags.append((now - expected) * 1000)
+        expected = max(expected + interval, now)
+
+
+async def _call(writer: CallTurnWriter, start_delay: float) -> uuid.UUID:
+    """The webhook's database work for one call: draft log, turn rows, finalize."""
+    await asyncio.sleep(start_delay)
+    conversation_id = str(uuid.uuid4())
+    async with async_session() as db:
+        draft = CallLog(conversation_id=conversation_id, transcript="", call_status="started")
+        db.add(draft)
+        await db.commit()
+        call_log_id = draft.id
+    for seq in range(TURNS):
+        await asyncio.sleep(0.02)
+        writer.add({
+            "call_log_id": call_log_id,
+            "conversation_id": conversation_id,
+            "seq": seq,
+            "revision": seq,
+            "speaker": "AI" if seq % 2 else "Patient",
+            "text": "Thanks, and how has the pain been since yesterday?",
+            "offset_ms": seq * 3000,
+            "interrupted": False,
+            "retracted": False,
+        })
+    async with async_session() as db:
+        call_log = await db.get(CallLog, call_log_id)
+        call_log.call_status = "completed"
+        call_log.transcript = "done"
+        await db.commit()
+    return call_log_id
+
+
+async def _run_calls() -> tuple[list[float], list]:
+    # Engine creation and the driver import happen once per process, before any call is live.
+    async with async_session() as db:
+        await db.execute(text("SELECT 1"))
+    writer = CallTurnWriter(flush_ms=50, batch_size=20, max_buffered=10000)
+    await writer.start()
+    lags: list[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    try:
+        results = await asyncio.gather(*(_call(writer, index * 0.005) for index in range(CALLS)), return_exceptions=True)
+        await writer.stop()
+    finally:
+        stop.set()
+        await ticker
+        await dispose_async_engine()
+    return lags, results
+
+
+def test_concurrent_calls_do_not_stall_the_event_loop(db):
+    # A full collection of the test runner's heap pauses the loop for tens of ms on its
+    # own; freeze what is already alive so the ticker measures the call path.
+    gc.collect()
+    gc.freeze()
+    try:
+        lags, results = asyncio.run(_run_calls())
+    finally:
+        gc.unfreeze()
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    assert not errors, errors[0]
+    assert len(lags) > 10
+    assert max(lags) < MAX_LAG_MS, f"max loop lag {max(lags):.1f} ms at {lags.index(max(lags))} of {len(lags)}"
+
+    call_logs = db.query(CallLog).filter(CallLog.id.in_(results)).all()
+    assert len(call_logs) == CALLS
+    assert {call_log.call_status for call_log in call_logs} == {"completed"}
+    assert db.query(CallTurn).filter(CallTurn.call_log_id.in_(results)).count() == CALLS * TURNS
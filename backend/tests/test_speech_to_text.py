@@ -0,0 +1,112 @@
+import asyncio
+import base64
+from types import SimpleNamespace
+
+import pytest
+
+from config.settings import settings
+from services import speech_to_text
+from services.speech_to_text import STTService
+
+VOICED_FRAME = base64.b64encode(b"\x00" * 160).decode() # 20 ms of full-scale mulaw
+SILENT_FRAME = base64.b64encode(b"\xff" * 160).decode() # 20 ms of mulaw zero
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def _result(transcript: str, stability: float, is_final: bool = False):
+    return SimpleNamespace(alternatives=[SimpleNamespace(transcript=transcript)], stability=stability, is_final=is_final)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(speech_to_text, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def endpointing(monkeypatch, clock):
+    """STTService with endpointing on and no VAD gate, so voicing comes from frame RMS."""
+    monkeypatch.setattr(settings, "STT_VAD_ENABLED", False)
+    monkeypatch.setattr(settings, "STT_ENDPOINT_SILENCE_MS", 500)
+    monkeypatch.setattr(settings, "STT_ENDPOINT_MIN_STABILITY", 0.8)
+    events = []
+
+    async def on_endpoint(text):
+        events.append(("endpoint", text))
+
+    async def on_retracted():
+        events.append(("retracted", None))
+
+    async def on_final(text):
+        events.append(("final", text))
+
+    stt = STTService(on_final, client=object(), on_endpoint=on_endpoint, on_endpoint_retracted=on_retracted)
+    stt.is_running = True
+    return stt, events
+
+
+async def _feed(stt: STTService, clock: FakeClock, frame: str, ms: int) -> None:
+    for _ in range(ms // 20):
+        clock.now += 0.02
+        await stt.capture_input(frame)
+
+
+def test_head_and_tail_interim_endpoints_on_head_stability(endpointing, clock):
+    stt, events = endpointing
+
+    async def run():
+        await _feed(stt, clock, VOICED_FRAME, 400)
+        # Google's split interim: a stable head and a barely-stable tail.
+        await stt._on_interim([_result("my chest still hurts", 0.9), _result(" a bit", 0.01)])
+        await _feed(stt, clock, SILENT_FRAME, 400)
+        assert events == []
+        await _feed(stt, clock, SILENT_FRAME, 200)
+
+    asyncio.run(run())
+    assert events == [("endpoint", "my chest still hurts a bit")]
+
+
+def test_unstable_interim_waits_for_the_final(endpointing, clock):
+    stt, events = endpointing
+
+    async def run():
+        await _feed(stt, clock, VOICED_FRAME, 400)
+        await stt._on_interim([_result("my chest", 0.3), _result(" still", 0.01)])
+        await _feed(stt, clock, SILENT_FRAME, 2000)
+
+    asyncio.run(run())
+    assert events == []
+
+
+def test_speculative_endpoint_is_retracted_when_the_patient_keeps_talking(endpointing, clock):
+    stt, events = endpointing
+
+    async def run():
+        await _feed(stt, clock, VOICED_FRAME, 400)
+        await stt._on_interim([_result("my chest still hurts", 0.9)])
+        await _feed(stt, clock, SILENT_FRAME, 600)
+        await stt._on_interim([_result("my chest still hurts when I walk", 0.9)])
+
+    asyncio.run(run())
+    assert events == [("endpoint", "my chest still hurts"), ("retracted", None)]
+
+
+def test_renewed_speech_retracts_the_speculative_endpoint(endpointing, clock):
+    stt, events = endpointing
+
+    async def run():
+        await _feed(stt, clock, VOICED_FRAME, 400)
+        await stt._on_interim([_result("my chest still hurts", 0.9)])
+        await _feed(stt, clock, SILENT_FRAME, 600)
+        await _feed(stt, clock, VOICED_FRAME, settings.STT_ENDPOINT_RESUME_MS)
+
+    asyncio.run(run())
+    assert events == [("endpoint", "my chest still hurts"), ("retracted", None)]
@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def _mulaw_decode_table() -> np.ndarray:
+    """G.711 mu-law byte -> 16-bit linear PCM sample, for all 256 codes."""
+    codes = ~np.arange(256, dtype=np.uint8)
+    exponent = (codes >> 4) & 0x07
+    mantissa = (codes & 0x0F).astype(np.int32)
+    magnitude = ((mantissa << 3) + 0x84) << exponent
+    magnitude -= 0x84
+    return np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+MULAW_TO_LINEAR = _mulaw_decode_table()
+
+
+def mulaw_to_linear(audio: bytes) -> np.ndarray:
+    """Decodes mulaw bytes to int16 PCM with one table lookup (no per-sample Python)."""
+    return MULAW_TO_LINEAR[np.frombuffer(audio, dtype=np.uint8)]
+
+
+def mulaw_rms(audio: bytes) -> float:
+    """Root-mean-square level of mulaw audio on the 16-bit linear scale."""
+    if not audio:
+        return 0.0
+    samples = mulaw_to_linear(audio).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples)))
+
+
+def frame_features(audio: bytes) -> tuple[float, float]:
+    """(RMS level, zero-crossing rate) of one mulaw frame, computed on the decoded samples."""
+    if not audio:
+        return 0.0, 0.0
+    samples = mulaw_to_linear(audio)
+    level = samples.astype(np.float32)
+    rms = float(np.sqrt(np.mean(level * level)))
+    signs = np.signbit(samples)
+    zcr = float(np.count_nonzero(signs[1:] != signs[:-1])) / max(1, len(samples) - 1)
+    return rms, zcr
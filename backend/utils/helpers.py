@@ -2,6 +2,16 @@ import json
 import re
 from typing import Tuple
 
+SECTION_HEADINGS = {
+    "allergies", "assessment", "assessment and plan", "chief complaint", "diagnosis", "discharge instructions",
+    "doctor notes", "findings", "follow up", "follow-up", "history", "history of present illness",
+    "impression", "instructions", "medications", "plan", "procedure", "recommendations", "summary",
+    "vitals", "vital signs",
+}
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_LIST_ITEM_RE = re.compile(r"^\s*(?:[-*\u2022]|\d+[.)])\s+")
+_FIELD_RE = re.compile(r"^[A-Za-z][\w /&()-]{0,30}:\s+\S")
+
 def extract_json_from_text(text: str) -> dict:
     """Extracts a JSON object from a plaintext string using regex."""
     try:
@@ -56,6 +66,27 @@ def parse_bool(value, default: bool = False) -> bool:
             return False
     return default
 
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for request budgeting."""
+    if not text:
+        return 0
+    return len(text) // 4 + 1
+
+def split_complete_sentences(buffer: str, min_chars: int = 20) -> tuple[list[str], str]:
+    """
+    Splits streamed text into sentences that are known to be complete (followed by
+    the start of another) and the unfinished remainder. Fragments shorter than
+    min_chars are kept with the next sentence so TTS is not called per "Okay."
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(buffer):
+        candidate = buffer[start:match.start()].strip()
+        if len(candidate) >= min_chars:
+            sentences.append(candidate)
+            start = match.end()
+    return sentences, buffer[start:]
+
 def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[str]:
     """Splits a long string into overlapping chunks for vector embeddings."""
     if not text:
@@ -69,3 +100,128 @@ def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[st
         start += chunk_size - overlap
     
     return chunks
+
+def _is_heading(line: str) -> bool:
+    if len(line) > 60:
+        return False
+    label = line.rstrip(":").strip().lower()
+    if label in SECTION_HEADINGS:
+        return True
+    if line.endswith(":") and len(label.split()) <= 5:
+        return True
+    letters = [ch for ch in line if ch.isalpha()]
+    return len(letters) >= 3 and line.isupper()
+
+def _split_units(text: str) -> list[tuple[str, str]]:
+    """
+    Splits a document into (kind, text) units in one pass: "heading" lines, whole
+    "line" units (list items, "Key: value" fields) and prose sentences, where the
+    first sentence of each paragraph is a "paragraph" unit and the rest "sentence".
+    Wrapped prose lines are rejoined before sentence splitting.
+    """
+    units: list[tuple[str, str]] = []
+    paragraph: list[str] = []
+
+    def _flush_paragraph():
+        if paragraph:
+            kind = "paragraph"
+            for sentence in _SENTENCE_END_RE.split(" ".join(paragraph)):
+                if sentence.strip():
+                    units.append((kind, sentence.strip()))
+                    kind = "sentence"
+            paragraph.clear()
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            _flush_paragraph()
+        elif _is_heading(line):
+            _flush_paragraph()
+            units.append(("heading", line))
+        elif _LIST_ITEM_RE.match(line) or _FIELD_RE.match(line):
+            _flush_paragraph()
+            units.append(("line", line))
+        else:
+            paragraph.append(line)
+    _flush_paragraph()
+    return units
+
+def _split_oversized(unit: str, max_tokens: int) -> list[str]:
+    """Word-wraps a single unit that exceeds the token budget on its own."""
+    pieces, words, tokens = [], [], 0
+    for word in unit.split():
+        word_tokens = estimate_tokens(word + " ")
+        if words and tokens + word_tokens > max_tokens:
+            pieces.append(" ".join(words))
+            words, tokens = [], 0
+        words.append(word)
+        tokens += word_tokens
+    if words:
+        pieces.append(" ".join(words))
+    return pieces
+
+def chunk_text_structured(text: str, max_tokens: int = 256, overlap_tokens: int = 32) -> list[str]:
+    """
+    Packs whole sentences, list items and fields into chunks of up to max_tokens,
+    preferring to start a new chunk at section headings (Medications, Assessment, ...)
+    and never ending a chunk on a heading. Consecutive chunks within a section share
+    up to overlap_tokens of trailing sentences. Runs in linear time.
+    """
+    if not text or not text.strip():
+        return []
+    max_tokens = max(16, max_tokens)
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+
+    chunks: list[str] = []
+    current: list[tuple[str, str, int]] = []
+    current_tokens = 0
+
+    def _emit(carry_overlap: bool):
+        nonlocal current, current_tokens
+        carried: list[tuple[str, str, int]] = []
+        # Keep a trailing heading with the content that follows it.
+        while len(current) > 1 and current[-1][0] == "heading":
+            carried.insert(0, current.pop())
+        chunks.append(_join_units(current))
+        if carry_overlap and not carried:
+            tail_tokens = 0
+            for unit in reversed(current[1:]):
+                if unit[0] == "heading" or tail_tokens + unit[2] > overlap_tokens:
+                    break
+                carried.insert(0, unit)
+                tail_tokens += unit[2]
+        current = carried
+        current_tokens = sum(unit[2] for unit in carried)
+
+    for kind, unit_text in _split_units(text):
+        pieces = [unit_text]
+        if estimate_tokens(unit_text) > max_tokens:
+            pieces = _split_oversized(unit_text, max_tokens)
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if kind == "heading" and current and current_tokens >= max_tokens * 3 // 4:
+                _emit(carry_overlap=False)
+            elif current and current_tokens + tokens > max_tokens:
+                _emit(carry_overlap=True)
+                # Overlap must never push the next unit past the budget.
+                while current and current_tokens + tokens > max_tokens:
+                    current_tokens -= current.pop(0)[2]
+            current.append((kind, piece, tokens))
+            current_tokens += tokens
+
+    if current:
+        chunks.append(_join_units(current))
+    return chunks
+
+def _join_units(units: list[tuple[str, str, int]]) -> str:
+    parts: list[str] = []
+    for i, (kind, unit_text, _) in enumerate(units):
+        if i:
+            parts.append(" " if kind == "sentence" else "\n")
+        parts.append(unit_text)
+    return "".join(parts)
+
+
+def transcript_words(text: str) -> list[str]:
+    """Lowercased words without trailing punctuation, for comparing interim and final transcripts."""
+    return [word.lower().strip(".,!?;:") for word in (text or "").split()]
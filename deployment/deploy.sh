@@ -8,6 +8,11 @@ IMAGE_NAME="gcr.io/$PROJECT_ID/$SERVICE_NAME"
 DB_INSTANCE_NAME="ai-followup-db"
 DB_NAME="followups"
 DB_USER="postgres"
+DATABASE_URL="postgresql+pg8000://$DB_USER:YOUR_PASSWORD@/$DB_NAME?unix_sock=/cloudsql/$PROJECT_ID:$REGION:$DB_INSTANCE_NAME/.s.PGSQL.5432"
+
+# The call path's async engine derives a psycopg URL from DATABASE_URL; fail before deploying if it can't.
+echo "Checking DATABASE_URL for the async engine..."
+(cd "$(dirname "$0")/../backend" && python -m cli.check_database_url "$DATABASE_URL") || exit 1
 
 echo "Deploying to Google Cloud Run..."
 
@@ -25,7 +30,7 @@ gcloud run deploy $SERVICE_NAME \
   --max-instances=1 \
   --allow-unauthenticated \
   --add-cloudsql-instances $PROJECT_ID:$REGION:$DB_INSTANCE_NAME \
-  --set-env-vars="GOOGLE_PROJECT_ID=$PROJECT_ID,GCP_LOCATION=$REGION,DATABASE_URL=postgresql+pg8000://$DB_USER:YOUR_PASSWORD@/$DB_NAME?unix_sock=/cloudsql/$PROJECT_ID:$REGION:$DB_INSTANCE_NAME/.s.PGSQL.5432"
+  --set-env-vars="GOOGLE_PROJECT_ID=$PROJECT_ID,GCP_LOCATION=$REGION,DATABASE_URL=$DATABASE_URL"
 
 # 3. Get the URL
 URL=$(gcloud run services describe $SERVICE_NAME --platform managed --region $REGION --format 'value(status.url)')